@@ -1,18 +1,48 @@
-from flask import Flask, request, jsonify
-import pandas as pd
-from jobspy import scrape_jobs
+from flask import Blueprint, Flask, Response, g, request, jsonify
 import os
+import io
+import re
+import atexit
+import queue
+import json
+import uuid
+from datetime import datetime, timezone
+import base64
+import hashlib
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import psycopg2
 from psycopg2 import sql
+from psycopg2 import pool as pg_pool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, connection as pg_connection, cursor as pg_cursor
+from psycopg2.extras import execute_values
 import csv
 from flask_cors import CORS
 from dotenv import load_dotenv
-from ycombinator_scraper import Scraper
+from dedup import PostgresDedupIndex
+from metrics import REGISTRY, end_profile, server_timing, span, start_profile
+from rate_limits import SiteLimiter
+from retention import PostgresJobRetention
+from response_encoding import (
+    ARROW_MIMETYPE, COLUMNAR_AVAILABLE, PARQUET_MIMETYPE, FastJSONProvider, arrow_schema,
+    compress_response, negotiate_encoding, parquet_bytes, stream_arrow,
+)
+from salary_parser import parse_salary
+from scrape_cache import CACHE_MODES, MemoryScrapeCache, PostgresScrapeCache, cache_key
+from scrape_queue import MemoryScrapeQueue, PostgresScrapeQueue, ScrapeWorkerPool
+from scrape_watermarks import PostgresWatermarkStore, delta_hours, source_key
+from scheduler import PostgresScheduleStore, ScrapeScheduler
+from stats import PostgresJobStats, change_counter_statements, mark_jobs_changed, stats_view_statements
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
 # Database connection parameters
@@ -22,6 +52,144 @@ DB_NAME = os.getenv("DB_NAME", "scraper")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "1234")
 
+# Connection pool settings
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# Seconds to wait for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections idle for longer than this are pinged before being handed out
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30"))
+
+# Number of rows staged and merged per round trip when ingesting jobs
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+
+# What to do when a scraped job_url is already stored:
+# "nothing" keeps the stored row, "update" refreshes UPSERT_UPDATE_COLUMNS
+UPSERT_MODES = ("nothing", "update")
+UPSERT_MODE = os.getenv("UPSERT_MODE", "nothing")
+UPSERT_UPDATE_COLUMNS = [
+    col.strip() for col in os.getenv(
+        "UPSERT_UPDATE_COLUMNS",
+        "date_posted,job_type,salary_source,interval,min_amount,max_amount,currency,is_remote,description",
+    ).split(",") if col.strip()
+]
+
+# Background scrape queue: "postgres" (scrape_tasks table, shared by all
+# processes) or "memory" (this process only)
+SCRAPE_QUEUE_BACKEND = os.getenv("SCRAPE_QUEUE_BACKEND", "postgres")
+# Worker threads per process executing queued scrapes (0 to only enqueue)
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "2"))
+# Seconds without a progress update after which a running task is retried
+SCRAPE_TASK_STALE_AFTER = int(os.getenv("SCRAPE_TASK_STALE_AFTER", "1800"))
+
+# What this process serves: "full" (every endpoint and background worker)
+# or "query", a read-only profile with just /jobs, /jobs/stats, /health and
+# /metrics that starts no background workers and never loads the scraping
+# packages
+APP_PROFILES = ("full", "query")
+APP_PROFILE = os.getenv("APP_PROFILE", "full")
+if APP_PROFILE not in APP_PROFILES:
+    raise ValueError(f"Unsupported APP_PROFILE: {APP_PROFILE}")
+# Which requests this process serves when deployed as separate pools (see
+# gunicorn.conf.py): "all", "query" (everything but scraping) or "scrape".
+# The query profile has no scrape endpoints, so it implies the query pool
+SERVE_POOLS = ("all", "query", "scrape")
+SERVE_POOL = os.getenv("SERVE_POOL") or ("query" if APP_PROFILE == "query" else "all")
+if SERVE_POOL not in SERVE_POOLS:
+    raise ValueError(f"Unsupported SERVE_POOL: {SERVE_POOL}")
+if APP_PROFILE == "query" and SERVE_POOL != "query":
+    raise ValueError(f"APP_PROFILE=query can't serve SERVE_POOL={SERVE_POOL}; use SERVE_POOL=query")
+# Synchronous /scrape calls one process runs at once (0 for no limit). Keeps
+# server threads free for /jobs when both share a pool
+SCRAPE_MAX_INFLIGHT = int(os.getenv("SCRAPE_MAX_INFLIGHT", "0"))
+
+# Compress responses for clients that accept zstd or gzip. Buffered responses
+# smaller than RESPONSE_COMPRESSION_MIN_SIZE bytes are sent as is
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() in ("true", "1", "yes")
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_ZSTD_LEVEL = int(os.getenv("RESPONSE_ZSTD_LEVEL", "3"))
+
+# Cache of scrape results keyed by the normalized scrape parameters:
+# "memory" (this process only), "postgres" (scrape_cache table) or "none"
+SCRAPE_CACHE_BACKEND = os.getenv("SCRAPE_CACHE_BACKEND", "memory")
+# Seconds a cached scrape result is served for
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", "900"))
+# Cached results kept before the least recently used ones are evicted
+SCRAPE_CACHE_MAX_ENTRIES = int(os.getenv("SCRAPE_CACHE_MAX_ENTRIES", "256"))
+
+# Incremental scraping: only fetch the window since each source's last
+# scrape and drop postings that source already returned. The default for
+# requests that don't pass "incremental"
+SCRAPE_INCREMENTAL = os.getenv("SCRAPE_INCREMENTAL", "false").lower() in ("true", "1", "yes")
+# Extra hours added to the incremental window for postings indexed late
+SCRAPE_INCREMENTAL_OVERLAP_HOURS = int(os.getenv("SCRAPE_INCREMENTAL_OVERLAP_HOURS", "1"))
+# Days a job_url stays in a source's seen set
+SCRAPE_SEEN_RETENTION_DAYS = int(os.getenv("SCRAPE_SEEN_RETENTION_DAYS", "30"))
+
+# Sources (JobSpy sites, YC companies) scraped concurrently per /scrape call
+SCRAPE_MAX_CONCURRENCY = int(os.getenv("SCRAPE_MAX_CONCURRENCY", "8"))
+# Seconds a single source may run before its results are abandoned
+SCRAPE_SOURCE_TIMEOUT = float(os.getenv("SCRAPE_SOURCE_TIMEOUT", "300"))
+
+# Per-site limits shared by every scrape in this process: concurrent calls
+# and the maximum request rate. The rate backs off automatically when a site
+# answers with rate-limit errors. SCRAPE_SITE_LIMITS overrides single sites,
+# e.g. {"linkedin": {"concurrency": 1, "rate_per_minute": 10}}
+SCRAPE_SITE_CONCURRENCY = int(os.getenv("SCRAPE_SITE_CONCURRENCY", "2"))
+SCRAPE_SITE_RATE_PER_MINUTE = float(os.getenv("SCRAPE_SITE_RATE_PER_MINUTE", "30"))
+SCRAPE_SITE_LIMITS = json.loads(os.getenv("SCRAPE_SITE_LIMITS", "{}"))
+# Retries of a failed source, with jittered exponential backoff (seconds)
+SCRAPE_SOURCE_RETRIES = int(os.getenv("SCRAPE_SOURCE_RETRIES", "2"))
+SCRAPE_RETRY_BACKOFF = float(os.getenv("SCRAPE_RETRY_BACKOFF", "2"))
+
+# Serve Prometheus metrics for this process at /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("true", "1", "yes")
+# Let clients ask for a Server-Timing header with per-stage timings by sending
+# "X-Profile: 1". Off by default since it exposes internal timings
+METRICS_PROFILE_HEADERS = os.getenv("METRICS_PROFILE_HEADERS", "false").lower() in ("true", "1", "yes")
+
+# Collapse postings that several boards return for the same job into one
+# canonical job at ingest. Postings with the same normalized title, company
+# and location, or whose descriptions have an estimated Jaccard similarity
+# of at least DEDUP_SIMILARITY (and the same company), are duplicates.
+# Off by default: it costs about two thirds of ingest throughput
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() in ("true", "1", "yes")
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.8"))
+
+# Jobs not seen by any scrape for JOB_RETENTION_DAYS days are expired
+# (0 keeps them forever), checked every JOB_RETENTION_INTERVAL seconds.
+# Expired jobs are moved to the monthly partitions of scraped_jobs_archive
+# (JOB_RETENTION_ARCHIVE), which are dropped after
+# JOB_ARCHIVE_RETENTION_MONTHS months (0 keeps them). scraped_jobs itself
+# isn't partitioned, so expiry deletes rows; a run that expired jobs ends
+# with a VACUUM of scraped_jobs and the dedup tables its deletes cascade to
+# (JOB_RETENTION_VACUUM)
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "0"))
+JOB_RETENTION_INTERVAL = float(os.getenv("JOB_RETENTION_INTERVAL", "3600"))
+JOB_RETENTION_ARCHIVE = os.getenv("JOB_RETENTION_ARCHIVE", "true").lower() in ("true", "1", "yes")
+JOB_ARCHIVE_RETENTION_MONTHS = int(os.getenv("JOB_ARCHIVE_RETENTION_MONTHS", "12"))
+JOB_RETENTION_VACUUM = os.getenv("JOB_RETENTION_VACUUM", "true").lower() in ("true", "1", "yes")
+# GET /jobs/stats reads materialized views, refreshed every
+# JOB_STATS_REFRESH_INTERVAL seconds if the jobs table changed (0 only
+# refreshes after ingests), or sooner after an ingest, but at most every
+# JOB_STATS_MIN_REFRESH_INTERVAL seconds
+JOB_STATS_REFRESH_INTERVAL = float(os.getenv("JOB_STATS_REFRESH_INTERVAL", "300"))
+JOB_STATS_MIN_REFRESH_INTERVAL = float(os.getenv("JOB_STATS_MIN_REFRESH_INTERVAL", "30"))
+# A stored job's last_seen_at is refreshed by a re-scrape at most this often,
+# so re-scraping the same jobs doesn't rewrite their rows every time
+LAST_SEEN_RESOLUTION = "1 day"
+
+# Periodic scrapes stored in scrape_schedules are enqueued by a scheduler
+# thread that checks for due schedules every SCHEDULER_POLL_INTERVAL seconds
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("true", "1", "yes")
+SCHEDULER_POLL_INTERVAL = float(os.getenv("SCHEDULER_POLL_INTERVAL", "30"))
+
+# Warm YCombinator scraper sessions kept per process, and whether each one
+# logs in (with login_username/login_password) when it starts
+YC_SCRAPER_POOL_SIZE = int(os.getenv("YC_SCRAPER_POOL_SIZE", "2"))
+YC_SCRAPER_LOGIN = os.getenv("YC_SCRAPER_LOGIN", "false").lower() in ("true", "1", "yes")
+
 TABLE_NAME = "scraped_jobs"
 COLUMNS = [
     ("job_id", "TEXT"),
@@ -60,12 +228,274 @@ COLUMNS = [
     ("work_from_home_type", "TEXT"),
 ]
 
-# Function to scrape YCombinator jobs
-def scrape_ycombinator_jobs(company_name=None):
-    scraper = Scraper()
+# Company fields stored once per company in COMPANY_TABLE_NAME instead of on
+# every job row; jobs reference their company through company_id. Jobs
+# without a company name (or site) have no company row and keep these
+# fields on the job row.
+COMPANY_TABLE_NAME = "companies"
+COMPANY_COLUMNS = [
+    "company_industry",
+    "company_url",
+    "company_logo",
+    "company_url_direct",
+    "company_addresses",
+    "company_num_employees",
+    "company_revenue",
+    "company_description",
+    "company_rating",
+    "company_reviews_count",
+]
+# Job columns still written to TABLE_NAME
+JOB_TABLE_COLUMNS = [col_name for col_name, _ in COLUMNS if col_name not in COMPANY_COLUMNS]
+# SQL type of every column a job response can contain, used for columnar formats
+JOB_COLUMN_TYPES = dict(
+    COLUMNS, id="INTEGER", company_id="INTEGER", relevance="REAL",
+    scraped_at="TIMESTAMPTZ", last_seen_at="TIMESTAMPTZ",
+)
+
+# Raised for invalid request parameters; reported to the client as a 400
+class RequestParamError(ValueError):
+    pass
+
+# Function to create a YCombinator Scraper. The scraping packages (and
+# pandas, which they pull in) are imported on first use rather than at
+# startup, so processes that only serve queries never load them.
+def Scraper():
+    from ycombinator_scraper import Scraper as YCombinatorScraper
+    return YCombinatorScraper()
+
+# Pool of warm YCombinator Scraper sessions. Each Scraper drives a browser, so
+# launching one per company dominates the cost of a batch; the pool creates
+# at most `size` of them (logged in once if `login` is set) and reuses them.
+class ScraperPool:
+    def __init__(self, size, login=False):
+        self.size = size
+        self.login = login
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+    
+    def _create(self):
+        print("Starting a new YCombinator scraper session")
+        scraper = Scraper()
+        if self.login:
+            scraper.login()
+        return scraper
+    
+    def _discard(self, scraper):
+        # Quit the underlying browser if the scraper exposes one
+        driver = getattr(scraper, "driver", None)
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Error closing YCombinator scraper session: {e}")
+    
+    # Context manager that borrows a scraper, waiting for a free one if all are busy.
+    # A scraper that raises is discarded in case its browser is in a bad state.
+    @contextmanager
+    def scraper(self):
+        self._slots.acquire()
+        try:
+            try:
+                scraper = self._idle.get_nowait()
+            except queue.Empty:
+                scraper = self._create()
+            try:
+                yield scraper
+            except Exception:
+                self._discard(scraper)
+                raise
+            self._idle.put(scraper)
+        finally:
+            self._slots.release()
     
-    # Login to YCombinator
-    # scraper.login()
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+yc_scraper_pool = ScraperPool(YC_SCRAPER_POOL_SIZE, login=YC_SCRAPER_LOGIN)
+atexit.register(yc_scraper_pool.close)
+
+site_limiter = SiteLimiter(
+    default_concurrency=SCRAPE_SITE_CONCURRENCY,
+    default_rate_per_minute=SCRAPE_SITE_RATE_PER_MINUTE,
+    limits=SCRAPE_SITE_LIMITS,
+    retries=SCRAPE_SOURCE_RETRIES,
+    backoff_base=SCRAPE_RETRY_BACKOFF,
+)
+
+# Prometheus metrics, kept per process. Stage timings are recorded by span()
+# in the jobscraper_stage_duration_seconds histogram.
+HTTP_REQUESTS = REGISTRY.counter(
+    "jobscraper_http_requests_total", "HTTP requests handled", ["endpoint", "method", "status"]
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "jobscraper_http_request_duration_seconds",
+    "Time to build each HTTP response (streamed bodies are not included)",
+    ["endpoint"],
+)
+SCRAPE_CALLS = REGISTRY.counter(
+    "jobscraper_scrape_calls_total", "Calls to a job site, including retried attempts", ["site", "status"]
+)
+SCRAPED_JOBS = REGISTRY.counter("jobscraper_scraped_jobs_total", "Jobs returned by each job site", ["site"])
+SCRAPE_CACHE_LOOKUPS = REGISTRY.counter(
+    "jobscraper_scrape_cache_total", "Scrape cache outcomes", ["result"]
+)
+INGEST_ROWS = REGISTRY.counter(
+    "jobscraper_ingest_rows_total", "Job rows ingested into the database", ["result"]
+)
+INGEST_BATCH_RETRIES = REGISTRY.counter(
+    "jobscraper_ingest_batch_retries_total", "Ingest batches that failed and were retried row by row"
+)
+DB_ROUND_TRIPS = REGISTRY.counter(
+    "jobscraper_db_round_trips_total", "Statements, commits and rollbacks sent to the database"
+)
+DB_POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "jobscraper_db_pool_wait_seconds", "Time spent waiting for a pooled database connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+REGISTRY.gauge_function(
+    "jobscraper_db_pool_connections", "Pooled database connections by state",
+    lambda: {(state,): get_db_pool_metrics()[state] for state in ("in_use", "idle")},
+    ["state"],
+)
+REGISTRY.gauge_function(
+    "jobscraper_site_rate_per_minute", "Current adaptive request rate per job site",
+    lambda: {(site,): limit["rate_per_minute"] for site, limit in site_limiter.stats().items()},
+    ["site"],
+)
+REGISTRY.gauge_function(
+    "jobscraper_process_start_time_seconds", "Start time of this process since the epoch",
+    lambda started=time.time(): started,
+)
+
+# Function to scrape YCombinator jobs for several companies, sharing the
+# scraper pool. Yields (company_name, jobs, error, seconds) as each finishes.
+def scrape_ycombinator_companies(company_names):
+    sources = [
+        (company_name, lambda company_name=company_name: site_limiter.call(
+            'ycombinator', lambda: scrape_ycombinator_jobs(company_name)
+        ))
+        for company_name in dict.fromkeys(company_names)
+    ]
+    return run_scrape_sources(sources, max_workers=YC_SCRAPER_POOL_SIZE)
+
+# Keyword patterns used to classify YCombinator tags. Each is one compiled
+# alternation, so a tag is classified with a single scan instead of one
+# substring test per keyword.
+YC_JOB_TYPE_RE = re.compile("Full-time|Part-time|Internship|Contract")
+YC_EXPERIENCE_RE = re.compile(r"year|yr|\+")
+YC_COMPANY_LOCATION_RE = re.compile("New York|San Francisco|Remote|London|Boston")
+YC_EXCLUDED_LINK_RE = re.compile("twitter|facebook")
+
+# Function to classify a job's tags into (location, job_type, is_remote, experience_range).
+# Tag combinations repeat across postings, so results are memoized.
+@lru_cache(maxsize=4096)
+def classify_yc_job_tags(tags):
+    location = None
+    job_type = None
+    is_remote = False
+    experience_range = None
+    
+    for tag in tags:
+        if 'Remote' in tag:
+            is_remote = True
+            # Don't set location to "Remote" - we'll use the actual location
+        elif YC_JOB_TYPE_RE.search(tag):
+            job_type = tag.strip()
+        elif YC_EXPERIENCE_RE.search(tag):
+            experience_range = tag.strip()
+        elif location is None:  # If we haven't set location yet
+            location = tag.strip()
+    
+    return location, job_type, is_remote, experience_range
+
+# Function to compute the company-level fields shared by every job of a
+# YCombinator company. Runs once per company rather than once per job.
+def build_yc_company_profile(company_data):
+    # Extract company information from tags
+    company_industry = None
+    company_size = None
+    company_location = None
+    
+    for tag in company_data.company_tags or []:
+        if 'people' in tag:
+            company_size = tag.strip()
+        elif YC_COMPANY_LOCATION_RE.search(tag):
+            company_location = tag.strip()
+        else:
+            company_industry = tag.strip()
+    
+    return {
+        "company": company_data.company_name,
+        "company_location": company_location,
+        "company_industry": company_industry,
+        "company_url": next((link for link in company_data.company_social_links or []
+                             if 'https://' in link and not YC_EXCLUDED_LINK_RE.search(link)), None),
+        "company_logo": company_data.company_image,
+        "company_url_direct": company_data.company_url,
+        "company_addresses": company_location,  # Use company location for addresses
+        "company_num_employees": company_size,
+        "company_description": company_data.company_description,
+        "vacancy_count": len(company_data.job_data),
+    }
+
+# Function to map one YCombinator job onto the JobSpy structure
+def map_yc_job(job, company_profile):
+    # Parse salary range if available
+    # Example: "$200K - $240K    0.05% - 0.20%"
+    salary = parse_salary(job.job_salary_range)
+    
+    # Determine location and job type from tags
+    tags = tuple(tag for tag_list in job.job_tags or [] for tag in tag_list)
+    location, job_type, is_remote, experience_range = classify_yc_job_tags(tags)
+    
+    return {
+        "job_id": job.job_url.split('/')[-1],
+        "site": "ycombinator",
+        "job_url": job.job_url,
+        "job_url_direct": job.job_url,
+        "title": job.job_title,
+        "company": company_profile["company"],
+        # Use job location or company location
+        "location": location if location else company_profile["company_location"],
+        "date_posted": None,  # YCombinator doesn't provide exact date
+        "job_type": job_type,
+        "salary_source": "ycombinator",
+        "interval": salary.interval,
+        "min_amount": salary.min_amount,
+        "max_amount": salary.max_amount,
+        "currency": salary.currency,
+        "is_remote": is_remote,
+        "job_level": None,
+        "job_function": None,
+        "listing_type": None,
+        "emails": None,
+        "description": job.job_description,
+        "company_industry": company_profile["company_industry"],
+        "company_url": company_profile["company_url"],
+        "company_logo": company_profile["company_logo"],
+        "company_url_direct": company_profile["company_url_direct"],
+        "company_addresses": company_profile["company_addresses"],
+        "company_num_employees": company_profile["company_num_employees"],
+        "company_revenue": None,
+        "company_description": company_profile["company_description"],
+        "skills": None,
+        "experience_range": experience_range,
+        "company_rating": None,
+        "company_reviews_count": None,
+        "vacancy_count": company_profile["vacancy_count"],
+        "work_from_home_type": "remote" if is_remote else None,
+    }
+
+# Function to scrape YCombinator jobs
+def scrape_ycombinator_jobs(company_name=None, scraper=None):
+    if scraper is None:
+        with yc_scraper_pool.scraper() as pooled_scraper:
+            return scrape_ycombinator_jobs(company_name, scraper=pooled_scraper)
     
     # Build the URL
     base_url = "https://www.workatastartup.com/companies"
@@ -75,183 +505,447 @@ def scrape_ycombinator_jobs(company_name=None):
         company_url = base_url
     
     # Scrape company data
-    company_data = scraper.scrape_company_data(company_url=company_url)
+    with span("scrape.ycombinator"):
+        try:
+            company_data = scraper.scrape_company_data(company_url=company_url)
+        except Exception:
+            SCRAPE_CALLS.inc(site="ycombinator", status="error")
+            raise
+    SCRAPE_CALLS.inc(site="ycombinator", status="success")
     
-    # Format jobs to match JobSpy structure
-    jobs_list = []
+    # Format jobs to match JobSpy structure: company fields first, then each job
+    with span("map.ycombinator"):
+        company_profile = build_yc_company_profile(company_data)
+        jobs = [map_yc_job(job, company_profile) for job in company_data.job_data]
+    SCRAPED_JOBS.inc(len(jobs), site="ycombinator")
+    return jobs
+
+# Cursor that counts each statement it sends as a database round trip
+class CountingCursor(pg_cursor):
+    def execute(self, query, vars=None):
+        DB_ROUND_TRIPS.inc()
+        return super().execute(query, vars)
     
-    for job in company_data.job_data:
-        # Parse salary range if available
-        min_amount = None
-        max_amount = None
-        currency = None
-        interval = None
-        
-        if job.job_salary_range:
-            # Extract currency, min and max amount from salary range
-            # Example: "$200K - $240K    0.05% - 0.20%"
-            salary_parts = job.job_salary_range.split('-')
-            if len(salary_parts) >= 2:
-                min_salary = salary_parts[0].strip()
-                max_salary = salary_parts[1].strip().split(' ')[0].strip()
-                
-                # Extract currency
-                currency = None
-                if min_salary:
-                    # Handle common currency symbols
-                    if min_salary[0] in ['$', '€', '£', '₹', '¥', '₽', '₺', '₴', '₦', '₩', '₫', '₱', 'R', '฿', 'د.إ', '৳', '₪', 'RM', 'CHF', 'A$', 'C$', 'HK$', 'S$']:
-                        currency = min_salary[0]
-                    # Handle currency codes at the start
-                    elif len(min_salary) >= 3 and ' ' in min_salary:
-                        currency_code = min_salary.split(' ')[0]
-                        if currency_code in ['USD', 'EUR', 'GBP', 'INR', 'JPY', 'CNY', 'RUB', 'TRY', 'UAH', 'NGN', 'KRW', 'VND', 'PHP', 'ZAR', 'THB', 'AED', 'BDT', 'ILS', 'MYR', 'BRL', 'MXN', 'SGD', 'AUD', 'CAD', 'NZD']:
-                            currency = currency_code
-                if min_salary:
-                    # Clean up currency symbols and codes
-                    min_amount_str = min_salary
-                    if currency:
-                        if len(currency) == 1:
-                            min_amount_str = min_amount_str.replace(currency, '', 1).strip()
-                        else:
-                            # For currency codes (e.g., USD, EUR)
-                            min_amount_str = min_amount_str.replace(currency + ' ', '', 1).strip()
-                    
-                    try:
-                        if 'K' in min_amount_str:
-                            min_amount = float(min_amount_str.replace('K', '').strip()) * 1000
-                        elif 'M' in min_amount_str:
-                            min_amount = float(min_amount_str.replace('M', '').strip()) * 1000000
-                        else:
-                            # Remove any remaining non-numeric characters except decimal point
-                            min_amount_str = ''.join(c for c in min_amount_str if c.isdigit() or c == '.')
-                            if min_amount_str:
-                                min_amount = float(min_amount_str)
-                            else:
-                                min_amount = None
-                    except ValueError:
-                        print(f"Could not convert salary to float: {min_amount_str}")
-                        min_amount = None
-                
-                # Extract max amount (remove currency symbol and K/M)
-                if max_salary:
-                    # Clean up currency symbols and codes
-                    max_amount_str = max_salary
-                    if currency:
-                        if len(currency) == 1:
-                            max_amount_str = max_amount_str.replace(currency, '', 1).strip()
-                        else:
-                            # For currency codes (e.g., USD, EUR)
-                            max_amount_str = max_amount_str.replace(currency + ' ', '', 1).strip()
-                    
-                    try:
-                        if 'K' in max_amount_str:
-                            max_amount = float(max_amount_str.replace('K', '').strip()) * 1000
-                        elif 'M' in max_amount_str:
-                            max_amount = float(max_amount_str.replace('M', '').strip()) * 1000000
-                        else:
-                            # Remove any remaining non-numeric characters except decimal point
-                            max_amount_str = ''.join(c for c in max_amount_str if c.isdigit() or c == '.')
-                            if max_amount_str:
-                                max_amount = float(max_amount_str)
-                            else:
-                                max_amount = None
-                    except ValueError:
-                        print(f"Could not convert salary to float: {max_amount_str}")
-                        max_amount = None
-                
-                # Assume yearly salary if not specified
-                interval = "yearly"
-        
-        # Determine location and job type from tags
-        location = None
-        job_type = None
-        is_remote = False
-        experience_range = None
-        
-        if job.job_tags and len(job.job_tags) > 0:
-            for tag_list in job.job_tags:
-                for tag in tag_list:
-                    if 'Remote' in tag:
-                        is_remote = True
-                        # Don't set location to "Remote" - we'll use the actual location
-                    elif any(type_word in tag for type_word in ['Full-time', 'Part-time', 'Internship', 'Contract']):
-                        job_type = tag.strip()
-                    elif any(year in tag for year in ['years', 'year', '+', 'yr']):
-                        experience_range = tag.strip()
-                    elif location is None:  # If we haven't set location yet
-                        location = tag.strip()
-        
-        # Extract company information from tags
-        company_industry = None
-        company_size = None
-        company_location = None
-        
-        if company_data.company_tags:
-            for tag in company_data.company_tags:
-                if 'people' in tag:
-                    company_size = tag.strip()
-                elif any(loc in tag for loc in ['New York', 'San Francisco', 'Remote', 'London', 'Boston']):
-                    company_location = tag.strip()
-                else:
-                    company_industry = tag.strip()
-        
-        # Create job entry
-        job_entry = {
-            "job_id": job.job_url.split('/')[-1],
-            "site": "ycombinator",
-            "job_url": job.job_url,
-            "job_url_direct": job.job_url,
-            "title": job.job_title,
-            "company": company_data.company_name,
-            "location": location if location else company_location,  # Use job location or company location
-            "date_posted": None,  # YCombinator doesn't provide exact date
-            "job_type": job_type,
-            "salary_source": "ycombinator",
-            "interval": interval,
-            "min_amount": min_amount,
-            "max_amount": max_amount,
-            "currency": currency,
-            "is_remote": is_remote,
-            "job_level": None,
-            "job_function": None,
-            "listing_type": None,
-            "emails": None,
-            "description": job.job_description,
-            "company_industry": company_industry,
-            "company_url": next((link for link in company_data.company_social_links 
-                               if 'https://' in link and 'twitter' not in link and 'facebook' not in link), None),
-            "company_logo": company_data.company_image,
-            "company_url_direct": company_data.company_url,
-            "company_addresses": company_location,  # Use company location for addresses
-            "company_num_employees": company_size,
-            "company_revenue": None,
-            "company_description": company_data.company_description,
-            "skills": None,
-            "experience_range": experience_range,
-            "company_rating": None,
-            "company_reviews_count": None,
-            "vacancy_count": len(company_data.job_data),
-            "work_from_home_type": "remote" if is_remote else None,
-        }
-        
-        jobs_list.append(job_entry)
-    
-    return jobs_list
-
-# Function to connect to the database
-def get_db_connection():
-    conn = psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD
+    def executemany(self, query, vars_list):
+        DB_ROUND_TRIPS.inc()
+        return super().executemany(query, vars_list)
+
+# Connection whose cursors, commits and rollbacks count as round trips
+class CountingConnection(pg_connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = CountingCursor
+    
+    def commit(self):
+        DB_ROUND_TRIPS.inc()
+        return super().commit()
+    
+    def rollback(self):
+        DB_ROUND_TRIPS.inc()
+        return super().rollback()
+
+# Connection pool that counts the connections it opens
+class MonitoredConnectionPool(pg_pool.ThreadedConnectionPool):
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        with _db_pool_lock:
+            db_pool_stats["connections_created"] += 1
+        return conn
+
+_db_pool = None
+_db_pool_lock = threading.RLock()
+# Bounds concurrent checkouts so callers wait instead of getting PoolError
+_db_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_SIZE)
+# Last time each pooled connection was returned, keyed by id(conn)
+_db_pool_last_used = {}
+db_pool_stats = {
+    "checkouts": 0,
+    "timeouts": 0,
+    "connections_created": 0,
+    "connections_discarded": 0,
+    "health_check_failures": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+
+# Function to get the process-wide connection pool, creating it on first use
+def get_db_pool():
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = MonitoredConnectionPool(
+                    DB_POOL_MIN_SIZE,
+                    DB_POOL_MAX_SIZE,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    dbname=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    connection_factory=CountingConnection
+                )
+    return _db_pool
+
+# Function to take a connection from the pool, replacing dead ones
+def checkout_healthy_connection(db_pool):
+    while True:
+        conn = db_pool.getconn()
+        last_used = _db_pool_last_used.pop(id(conn), None)
+        if not conn.closed:
+            if last_used is None or time.monotonic() - last_used < DB_POOL_HEALTHCHECK_INTERVAL:
+                return conn
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+                conn.rollback()
+                return conn
+            except psycopg2.Error as e:
+                print(f"Discarding unhealthy database connection: {e}")
+        with _db_pool_lock:
+            db_pool_stats["health_check_failures"] += 1
+            db_pool_stats["connections_discarded"] += 1
+        db_pool.putconn(conn, close=True)
+
+# Context manager that borrows a pooled connection and returns it afterwards.
+# Open transactions are rolled back; broken connections are closed.
+@contextmanager
+def db_connection():
+    db_pool = get_db_pool()
+    
+    started = time.monotonic()
+    if not _db_pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        with _db_pool_lock:
+            db_pool_stats["timeouts"] += 1
+        raise pg_pool.PoolError(f"Timed out after {DB_POOL_TIMEOUT}s waiting for a database connection")
+    
+    conn = None
+    broken = False
+    try:
+        conn = checkout_healthy_connection(db_pool)
+        waited = time.monotonic() - started
+        with _db_pool_lock:
+            db_pool_stats["checkouts"] += 1
+            db_pool_stats["wait_seconds_total"] += waited
+            db_pool_stats["wait_seconds_max"] = max(db_pool_stats["wait_seconds_max"], waited)
+        DB_POOL_WAIT_SECONDS.observe(waited)
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        if conn is not None:
+            if not broken and not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            discard = broken or bool(conn.closed)
+            if discard:
+                with _db_pool_lock:
+                    db_pool_stats["connections_discarded"] += 1
+            else:
+                _db_pool_last_used[id(conn)] = time.monotonic()
+            db_pool.putconn(conn, close=discard)
+        _db_pool_slots.release()
+
+# Function to snapshot pool metrics
+def get_db_pool_metrics():
+    with _db_pool_lock:
+        metrics = dict(db_pool_stats)
+    metrics["min_size"] = DB_POOL_MIN_SIZE
+    metrics["max_size"] = DB_POOL_MAX_SIZE
+    if _db_pool is not None:
+        metrics["in_use"] = len(_db_pool._used)
+        metrics["idle"] = len(_db_pool._pool)
+    else:
+        metrics["in_use"] = 0
+        metrics["idle"] = 0
+    return metrics
+
+# Function to close every pooled connection, e.g. in a server's master
+# process before it forks workers (connections must not be shared)
+def close_db_pool():
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is not None:
+            _db_pool.closeall()
+            _db_pool = None
+            _db_pool_last_used.clear()
+
+# Columns matched by the substring search and available as field-scoped filters
+SEARCH_FIELDS = ("title", "company", "location")
+# Text search configuration used for the search_vector column and queries
+SEARCH_TEXT_CONFIG = "english"
+
+_company_columns_sql = ", ".join(
+    f"{col_name} {col_type}" for col_name, col_type in COLUMNS if col_name in COMPANY_COLUMNS
+)
+
+_trigram_index_statements = "\n            ".join(
+    f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_{col}_trgm_idx ON {TABLE_NAME} USING gin ({col} gin_trgm_ops);"
+    for col in SEARCH_FIELDS
+)
+
+# Schema migrations applied after the table exists, in order. Each entry is a
+# (name, statements) pair; applied names are recorded in schema_migrations.
+SCHEMA_MIGRATIONS = [
+    ("001_unique_job_url", [
+        # Drop duplicate URLs left by the old check-then-insert path, keeping the oldest row
+        f"""
+        DELETE FROM {TABLE_NAME} a USING {TABLE_NAME} b
+        WHERE a.job_url = b.job_url AND a.id > b.id
+        """,
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {TABLE_NAME}_job_url_key ON {TABLE_NAME} (job_url)",
+    ]),
+    ("002_search_vector", [
+        # Weighted full-text document maintained by Postgres on every write
+        f"""
+        ALTER TABLE {TABLE_NAME} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(company, '')), 'B') ||
+            setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(location, '')), 'C') ||
+            setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(description, '')), 'D')
+        ) STORED
+        """,
+        f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_search_vector_idx ON {TABLE_NAME} USING gin (search_vector)",
+    ]),
+    ("003_trigram_indexes", [
+        # Trigram indexes serve the substring (ILIKE) search. pg_trgm may not be
+        # installable without superuser rights, in which case ILIKE stays a scan.
+        f"""
+        DO $$
+        BEGIN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            {_trigram_index_statements}
+        EXCEPTION WHEN OTHERS THEN
+            RAISE NOTICE 'Skipping trigram indexes: %', SQLERRM;
+        END
+        $$
+        """,
+    ]),
+    ("004_filter_indexes", [
+        # Serve the structured filters and sorts of GET /jobs
+        f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_date_posted_idx ON {TABLE_NAME} (date_posted DESC NULLS LAST)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_site_date_posted_idx ON {TABLE_NAME} (site, date_posted DESC NULLS LAST)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_currency_min_amount_idx ON {TABLE_NAME} (currency, min_amount)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_currency_max_amount_idx ON {TABLE_NAME} (currency, max_amount)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_job_type_idx ON {TABLE_NAME} (job_type)",
+        # Remote jobs are a small, frequently queried slice
+        f"""
+        CREATE INDEX IF NOT EXISTS {TABLE_NAME}_remote_date_posted_idx
+        ON {TABLE_NAME} (date_posted DESC NULLS LAST) WHERE is_remote
+        """,
+        f"""
+        CREATE INDEX IF NOT EXISTS {TABLE_NAME}_remote_currency_min_amount_idx
+        ON {TABLE_NAME} (currency, min_amount) WHERE is_remote
+        """,
+    ]),
+    ("005_scrape_tasks", [
+        """
+        CREATE TABLE IF NOT EXISTS scrape_tasks (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            params JSONB NOT NULL,
+            progress JSONB,
+            result JSONB,
+            error TEXT,
+            worker TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS scrape_tasks_pending_idx ON scrape_tasks (created_at) WHERE status IN ('queued', 'running')",
+    ]),
+    ("006_companies", [
+        f"""
+        CREATE TABLE IF NOT EXISTS {COMPANY_TABLE_NAME} (
+            id SERIAL PRIMARY KEY,
+            site TEXT NOT NULL,
+            name TEXT NOT NULL,
+            {_company_columns_sql},
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            UNIQUE (site, name)
+        )
+        """,
+        f"ALTER TABLE {TABLE_NAME} ADD COLUMN IF NOT EXISTS company_id INTEGER REFERENCES {COMPANY_TABLE_NAME} (id)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_company_id_idx ON {TABLE_NAME} (company_id)",
+        # Backfill companies from existing jobs (latest row wins), link the
+        # jobs and drop their now-duplicated company payload
+        f"""
+        INSERT INTO {COMPANY_TABLE_NAME} (site, name, {', '.join(COMPANY_COLUMNS)})
+        SELECT DISTINCT ON (site, company) site, company, {', '.join(COMPANY_COLUMNS)}
+        FROM {TABLE_NAME}
+        WHERE site IS NOT NULL AND company IS NOT NULL
+        ORDER BY site, company, id DESC
+        ON CONFLICT (site, name) DO NOTHING
+        """,
+        f"""
+        UPDATE {TABLE_NAME} j SET company_id = c.id
+        FROM {COMPANY_TABLE_NAME} c
+        WHERE c.site = j.site AND c.name = j.company AND j.company_id IS NULL
+        """,
+        f"""
+        UPDATE {TABLE_NAME} SET {', '.join(f"{col} = NULL" for col in COMPANY_COLUMNS)}
+        WHERE company_id IS NOT NULL
+        """,
+    ]),
+    ("007_scrape_cache", [
+        """
+        CREATE TABLE IF NOT EXISTS scrape_cache (
+            key TEXT PRIMARY KEY,
+            params JSONB NOT NULL,
+            result JSONB NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            expires_at TIMESTAMPTZ NOT NULL,
+            last_used_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS scrape_cache_last_used_at_idx ON scrape_cache (last_used_at)",
+    ]),
+    ("008_scrape_watermarks", [
+        """
+        CREATE TABLE IF NOT EXISTS scrape_watermarks (
+            source_key TEXT PRIMARY KEY,
+            scope JSONB NOT NULL,
+            last_scraped_at TIMESTAMPTZ NOT NULL,
+            last_jobs_found INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scrape_seen_jobs (
+            source_key TEXT NOT NULL,
+            job_hash UUID NOT NULL,
+            first_seen_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (source_key, job_hash)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS scrape_seen_jobs_first_seen_at_idx ON scrape_seen_jobs (source_key, first_seen_at)",
+    ]),
+    ("009_scrape_schedules", [
+        """
+        CREATE TABLE IF NOT EXISTS scrape_schedules (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            params JSONB NOT NULL,
+            interval_seconds INTEGER NOT NULL CHECK (interval_seconds > 0),
+            enabled BOOLEAN NOT NULL DEFAULT true,
+            next_run_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            last_run_at TIMESTAMPTZ,
+            last_task_id TEXT,
+            skipped_runs INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS scrape_schedules_due_idx ON scrape_schedules (next_run_at) WHERE enabled",
+    ]),
+    ("010_job_dedup", [
+        # Every scraped posting, linked to the canonical job it was collapsed into
+        f"""
+        CREATE TABLE IF NOT EXISTS job_sources (
+            id SERIAL PRIMARY KEY,
+            job_id INTEGER NOT NULL REFERENCES {TABLE_NAME} (id) ON DELETE CASCADE,
+            site TEXT,
+            job_url TEXT NOT NULL UNIQUE,
+            source_job_id TEXT,
+            first_seen_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            last_seen_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS job_sources_job_id_idx ON job_sources (job_id)",
+        # Fingerprint and MinHash signature of each canonical job, and its LSH buckets
+        f"""
+        CREATE TABLE IF NOT EXISTS job_signatures (
+            job_id INTEGER PRIMARY KEY REFERENCES {TABLE_NAME} (id) ON DELETE CASCADE,
+            fingerprint TEXT,
+            company_key TEXT,
+            signature INTEGER[]
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS job_signatures_fingerprint_idx ON job_signatures (fingerprint)",
+        f"""
+        CREATE TABLE IF NOT EXISTS job_lsh_buckets (
+            band SMALLINT NOT NULL,
+            bucket BIGINT NOT NULL,
+            job_id INTEGER NOT NULL REFERENCES {TABLE_NAME} (id) ON DELETE CASCADE,
+            PRIMARY KEY (band, bucket, job_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS job_lsh_buckets_job_id_idx ON job_lsh_buckets (job_id)",
+        # Existing jobs are their own sources; backfill_dedup_index() adds their signatures
+        f"""
+        INSERT INTO job_sources (job_id, site, job_url, source_job_id)
+        SELECT id, site, job_url, job_id FROM {TABLE_NAME}
+        WHERE job_url IS NOT NULL
+        ON CONFLICT (job_url) DO NOTHING
+        """,
+    ]),
+    ("011_scraped_at_retention", [
+        # When a job was first stored and last returned by a scrape. The
+        # defaults are constant per statement, so existing rows are not
+        # rewritten; they get the migration time.
+        f"ALTER TABLE {TABLE_NAME} ADD COLUMN IF NOT EXISTS scraped_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+        f"ALTER TABLE {TABLE_NAME} ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+        # Rows are appended in scrape order, so a BRIN index serves scraped_at
+        # ranges at a fraction of a btree's size
+        f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_scraped_at_idx ON {TABLE_NAME} USING brin (scraped_at)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_last_seen_at_idx ON {TABLE_NAME} (last_seen_at)",
+        # Expired jobs, partitioned by month so old months are dropped whole
+        f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_NAME}_archive (
+            id INTEGER NOT NULL,
+            job_url TEXT,
+            site TEXT,
+            scraped_at TIMESTAMPTZ,
+            last_seen_at TIMESTAMPTZ,
+            archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            record JSONB NOT NULL
+        ) PARTITION BY RANGE (archived_at)
+        """,
+    ]),
+    # Precomputed counts and salary percentiles for GET /jobs/stats
+    ("012_job_stats_views", stats_view_statements(TABLE_NAME)),
+    ("013_job_stats_changes", change_counter_statements(TABLE_NAME)),
+]
+
+# Function to apply pending schema migrations
+def run_schema_migrations(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        name TEXT PRIMARY KEY,
+        applied_at TIMESTAMP NOT NULL DEFAULT now()
     )
-    return conn
+    """)
+    conn.commit()
+    
+    cursor.execute("SELECT name FROM schema_migrations")
+    applied = {row[0] for row in cursor.fetchall()}
+    
+    for name, statements in SCHEMA_MIGRATIONS:
+        if name in applied:
+            continue
+        try:
+            print(f"Applying schema migration {name}")
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            conn.commit()
+        except Exception as e:
+            # Later migrations may depend on this one, so stop here and retry next time
+            print(f"Error applying schema migration {name}: {e}")
+            conn.rollback()
+            break
+    
+    cursor.close()
 
 # Function to create the table if it doesn't exist
-def create_table_if_not_exists():
-    conn = get_db_connection()
+def create_table_if_not_exists(conn):
     cursor = conn.cursor()
     
     # Create columns string for CREATE TABLE
@@ -275,109 +969,398 @@ def create_table_if_not_exists():
         conn.commit()
     
     cursor.close()
-    conn.close()
+    
+    run_schema_migrations(conn)
 
-# Function to import CSV to database
-def import_csv_to_db(csv_file_path):
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+# Function to bootstrap the schema once per process
+def ensure_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with db_connection() as conn:
+            create_table_if_not_exists(conn)
+        _schema_ready = True
+
+# Strings accepted as booleans (compared lowercase)
+BOOL_STRINGS = {
+    'true': True, 't': True, 'yes': True, 'y': True, '1': True,
+    'false': False, 'f': False, 'no': False, 'n': False, '0': False,
+}
+
+# Convert a loosely-typed boolean value to a real boolean
+def coerce_bool(val):
+    if isinstance(val, str):
+        return BOOL_STRINGS.get(val.lower(), val)
+    return val
+
+# Function to derive a job_id from a job URL. It is stable across processes
+# and restarts, unlike hash(), which is salted per process.
+def stable_job_id(job_url, job_id_prefix):
+    return f"{job_id_prefix}-{hashlib.sha1(str(job_url).encode('utf-8')).hexdigest()[:16]}"
+
+# Function to turn a job record into a row tuple ordered like COLUMNS.
+# Returns None when the job should be skipped.
+def prepare_job_row(job, job_id_prefix="yc"):
+    # Make sure job_url exists
+    if not job.get('job_url'):
+        print(f"Skipping job without URL: {job.get('title')}")
+        return None
+
+    row = []
+    present = 0
+    for col_name, _ in COLUMNS:
+        val = job.get(col_name)
+
+        # Map 'id' column to 'job_id' if needed
+        if col_name == 'job_id' and job.get('id'):
+            val = str(job['id'])
+        # Generate a job_id based on job_url if missing
+        if col_name == 'job_id' and not val:
+            val = stable_job_id(job.get('job_url', ''), job_id_prefix)
+
+        if col_name == 'is_remote':
+            val = coerce_bool(val)
+
+        if val is not None:
+            present += 1
+        row.append(val)
+
+    # Skip jobs that don't have enough data
+    if present < 2:  # At least job_id and url should be present
+        print(f"Skipping job with insufficient data: {job.get('title')}")
+        return None
+
+    return tuple(row)
+
+# Function to build the ON CONFLICT clause for the given upsert mode. Both
+# modes refresh last_seen_at, "nothing" at most once per LAST_SEEN_RESOLUTION.
+def build_conflict_clause(on_conflict):
+    if on_conflict == "nothing":
+        return (f"ON CONFLICT (job_url) DO UPDATE SET last_seen_at = EXCLUDED.last_seen_at "
+                f"WHERE {TABLE_NAME}.last_seen_at < EXCLUDED.last_seen_at - interval '{LAST_SEEN_RESOLUTION}'")
+    if on_conflict == "update":
+        unknown = set(UPSERT_UPDATE_COLUMNS) - {col_name for col_name, _ in COLUMNS}
+        if unknown:
+            raise ValueError(f"Unknown UPSERT_UPDATE_COLUMNS: {', '.join(sorted(unknown))}")
+        # Keep the stored value when a re-scrape doesn't provide one. Company
+        # fields of linked jobs are refreshed on the company row and staged
+        # as NULL here, so only unlinked jobs update their own.
+        update_columns = list(UPSERT_UPDATE_COLUMNS) + ["company_id"]
+        assignments = ', '.join(
+            f"{col} = COALESCE(EXCLUDED.{col}, {TABLE_NAME}.{col})" for col in update_columns
+        )
+        return f"ON CONFLICT (job_url) DO UPDATE SET {assignments}, last_seen_at = EXCLUDED.last_seen_at"
+    raise ValueError(f"Unsupported on_conflict mode: {on_conflict} (expected one of {', '.join(UPSERT_MODES)})")
+
+# Function to insert one batch of rows. The batch is staged into a temporary
+# table with execute_values, its companies are upserted into
+# COMPANY_TABLE_NAME once, and the jobs are merged into TABLE_NAME with a
+# single upsert that links each job to its company. dedup_entries, from
+# resolve_duplicate_rows, adds the stored jobs to the dedup index in the
+# same transaction.
+# Returns (inserted, updated) counts.
+def insert_job_batch(conn, rows, on_conflict, dedup_entries=None):
+    column_names = [col_name for col_name, _ in COLUMNS]
+    columns_str = ', '.join(column_names)
+    stage_columns_str = ', '.join([f"{col[0]} {col[1]}" for col in COLUMNS])
+    company_columns_str = ', '.join(COMPANY_COLUMNS)
+    job_columns_str = ', '.join(JOB_TABLE_COLUMNS)
+    
+    # One row per URL (and per company) per batch; when updating, the last occurrence wins
+    stage_order = "stage_ord DESC" if on_conflict == "update" else "stage_ord"
+    
+    cursor = conn.cursor()
     try:
-        create_table_if_not_exists()
+        cursor.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {TABLE_NAME}_stage (
+            stage_ord SERIAL,
+            {stage_columns_str}
+        ) ON COMMIT DELETE ROWS
+        """)
+        execute_values(
+            cursor,
+            f"INSERT INTO {TABLE_NAME}_stage ({columns_str}) VALUES %s",
+            rows,
+            page_size=len(rows),
+        )
+        # Only rewrite a company row when one of its fields actually changes
+        cursor.execute(f"""
+        INSERT INTO {COMPANY_TABLE_NAME} AS c (site, name, {company_columns_str})
+        SELECT DISTINCT ON (site, company) site, company, {company_columns_str}
+        FROM {TABLE_NAME}_stage
+        WHERE site IS NOT NULL AND company IS NOT NULL
+        ORDER BY site, company, stage_ord DESC
+        ON CONFLICT (site, name) DO UPDATE SET
+            {', '.join(f"{col} = COALESCE(EXCLUDED.{col}, c.{col})" for col in COMPANY_COLUMNS)},
+            updated_at = now()
+        WHERE ({', '.join(f"c.{col}" for col in COMPANY_COLUMNS)})
+            IS DISTINCT FROM
+            ({', '.join(f"COALESCE(EXCLUDED.{col}, c.{col})" for col in COMPANY_COLUMNS)})
+        """)
+        # Jobs without a company row keep their company fields themselves.
+        # xmax is 0 for freshly inserted tuples and non-zero for updated ones
+        cursor.execute(f"""
+        INSERT INTO {TABLE_NAME} ({job_columns_str}, {company_columns_str}, company_id)
+        SELECT {', '.join(f"s.{col}" for col in JOB_TABLE_COLUMNS)},
+            {', '.join(f"CASE WHEN c.id IS NULL THEN s.{col} END" for col in COMPANY_COLUMNS)},
+            c.id FROM (
+            SELECT DISTINCT ON (job_url) * FROM {TABLE_NAME}_stage
+            ORDER BY job_url, {stage_order}
+        ) s
+        LEFT JOIN {COMPANY_TABLE_NAME} c ON c.site = s.site AND c.name = s.company
+        ORDER BY s.stage_ord
+        {build_conflict_clause(on_conflict)}
+        RETURNING (xmax = 0)
+        """)
+        results = cursor.fetchall()
+        if dedup_entries:
+            dedup_index.index(cursor, [dict(zip(column_names, row)) for row in rows], dedup_entries)
+        inserted = sum(1 for (is_insert,) in results if is_insert)
+        # Rows only touched for last_seen_at are not updates
+        updated = len(results) - inserted if on_conflict == "update" else 0
+        if inserted or updated:
+            mark_jobs_changed(cursor)
+        conn.commit()
+        return inserted, updated
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+dedup_index = PostgresDedupIndex(DEDUP_SIMILARITY, jobs_table=TABLE_NAME)
+
+# Function to split a batch of rows into rows to insert and postings that
+# duplicate a stored job or an earlier row of the batch.
+# Returns (rows, duplicates, dedup_entries).
+def resolve_duplicate_rows(conn, rows):
+    column_names = [col_name for col_name, _ in COLUMNS]
+    records = [dict(zip(column_names, row), row=row) for row in rows]
+    cursor = conn.cursor()
+    try:
+        canonical, duplicates, entries = dedup_index.resolve(cursor, records)
+    finally:
+        cursor.close()
+    return [record["row"] for record in canonical], duplicates, entries
+
+# Function to link duplicate postings to their canonical jobs.
+# Returns the number of new links.
+def link_duplicate_rows(conn, duplicates):
+    cursor = conn.cursor()
+    try:
+        merged = dedup_index.link(cursor, duplicates)
+        # A job seen through any of its postings is still live
+        cursor.execute(f"""
+        UPDATE {TABLE_NAME} SET last_seen_at = now()
+        WHERE job_url = ANY(%s) AND last_seen_at < now() - interval '{LAST_SEEN_RESOLUTION}'
+        """, (list({record["canonical_url"] for record in duplicates}),))
+        conn.commit()
+        return merged
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+# Function to refresh last_seen_at of stored jobs that a scrape returned
+# without ingesting them, such as postings an incremental scrape had already
+# seen. Both the postings (job_sources) and their canonical jobs count as
+# seen. Returns the number of jobs touched.
+def touch_seen_jobs(job_urls):
+    if not job_urls:
+        return 0
+    ensure_schema()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+            UPDATE job_sources SET last_seen_at = now()
+            WHERE job_url = ANY(%s) AND last_seen_at < now() - interval '{LAST_SEEN_RESOLUTION}'
+            """, (job_urls,))
+            cursor.execute(f"""
+            UPDATE {TABLE_NAME} SET last_seen_at = now()
+            WHERE (job_url = ANY(%s) OR id IN (SELECT job_id FROM job_sources WHERE job_url = ANY(%s)))
+            AND last_seen_at < now() - interval '{LAST_SEEN_RESOLUTION}'
+            """, (job_urls, job_urls))
+            touched = cursor.rowcount
+            conn.commit()
+            return touched
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+# Function to index stored jobs that the dedup index doesn't cover yet,
+# e.g. jobs saved before it existed. Existing duplicates are not merged.
+def backfill_dedup_index():
+    if not DEDUP_ENABLED:
+        return 0
+    ensure_schema()
+    indexed = dedup_index.backfill(db_connection)
+    if indexed:
+        print(f"Indexed {indexed} stored jobs for duplicate detection")
+    return indexed
+
+# Function to bulk insert job records in batches of INGEST_BATCH_SIZE.
+# A failing batch is rolled back and retried row by row so that a single bad
+# row only costs itself instead of the whole batch. With DEDUP_ENABLED,
+# near-duplicates of stored jobs (or of earlier rows) are not inserted but
+# linked to their canonical job as extra sources.
+# Returns (inserted, updated, skipped, merged) counts.
+def ingest_jobs(jobs, job_id_prefix="yc", batch_size=None, on_conflict=None):
+    batch_size = batch_size or INGEST_BATCH_SIZE
+    on_conflict = on_conflict or UPSERT_MODE
+    # Fail fast on a bad mode instead of once per batch
+    build_conflict_clause(on_conflict)
+    
+    rows = []
+    skipped_count = 0
+    with span("db.prepare_rows"):
+        for job in jobs:
+            row = prepare_job_row(job, job_id_prefix)
+            if row is None:
+                skipped_count += 1
+            else:
+                rows.append(row)
+    
+    url_index = [col_name for col_name, _ in COLUMNS].index('job_url')
+    inserted_count = 0
+    updated_count = 0
+    merged_count = 0
+    ensure_schema()
+    with db_connection() as conn:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            duplicates = []
+            dedup_entries = None
+            if DEDUP_ENABLED:
+                with span("db.dedup"):
+                    batch, duplicates, dedup_entries = resolve_duplicate_rows(conn, batch)
+            try:
+                with span("db.ingest_batch"):
+                    # Every row of the batch may have been a duplicate
+                    inserted, updated = insert_job_batch(conn, batch, on_conflict, dedup_entries) if batch else (0, 0)
+            except Exception as e:
+                print(f"Error inserting batch of {len(batch)} rows, retrying row by row: {e}")
+                INGEST_BATCH_RETRIES.inc()
+                inserted, updated = 0, 0
+                for row in batch:
+                    try:
+                        row_inserted, row_updated = insert_job_batch(conn, [row], on_conflict, dedup_entries)
+                        inserted += row_inserted
+                        updated += row_updated
+                    except Exception as row_error:
+                        print(f"Error inserting job: {row_error} - Job URL: {row[url_index]}")
+            inserted_count += inserted
+            updated_count += updated
+            skipped_count += len(batch) - inserted - updated
+            
+            # Link duplicates once their canonical rows exist. Postings linked
+            # by an earlier run count as skipped.
+            if duplicates:
+                try:
+                    merged = link_duplicate_rows(conn, duplicates)
+                except Exception as e:
+                    print(f"Error linking {len(duplicates)} duplicate jobs: {e}")
+                    merged = 0
+                merged_count += merged
+                skipped_count += len(duplicates) - merged
+    
+    INGEST_ROWS.inc(inserted_count, result="inserted")
+    INGEST_ROWS.inc(updated_count, result="updated")
+    INGEST_ROWS.inc(skipped_count, result="skipped")
+    INGEST_ROWS.inc(merged_count, result="merged")
+    if inserted_count or updated_count or merged_count:
+        job_stats.notify()
+    return inserted_count, updated_count, skipped_count, merged_count
+
+# Function to describe the outcome of an ingest run
+def format_ingest_result(inserted_count, updated_count, skipped_count, merged_count=0):
+    message = f"Imported {inserted_count} rows into database."
+    if updated_count:
+        message += f" Updated {updated_count} rows."
+    if merged_count:
+        message += f" Merged {merged_count} duplicates."
+    return message + f" Skipped {skipped_count} rows."
+
+# Function to normalize a JobSpy DataFrame to our schema with vectorized
+# column operations, returning JSON-ready records (NaN becomes None)
+def normalize_jobs_frame(df, job_id_prefix="js"):
+    with span("map.jobspy"):
+        df = df.copy()
         
-        # Read CSV file
-        df = pd.read_csv(csv_file_path, quoting=csv.QUOTE_NONNUMERIC, escapechar="\\")
+        # Move 'id' to 'job_id' for consistency with our schema
+        if 'job_id' not in df.columns:
+            df['job_id'] = None
+        if 'id' in df.columns:
+            has_id = df['id'].notna()
+            df['job_id'] = df['job_id'].astype(object)
+            df.loc[has_id, 'job_id'] = df.loc[has_id, 'id'].astype(str)
         
-        # Connect to database
-        conn = get_db_connection()
+        # Generate a job_id based on job_url if missing
+        if 'job_url' in df.columns:
+            missing_id = df['job_id'].isna() & df['job_url'].notna()
+            df.loc[missing_id, 'job_id'] = df.loc[missing_id, 'job_url'].map(
+                lambda url: stable_job_id(url, job_id_prefix)
+            )
         
-        # Insert rows
-        inserted_count = 0
-        skipped_count = 0
+        # Ensure the jobs have a site attribute
+        if 'site' not in df.columns:
+            df['site'] = 'jobspy'
+        df['site'] = df['site'].fillna('jobspy')
         
-        for _, row in df.iterrows():
-            # Each row gets its own transaction to avoid aborting everything on error
-            cursor = conn.cursor()
-            try:
-                # Move id to job_id if it exists
-                if 'id' in df.columns and not pd.isna(row.get('id')):
-                    row['job_id'] = str(row.get('id'))
-                
-                # Generate a unique job_id if not present
-                if pd.isna(row.get('job_id')) or not row.get('job_id'):
-                    # Generate job_id based on job_url if missing
-                    row['job_id'] = f"js-{abs(hash(str(row.get('job_url', ''))))}"
-                
-                # Add site column if missing
-                if 'site' not in df.columns or pd.isna(row.get('site')):
-                    row['site'] = 'jobspy'
-                
-                # Make sure job_url exists
-                if pd.isna(row.get('job_url')):
-                    print(f"Skipping row without URL: {row.get('title')}")
-                    skipped_count += 1
-                    continue
-                    
-                # Check if this exact job exists (by URL not just job_id)
-                cursor.execute(f"SELECT 1 FROM {TABLE_NAME} WHERE job_url = %s", (row.get('job_url'),))
-                if cursor.fetchone():
-                    print(f"Skipping existing job: {row.get('job_url')}")
-                    skipped_count += 1
-                    continue
-                    
-                # Build column names and placeholders
-                columns = []
-                placeholders = []
-                values = []
-                
-                # Get column names from our COLUMNS definition
-                column_names = [col_name for col_name, _ in COLUMNS]
-                
-                # Process each column that exists in our definition
-                for col_name in column_names:
-                    val = None
-                    
-                    # Map 'id' column to 'job_id' if needed
-                    if col_name == 'job_id' and 'id' in df.columns and not pd.isna(row.get('id')):
-                        val = str(row.get('id'))
-                    elif col_name in df.columns:
-                        val = row.get(col_name)
-                    
-                    if val is not None and not pd.isna(val):  # Only include non-null values
-                        # Convert boolean strings to actual booleans
-                        if col_name == 'is_remote' and isinstance(val, str):
-                            if val.lower() in ('true', 't', 'yes', 'y', '1'):
-                                val = True
-                            elif val.lower() in ('false', 'f', 'no', 'n', '0'):
-                                val = False
-                        
-                        columns.append(col_name)
-                        placeholders.append('%s')
-                        values.append(val)
-                
-                # Skip rows that don't have enough data
-                if len(columns) < 2:  # At least job_id and url should be present
-                    print(f"Skipping row with insufficient data: {row.get('title')}")
-                    skipped_count += 1
-                    continue
-                    
-                # Build and execute INSERT query
-                insert_query = f"""
-                INSERT INTO {TABLE_NAME} ({', '.join(columns)})
-                VALUES ({', '.join(placeholders)})
-                """
-                
-                cursor.execute(insert_query, values)
-                conn.commit()
-                inserted_count += 1
-                
-            except Exception as e:
-                print(f"Error processing row: {e}")
-                conn.rollback()
-                skipped_count += 1
-            finally:
-                cursor.close()
+        # Convert boolean strings to actual booleans
+        if 'is_remote' in df.columns and df['is_remote'].dtype == object:
+            coerced = df['is_remote'].astype('string').str.lower().map(BOOL_STRINGS)
+            df['is_remote'] = coerced.astype(object).where(coerced.notna(), df['is_remote'])
         
-        conn.close()
+        # Replace NaN with None and numpy scalars with Python values
+        return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+# Function to save a JobSpy DataFrame to the database straight from memory
+def save_jobs_frame_to_db(df, on_conflict=None):
+    try:
+        records = normalize_jobs_frame(df)
+        return format_ingest_result(*ingest_jobs(records, job_id_prefix="js", on_conflict=on_conflict))
+    
+    except Exception as e:
+        print(f"Error saving jobs to database: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return f"Error saving jobs to database: {str(e)}"
+
+# Function to write a jobs DataFrame to CSV
+def write_jobs_csv(df, csv_file_path):
+    try:
+        with span("csv.write"):
+            df.to_csv(csv_file_path, quoting=csv.QUOTE_NONNUMERIC, escapechar="\\", index=False)
+        print(f"Saved JobSpy results to {csv_file_path}")
+    except Exception as e:
+        print(f"Error writing {csv_file_path}: {str(e)}")
+
+# Function to write a jobs CSV in a background thread so it doesn't delay the
+# response. The thread is non-daemon, so the file is finished before exit.
+def write_jobs_csv_async(df, csv_file_path):
+    thread = threading.Thread(target=write_jobs_csv, args=(df, csv_file_path), name="csv-writer")
+    thread.start()
+    return thread
+
+# Function to import CSV to database
+def import_csv_to_db(csv_file_path, on_conflict=None):
+    try:
+        import pandas as pd
         
-        return f"Imported {inserted_count} rows into database. Skipped {skipped_count} rows."
+        # Read CSV file
+        df = pd.read_csv(csv_file_path, quoting=csv.QUOTE_NONNUMERIC, escapechar="\\")
+        
+        return save_jobs_frame_to_db(df, on_conflict=on_conflict)
     
     except Exception as e:
         print(f"Error importing CSV: {str(e)}")
@@ -386,90 +1369,9 @@ def import_csv_to_db(csv_file_path):
         return f"Error importing CSV: {str(e)}"
 
 # Function to save jobs data to database directly
-def save_jobs_to_db(jobs_data):
+def save_jobs_to_db(jobs_data, on_conflict=None, job_id_prefix="yc"):
     try:
-        create_table_if_not_exists()
-        
-        # Connect to database
-        conn = get_db_connection()
-        
-        # Insert rows
-        inserted_count = 0
-        skipped_count = 0
-        
-        for job in jobs_data:
-            # Each job gets its own transaction to avoid aborting everything on error
-            cursor = conn.cursor()
-            try:
-                # Move id to job_id if it exists
-                if 'id' in job and job['id']:
-                    job['job_id'] = str(job['id'])
-                    del job['id']  # Remove id to avoid confusion
-                
-                # Make sure job has a job_id
-                if not job.get('job_id'):
-                    job['job_id'] = f"yc-{abs(hash(str(job.get('job_url', ''))))}"
-                    
-                # Make sure job_url exists
-                if not job.get('job_url'):
-                    print(f"Skipping job without URL: {job.get('title')}")
-                    skipped_count += 1
-                    continue
-                    
-                # Check if this job URL already exists
-                cursor.execute(f"SELECT 1 FROM {TABLE_NAME} WHERE job_url = %s", (job.get('job_url'),))
-                if cursor.fetchone():
-                    print(f"Skipping existing job: {job.get('job_url')}")
-                    skipped_count += 1
-                    continue
-                    
-                # Build column names and placeholders
-                columns = []
-                placeholders = []
-                values = []
-                
-                column_names = [col_name for col_name, _ in COLUMNS]
-                
-                for col in column_names:
-                    val = job.get(col)
-                    if val is not None:  # Only include non-null values
-                        # Handle booleans properly
-                        if col == 'is_remote' and isinstance(val, str):
-                            if val.lower() in ('true', 't', 'yes', 'y', '1'):
-                                val = True
-                            elif val.lower() in ('false', 'f', 'no', 'n', '0'):
-                                val = False
-                        
-                        columns.append(col)
-                        placeholders.append('%s')
-                        values.append(val)
-                
-                # Skip jobs that don't have enough data
-                if len(columns) < 2:  # At least job_id and url should be present
-                    print(f"Skipping job with insufficient data: {job.get('title')}")
-                    skipped_count += 1
-                    continue
-                    
-                # Build and execute INSERT query
-                insert_query = f"""
-                INSERT INTO {TABLE_NAME} ({', '.join(columns)})
-                VALUES ({', '.join(placeholders)})
-                """
-                
-                cursor.execute(insert_query, values)
-                conn.commit()
-                inserted_count += 1
-                
-            except Exception as e:
-                print(f"Error inserting job: {e} - Job URL: {job.get('job_url')}")
-                conn.rollback()
-                skipped_count += 1
-            finally:
-                cursor.close()
-        
-        conn.close()
-        
-        return f"Imported {inserted_count} rows into database. Skipped {skipped_count} rows."
+        return format_ingest_result(*ingest_jobs(jobs_data, job_id_prefix=job_id_prefix, on_conflict=on_conflict))
     
     except Exception as e:
         print(f"Error saving jobs to database: {str(e)}")
@@ -477,107 +1379,1093 @@ def save_jobs_to_db(jobs_data):
         traceback.print_exc()
         return f"Error saving jobs to database: {str(e)}"
 
-@app.route('/scrape', methods=['POST'])
-def scrape():
-    """API endpoint to scrape jobs."""
-    data = request.json
+# How much of the scraped jobs a /scrape response echoes back
+JOBS_DATA_MODES = ("full", "summary", "none")
+# Fields kept per job with jobs_data=summary
+JOBS_SUMMARY_FIELDS = (
+    "job_id", "site", "job_url", "title", "company", "location", "date_posted",
+    "is_remote", "min_amount", "max_amount", "currency", "interval",
+)
+# Sites /scrape accepts in site_names: JobSpy's Site values plus Y Combinator.
+# Metrics labels and rate limiter state are keyed by site name, so unknown
+# names are rejected rather than passed through
+JOBSPY_SITES = (
+    "linkedin", "indeed", "zip_recruiter", "glassdoor", "google",
+    "bayt", "naukri", "bdjobs", "hellowork",
+)
+SCRAPE_SITES = JOBSPY_SITES + ("ycombinator",)
+# Columnar bodies /scrape can return instead of JSON
+SCRAPE_RESPONSE_FORMATS = ("json", "arrow", "parquet")
+
+# Function to validate a /scrape request body and fill in defaults.
+# Returns a JSON-serializable params dict; raises RequestParamError.
+def parse_scrape_request(data):
+    if not isinstance(data, dict):
+        raise RequestParamError("Request body must be a JSON object")
     
     # Extract parameters with defaults
-    site_names = data.get('site_names', ["indeed", "linkedin", "google"])
     search_term = data.get('search_term', "")
-    google_search_term = data.get('google_search_term', f"{search_term} jobs")
-    location = data.get('location', "")
-    results_wanted = data.get('results_wanted', 100)
-    hours_old = data.get('hours_old', 72)
-    country_indeed = data.get('country_indeed', "usa")  # Default to usa if not provided
-    linkedin_fetch_description = data.get('linkedin_fetch_description', True)
-    output_csv = data.get('output_csv', "jobs.csv")
-    save_to_db = data.get('save_to_db', False)
-    company_name = data.get('company_name')  # For YCombinator
+    params = {
+        "site_names": data.get('site_names', ["indeed", "linkedin", "google"]),
+        "search_term": search_term,
+        "google_search_term": data.get('google_search_term', f"{search_term} jobs"),
+        "location": data.get('location', ""),
+        "results_wanted": data.get('results_wanted', 100),
+        "hours_old": data.get('hours_old', 72),
+        "country_indeed": data.get('country_indeed', "usa"),  # Default to usa if not provided
+        "linkedin_fetch_description": data.get('linkedin_fetch_description', True),
+        "output_csv": data.get('output_csv'),  # Optional CSV copy of the JobSpy results
+        "save_to_db": data.get('save_to_db', False),
+        "company_name": data.get('company_name', data.get('company_names')),  # For YCombinator
+        "on_conflict": data.get('on_conflict', UPSERT_MODE),
+        "cache": data.get('cache', "use"),
+        "incremental": data.get('incremental', SCRAPE_INCREMENTAL),
+        "jobs_data": data.get('jobs_data', "full"),
+    }
+    site_names = params["site_names"]
     
     # Validate required parameters
-    if not search_term and 'ycombinator' not in site_names:
-        return jsonify({"error": "search_term is required"}), 400
-    if not location and 'ycombinator' not in site_names:
-        return jsonify({"error": "location is required"}), 400
-    if 'ycombinator' in site_names and not company_name:
-        return jsonify({"error": "company_name is required for YCombinator scraping"}), 400
+    if not isinstance(site_names, list) or not site_names or not all(
+        isinstance(site, str) for site in site_names
+    ):
+        raise RequestParamError("site_names must be a non-empty list of site names")
+    unknown_sites = sorted(set(site_names) - set(SCRAPE_SITES))
+    if unknown_sites:
+        raise RequestParamError(
+            f"Unknown site_names: {', '.join(unknown_sites)}. "
+            f"Supported sites: {', '.join(SCRAPE_SITES)}"
+        )
+    if not params["search_term"] and 'ycombinator' not in site_names:
+        raise RequestParamError("search_term is required")
+    if not params["location"] and 'ycombinator' not in site_names:
+        raise RequestParamError("location is required")
+    if 'ycombinator' in site_names and not params["company_name"]:
+        raise RequestParamError("company_name is required for YCombinator scraping")
+    if isinstance(params["company_name"], list) and not all(
+        isinstance(name, str) and name for name in params["company_name"]
+    ):
+        raise RequestParamError("company_name must be a string or a list of strings")
+    if params["on_conflict"] not in UPSERT_MODES:
+        raise RequestParamError(f"on_conflict must be one of: {', '.join(UPSERT_MODES)}")
+    if params["cache"] not in CACHE_MODES:
+        raise RequestParamError(f"cache must be one of: {', '.join(CACHE_MODES)}")
+    if not isinstance(params["incremental"], bool):
+        raise RequestParamError("incremental must be true or false")
+    if params["jobs_data"] not in JOBS_DATA_MODES:
+        raise RequestParamError(f"jobs_data must be one of: {', '.join(JOBS_DATA_MODES)}")
     
+    return params
+
+# Function to call JobSpy, imported on first use (see Scraper)
+def scrape_jobs(**kwargs):
+    from jobspy import scrape_jobs as jobspy_scrape_jobs
+    return jobspy_scrape_jobs(**kwargs)
+
+# Function to scrape a single JobSpy site into a DataFrame
+def scrape_jobspy_site(site, params):
+    with span(f"scrape.{site}"):
+        try:
+            df = scrape_jobs(
+                site_name=[site],
+                search_term=params["search_term"],
+                google_search_term=params["google_search_term"],
+                location=params["location"],
+                results_wanted=params["results_wanted"],
+                hours_old=params["hours_old"],
+                country_indeed=params["country_indeed"],
+                linkedin_fetch_description=params["linkedin_fetch_description"],
+            )
+        except Exception:
+            SCRAPE_CALLS.inc(site=site, status="error")
+            raise
+    SCRAPE_CALLS.inc(site=site, status="success")
+    SCRAPED_JOBS.inc(len(df), site=site)
+    return df
+
+# Function to run scrape sources concurrently on a bounded thread pool.
+# sources is a list of (name, callable) pairs; yields (name, result, error,
+# seconds) as each source finishes. A source still running after
+# SCRAPE_SOURCE_TIMEOUT seconds is reported as timed out and abandoned (its
+# thread cannot be interrupted, but its result is ignored).
+def run_scrape_sources(sources, max_workers=None, timeout=None):
+    max_workers = max_workers or SCRAPE_MAX_CONCURRENCY
+    timeout = timeout or SCRAPE_SOURCE_TIMEOUT
+    started = {}
+    
+    def run_source(name, func):
+        started[name] = time.monotonic()
+        return func()
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape-source")
     try:
-        all_jobs = []
-        
-        # Scrape jobs from JobSpy supported sites
-        jobspy_sites = [site for site in site_names if site != 'ycombinator']
-        if jobspy_sites:
-            print(f"Scraping JobSpy sites: {jobspy_sites}")
-            jobs = scrape_jobs(
-                site_name=jobspy_sites,
-                search_term=search_term,
-                google_search_term=google_search_term,
-                location=location,
-                results_wanted=results_wanted,
-                hours_old=hours_old,
-                country_indeed=country_indeed,
-                linkedin_fetch_description=linkedin_fetch_description,
+        # Each source runs in a copy of the caller's context so its spans are
+        # added to the caller's request profile
+        pending = {
+            executor.submit(contextvars.copy_context().run, run_source, name, func): name
+            for name, func in sources
+        }
+        while pending:
+            done, _ = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in done:
+                name = pending.pop(future)
+                seconds = now - started.get(name, now)
+                try:
+                    yield name, future.result(), None, seconds
+                except Exception as e:
+                    yield name, None, str(e), seconds
+            for future, name in list(pending.items()):
+                if name in started and now - started[name] > timeout:
+                    del pending[future]
+                    yield name, None, f"Timed out after {timeout}s", now - started[name]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Function to canonicalize free text the job boards treat case- and
+# whitespace-insensitively
+def canonical_text(text):
+    return " ".join(str(text or "").split()).lower()
+
+# Function to normalize scrape parameters into the cache key payload. Only
+# parameters that change what is scraped are included, and values that don't
+# matter to the job boards (case, whitespace, list order) are canonicalized.
+def scrape_cache_params(params):
+    canonical = canonical_text
+    site_names = sorted(set(params["site_names"]))
+    cache_params = {"site_names": site_names}
+    if any(site != 'ycombinator' for site in site_names):
+        cache_params.update(
+            search_term=canonical(params["search_term"]),
+            google_search_term=canonical(params["google_search_term"]),
+            location=canonical(params["location"]),
+            results_wanted=params["results_wanted"],
+            hours_old=params["hours_old"],
+            country_indeed=canonical(params["country_indeed"]),
+            linkedin_fetch_description=bool(params["linkedin_fetch_description"]),
+        )
+    if 'ycombinator' in site_names:
+        company_names = params["company_name"]
+        if isinstance(company_names, str):
+            company_names = [company_names]
+        cache_params["company_name"] = sorted(set(canonical(name) for name in company_names))
+    return cache_params
+
+_scrape_cache = None
+_scrape_cache_lock = threading.Lock()
+
+# Function to get the scrape result cache, creating it on first use.
+# Returns None when SCRAPE_CACHE_BACKEND is "none".
+def get_scrape_cache():
+    global _scrape_cache
+    if _scrape_cache is None and SCRAPE_CACHE_BACKEND != "none":
+        with _scrape_cache_lock:
+            if _scrape_cache is None:
+                if SCRAPE_CACHE_BACKEND == "postgres":
+                    ensure_schema()
+                    _scrape_cache = PostgresScrapeCache(
+                        db_connection,
+                        dumps=app.json.dumps,
+                        ttl=SCRAPE_CACHE_TTL,
+                        max_entries=SCRAPE_CACHE_MAX_ENTRIES
+                    )
+                elif SCRAPE_CACHE_BACKEND == "memory":
+                    _scrape_cache = MemoryScrapeCache(
+                        ttl=SCRAPE_CACHE_TTL,
+                        max_entries=SCRAPE_CACHE_MAX_ENTRIES
+                    )
+                else:
+                    raise ValueError(f"Unsupported SCRAPE_CACHE_BACKEND: {SCRAPE_CACHE_BACKEND}")
+    return _scrape_cache
+
+_watermark_store = None
+_watermark_store_lock = threading.Lock()
+
+# Function to get the incremental scrape watermark store, creating it on first use
+def get_watermark_store():
+    global _watermark_store
+    if _watermark_store is None:
+        with _watermark_store_lock:
+            if _watermark_store is None:
+                ensure_schema()
+                _watermark_store = PostgresWatermarkStore(
+                    db_connection,
+                    seen_retention_days=SCRAPE_SEEN_RETENTION_DAYS
+                )
+    return _watermark_store
+
+# Function to describe the scope an incremental high-water mark applies to:
+# a JobSpy site with its search, or a single YC company
+def incremental_scope(params, site, company_name=None):
+    if site == 'ycombinator':
+        return {"site": site, "company": canonical_text(company_name)}
+    return {
+        "site": site,
+        "search_term": canonical_text(params["search_term"]),
+        "google_search_term": canonical_text(params["google_search_term"]),
+        "location": canonical_text(params["location"]),
+        "country_indeed": canonical_text(params["country_indeed"]),
+    }
+
+# Function to list the job URLs in a source result (a JobSpy DataFrame or a
+# list of YC jobs)
+def result_job_urls(result):
+    if isinstance(result, list):
+        return [job.get('job_url') for job in result if job.get('job_url')]
+    return result['job_url'].dropna().tolist() if 'job_url' in result.columns else []
+
+# Function to scrape every source of a request. Every JobSpy site and YC
+# company is a separate source scraped concurrently; the outcome of each is
+# reported under "sources". Returns a JSON-serializable dict so it can be cached.
+# If watermarks is a dict, the scrape is incremental: JobSpy sites only fetch
+# the hours since their last scrape, jobs a source already returned are
+# dropped, and the pending high-water mark of each source is added to
+# watermarks for the caller to record once the jobs are safely handled.
+def scrape_sources(params, progress, watermarks=None):
+    site_names = params["site_names"]
+    incremental = watermarks is not None
+    
+    scopes = {}
+    jobspy_sites = list(dict.fromkeys(site for site in site_names if site != 'ycombinator'))
+    for site in jobspy_sites:
+        scopes[site] = incremental_scope(params, site)
+    if 'ycombinator' in site_names:
+        company_names = params["company_name"]
+        if isinstance(company_names, str):
+            company_names = [company_names]
+        for company_name in dict.fromkeys(company_names):
+            scopes[f"ycombinator:{company_name}"] = incremental_scope(params, 'ycombinator', company_name)
+    
+    source_keys = {name: source_key(scope) for name, scope in scopes.items()}
+    last_scraped = get_watermark_store().get(source_keys.values()) if incremental else {}
+    started_at = datetime.now(timezone.utc)
+    
+    sources = []
+    windows = {}
+    for site in jobspy_sites:
+        site_params = params
+        if incremental:
+            windows[site] = delta_hours(
+                last_scraped.get(source_keys[site]),
+                params["hours_old"],
+                SCRAPE_INCREMENTAL_OVERLAP_HOURS
             )
-            
-            print(f"Found {len(jobs)} jobs from JobSpy")
-            
-            # Ensure the jobs have a site attribute
-            jobs_dict = jobs.to_dict(orient='records')
-            for job in jobs_dict:
-                if 'site' not in job or not job['site']:
-                    job['site'] = 'jobspy'
-                
-                # Move 'id' to 'job_id' for consistency with our schema
-                if 'id' in job and job['id']:
-                    job['job_id'] = str(job['id'])
-            
-            # Save JobSpy results to CSV
-            jobs.to_csv(output_csv, quoting=csv.QUOTE_NONNUMERIC, escapechar="\\", index=False)
-            print(f"Saved JobSpy results to {output_csv}")
-            
-            all_jobs.extend(jobs_dict)
-        
-        # Scrape YCombinator jobs if requested
-        ycombinator_jobs = []
-        if 'ycombinator' in site_names:
-            print(f"Scraping YCombinator jobs for company: {company_name}")
-            ycombinator_jobs = scrape_ycombinator_jobs(company_name)
-            print(f"Found {len(ycombinator_jobs)} jobs from YCombinator")
-            all_jobs.extend(ycombinator_jobs)
+            site_params = dict(params, hours_old=windows[site])
+        sources.append((site, lambda site=site, site_params=site_params: site_limiter.call(
+            site, lambda: scrape_jobspy_site(site, site_params)
+        )))
+    for name, scope in scopes.items():
+        if scope["site"] == 'ycombinator':
+            company_name = name.split(":", 1)[1]
+            sources.append((name, lambda company_name=company_name: site_limiter.call(
+                'ycombinator', lambda: scrape_ycombinator_jobs(company_name)
+            )))
+    
+    print(f"Scraping {len(sources)} sources: {[name for name, _ in sources]}")
+    progress("scraping", completed=0, total=len(sources), jobs_found=0)
+    
+    jobspy_frames = {}
+    ycombinator_jobs = []
+    source_results = {}
+    jobs_found = 0
+    for name, result, error, seconds in run_scrape_sources(sources):
+        if error is not None:
+            print(f"Error scraping {name}: {error}")
+            source_results[name] = {"status": "error", "error": error, "seconds": round(seconds, 3)}
+        else:
+            source_result = {"status": "success"}
+            if incremental:
+                # Drop postings this source already returned in an earlier run
+                key = source_keys[name]
+                job_urls = result_job_urls(result)
+                unseen = get_watermark_store().filter_unseen(key, job_urls)
+                scraped_count = len(result)
+                if isinstance(result, list):
+                    result = [job for job in result if job.get('job_url') in unseen]
+                elif 'job_url' in result.columns:
+                    result = result[result['job_url'].isin(unseen)]
+                watermarks[name] = {
+                    "key": key,
+                    "scope": scopes[name],
+                    "scraped_at": started_at,
+                    "job_urls": sorted(unseen),
+                    "seen_job_urls": sorted(set(job_urls) - set(unseen)),
+                    "jobs_scraped": scraped_count,
+                    "jobs_found": len(result),
+                }
+                source_result["seen_skipped"] = scraped_count - len(result)
+                if name in windows:
+                    source_result["hours_old"] = windows[name]
+            if name in jobspy_sites:
+                jobspy_frames[name] = result
+            else:
+                ycombinator_jobs.extend(result)
+            print(f"Found {len(result)} jobs from {name} in {seconds:.1f}s")
+            source_result.update(jobs_found=len(result), seconds=round(seconds, 3))
+            source_results[name] = source_result
+            jobs_found += len(result)
+        progress("scraping", completed=len(source_results), total=len(sources), jobs_found=jobs_found)
+    
+    if sources and all(result["status"] == "error" for result in source_results.values()):
+        raise RuntimeError("All sources failed: " + "; ".join(
+            f"{name}: {result['error']}" for name, result in source_results.items()
+        ))
+    
+    # Combine JobSpy results in the requested site order
+    jobspy_jobs = []
+    jobspy_scraped = [jobspy_frames[site] for site in jobspy_sites if site in jobspy_frames]
+    if jobspy_scraped:
+        import pandas as pd
+        jobspy_jobs = normalize_jobs_frame(pd.concat(jobspy_scraped, ignore_index=True))
+    
+    return {
+        "jobspy_jobs": jobspy_jobs,
+        "ycombinator_jobs": ycombinator_jobs,
+        "sources": source_results,
+    }
+
+# Function to run a scrape described by parse_scrape_request params.
+# Results of complete scrapes are cached by their normalized parameters;
+# params["cache"] selects whether a cached result is used, refreshed or bypassed.
+# Incremental scrapes (params["incremental"]) skip the cache and advance each
+# source's high-water mark once its new jobs are saved to the database.
+# report_progress, if given, is called with a dict as sources complete.
+def run_scrape(params, report_progress=None):
+    def progress(stage, **details):
+        if report_progress:
+            report_progress({"stage": stage, **details})
+    
+    output_csv = params["output_csv"]
+    on_conflict = params["on_conflict"]
+    cache_mode = params.get("cache", "use")
+    incremental = params.get("incremental", False)
+    
+    # Incremental results depend on stored watermarks, not just the parameters
+    cache = get_scrape_cache() if cache_mode != "bypass" and not incremental else None
+    cache_params = scrape_cache_params(params)
+    key = cache_key(cache_params)
+    cache_status = "bypass" if cache is None else cache_mode
+    
+    scraped = None
+    if cache is not None and cache_mode == "use":
+        cached = cache.get(key)
+        if cached is not None:
+            scraped, age = cached
+            cache_status = "hit"
+            print(f"Serving cached scrape results ({age:.0f}s old)")
+        else:
+            cache_status = "miss"
+    SCRAPE_CACHE_LOOKUPS.inc(result=cache_status)
+    
+    watermarks = {} if incremental else None
+    if scraped is None:
+        scraped = scrape_sources(params, progress, watermarks=watermarks)
+        # Partial results are not cached, so failed sources are retried next time
+        complete = all(result["status"] == "success" for result in scraped["sources"].values())
+        if cache is not None and complete:
+            try:
+                cache.set(key, cache_params, scraped)
+            except Exception as e:
+                print(f"Error caching scrape results: {str(e)}")
+    
+    jobspy_jobs = scraped["jobspy_jobs"]
+    ycombinator_jobs = scraped["ycombinator_jobs"]
+    all_jobs = jobspy_jobs + ycombinator_jobs
+    
+    # CSV output is an optional side artifact written in the background
+    if jobspy_jobs and output_csv:
+        import pandas as pd
+        write_jobs_csv_async(pd.DataFrame(jobspy_jobs), output_csv)
+    
+    # Save to database if requested
+    db_result = None
+    save_failed = False
+    if params["save_to_db"]:
+        progress("saving", jobs_found=len(all_jobs))
+        if jobspy_jobs:
+            print(f"Saving {len(jobspy_jobs)} JobSpy jobs to database")
+            db_result = save_jobs_to_db(jobspy_jobs, on_conflict=on_conflict, job_id_prefix="js")
+            save_failed = db_result.startswith("Error")
+            print(f"JobSpy DB import result: {db_result}")
         
-        # Save to database if requested
-        db_result = None
-        if save_to_db:
-            if jobspy_sites:
-                print(f"Saving JobSpy jobs to database from {output_csv}")
-                db_result = import_csv_to_db(output_csv)
-                print(f"JobSpy DB import result: {db_result}")
-            
-            if ycombinator_jobs:
-                print(f"Saving {len(ycombinator_jobs)} YCombinator jobs to database")
-                db_result_yc = save_jobs_to_db(ycombinator_jobs)
-                print(f"YCombinator DB import result: {db_result_yc}")
-                if db_result:
-                    db_result += f" {db_result_yc}"
+        if ycombinator_jobs:
+            print(f"Saving {len(ycombinator_jobs)} YCombinator jobs to database")
+            db_result_yc = save_jobs_to_db(ycombinator_jobs, on_conflict=on_conflict)
+            save_failed = save_failed or db_result_yc.startswith("Error")
+            print(f"YCombinator DB import result: {db_result_yc}")
+            if db_result:
+                db_result += f" {db_result_yc}"
+            else:
+                db_result = db_result_yc
+    
+    # Postings an incremental scrape dropped as already seen are still listed;
+    # keep their jobs from expiring (see JOB_RETENTION_DAYS)
+    if watermarks:
+        seen_job_urls = sorted({url for watermark in watermarks.values() for url in watermark["seen_job_urls"]})
+        try:
+            touch_seen_jobs(seen_job_urls)
+        except Exception as e:
+            print(f"Error refreshing last_seen_at of seen jobs: {str(e)}")
+    
+    # Advance the high-water marks only once the new jobs are stored, so a
+    # skipped or failed save is retried by the next incremental run. A source
+    # that failed or returned nothing at all (possibly a silent failure)
+    # keeps its watermark too.
+    if watermarks and params["save_to_db"] and not save_failed:
+        store = get_watermark_store()
+        for name, watermark in watermarks.items():
+            if scraped["sources"][name]["status"] != "success" or not watermark["jobs_scraped"]:
+                continue
+            try:
+                store.record(
+                    watermark["key"],
+                    watermark["scope"],
+                    watermark["scraped_at"],
+                    watermark["job_urls"],
+                    watermark["jobs_found"]
+                )
+            except Exception as e:
+                print(f"Error recording scrape watermark: {str(e)}")
+    
+    progress("done", jobs_found=len(all_jobs))
+    result = {
+        "status": "success",
+        "jobs_found": len(all_jobs),
+        "jobs_data": all_jobs,
+        "sources": scraped["sources"],
+        "cache": cache_status,
+        "csv_path": output_csv if jobspy_jobs and output_csv else None,
+        "db_result": db_result
+    }
+    
+    # Large descriptions dominate the payload; callers can ask for less
+    jobs_data_mode = params.get("jobs_data", "full")
+    if jobs_data_mode == "summary":
+        result["jobs_data"] = [
+            {field: job.get(field) for field in JOBS_SUMMARY_FIELDS} for job in all_jobs
+        ]
+    elif jobs_data_mode == "none":
+        del result["jobs_data"]
+    return result
+
+_scrape_queue = None
+_scrape_workers = None
+_scrape_queue_lock = threading.Lock()
+
+# Function to get the scrape task queue and its worker pool, creating them on first use
+def get_scrape_queue():
+    global _scrape_queue, _scrape_workers
+    if _scrape_queue is None:
+        with _scrape_queue_lock:
+            if _scrape_queue is None:
+                if SCRAPE_QUEUE_BACKEND == "postgres":
+                    ensure_schema()
+                    queue = PostgresScrapeQueue(
+                        db_connection,
+                        dumps=app.json.dumps,
+                        stale_after=SCRAPE_TASK_STALE_AFTER
+                    )
+                elif SCRAPE_QUEUE_BACKEND == "memory":
+                    queue = MemoryScrapeQueue()
                 else:
-                    db_result = db_result_yc
+                    raise ValueError(f"Unsupported SCRAPE_QUEUE_BACKEND: {SCRAPE_QUEUE_BACKEND}")
+                _scrape_workers = ScrapeWorkerPool(queue, run_scrape, size=SCRAPE_WORKERS)
+                _scrape_queue = queue
+    return _scrape_queue
+
+# Function to start the background scrape workers of this process
+def start_scrape_workers():
+    get_scrape_queue()
+    if SCRAPE_WORKERS > 0:
+        _scrape_workers.start()
+
+_schedule_store = None
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+# Function to get the stored scrape schedules and the scheduler that enqueues
+# them, creating them on first use
+def get_schedule_store():
+    global _schedule_store, _scheduler
+    if _schedule_store is None:
+        with _scheduler_lock:
+            if _schedule_store is None:
+                ensure_schema()
+                store = PostgresScheduleStore(db_connection, dumps=app.json.dumps)
+                _scheduler = ScrapeScheduler(store, get_scrape_queue(), poll_interval=SCHEDULER_POLL_INTERVAL)
+                _schedule_store = store
+    return _schedule_store
+
+# Function to start the scrape scheduler of this process
+def start_scheduler():
+    get_schedule_store()
+    if SCHEDULER_ENABLED:
+        _scheduler.start()
+
+job_retention = PostgresJobRetention(
+    db_connection,
+    jobs_table=TABLE_NAME,
+    retention_days=JOB_RETENTION_DAYS,
+    archive=JOB_RETENTION_ARCHIVE,
+    archive_retention_months=JOB_ARCHIVE_RETENTION_MONTHS,
+    interval=JOB_RETENTION_INTERVAL,
+    vacuum_tables=(TABLE_NAME, "job_sources", "job_signatures", "job_lsh_buckets") if JOB_RETENTION_VACUUM else (),
+    on_expired=mark_jobs_changed,
+)
+
+# Function to start expiring stale jobs in this process, if JOB_RETENTION_DAYS is set
+def start_job_retention():
+    if JOB_RETENTION_DAYS > 0:
+        ensure_schema()
+        job_retention.start()
+
+job_stats = PostgresJobStats(
+    db_connection,
+    jobs_table=TABLE_NAME,
+    interval=JOB_STATS_REFRESH_INTERVAL,
+    min_interval=JOB_STATS_MIN_REFRESH_INTERVAL,
+)
+
+# Function to start refreshing the job stats views in this process. With
+# JOB_STATS_REFRESH_INTERVAL=0 it only refreshes after this process's
+# ingests (which also start it in processes that didn't).
+def start_job_stats():
+    ensure_schema()
+    job_stats.start()
+
+# Function to bring the job stats views up to date now, e.g. at startup so
+# processes that never ingest (APP_PROFILE=query) don't serve stale stats
+# left by writers that stopped before refreshing. Returns whether it refreshed.
+def refresh_job_stats():
+    ensure_schema()
+    return job_stats.refresh()
+
+# Function to stop this process's scheduler, job retention, stats refresher and scrape workers,
+# waiting up to timeout seconds for each running task. Interrupted
+# Postgres-queued tasks are picked up again once SCRAPE_TASK_STALE_AFTER passes.
+def stop_background_workers(timeout=None):
+    if _scheduler is not None:
+        _scheduler.stop(timeout)
+    job_retention.stop(timeout)
+    job_stats.stop(timeout)
+    if _scrape_workers is not None:
+        _scrape_workers.stop(timeout)
+
+# Function to validate a schedule body for POST /schedules (or, with
+# partial=True, PATCH /schedules/<id>). Returns the fields to store.
+def parse_schedule_request(data, partial=False):
+    if not isinstance(data, dict):
+        raise RequestParamError("Request body must be a JSON object")
+    
+    fields = {}
+    if "name" in data or not partial:
+        name = data.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise RequestParamError("name must be a non-empty string")
+        fields["name"] = name.strip()
+    if "interval_seconds" in data or not partial:
+        interval = data.get("interval_seconds")
+        if isinstance(interval, bool) or not isinstance(interval, int) or interval <= 0:
+            raise RequestParamError("interval_seconds must be a positive integer")
+        fields["interval_seconds"] = interval
+    if "params" in data or not partial:
+        params = data.get("params")
+        # Scheduled runs fetch fresh results (and refresh the cache) by default
+        if isinstance(params, dict):
+            params = {"cache": "refresh", **params}
+        fields["params"] = parse_scrape_request(params)
+    if "enabled" in data:
+        if not isinstance(data["enabled"], bool):
+            raise RequestParamError("enabled must be true or false")
+        fields["enabled"] = data["enabled"]
+    # Run at the next scheduler poll instead of waiting for next_run_at
+    if data.get("run_now"):
+        fields["next_run_at"] = datetime.now(timezone.utc)
+    return fields
+
+# Function to add the status of a schedule's most recent run
+def with_last_task_status(schedule):
+    task = get_scrape_queue().get(schedule["last_task_id"]) if schedule["last_task_id"] else None
+    schedule["last_task_status"] = task["status"] if task else None
+    return schedule
+
+# Endpoints served by the scrape pool; every other endpoint is a query
+SCRAPE_POOL_ENDPOINTS = ("scrape_api.scrape", "scrape_api.scrape_ycombinator_batch")
+_scrape_inflight = threading.BoundedSemaphore(SCRAPE_MAX_INFLIGHT) if SCRAPE_MAX_INFLIGHT > 0 else None
+
+@app.before_request
+def check_serve_pool():
+    """Reject requests routed to the wrong pool."""
+    if SERVE_POOL == "all" or request.endpoint is None or request.endpoint in ("health", "metrics"):
+        return None
+    endpoint_pool = "scrape" if request.endpoint in SCRAPE_POOL_ENDPOINTS else "query"
+    if endpoint_pool != SERVE_POOL:
+        return jsonify({"error": f"This server only handles {SERVE_POOL} requests"}), 421
+    return None
+
+@app.before_request
+def start_request_timer():
+    """Time the request and, when asked for, profile its stages."""
+    g.request_started = time.perf_counter()
+    if METRICS_PROFILE_HEADERS and request.headers.get("X-Profile", "").lower() in ("true", "1", "yes"):
+        start_profile()
+        g.profiled = True
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and add a Server-Timing header to profiled requests."""
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    seconds = time.perf_counter() - started
+    endpoint = request.endpoint or "unknown"
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    HTTP_REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    spans = end_profile()
+    if g.pop("profiled", False):
+        response.headers["Server-Timing"] = server_timing(spans + [("total", seconds)])
+    return response
+
+@app.after_request
+def compress(response):
+    """Compress responses for clients that accept zstd or gzip."""
+    if RESPONSE_COMPRESSION:
+        compress_response(
+            response,
+            negotiate_encoding(request.accept_encodings),
+            min_size=RESPONSE_COMPRESSION_MIN_SIZE,
+            gzip_level=RESPONSE_GZIP_LEVEL,
+            zstd_level=RESPONSE_ZSTD_LEVEL
+        )
+    return response
+
+# Function to build an Arrow or Parquet response from scraped job dicts. The
+# columns are the union of the jobs' keys, typed like the scraped_jobs table
+# (the scrapers' own "id" is a string); extra is stored as JSON in the schema
+# metadata under "response".
+def columnar_jobs_response(jobs, response_format, extra):
+    columns = list(dict.fromkeys(key for job in jobs for key in job))
+    schema = arrow_schema(columns, dict(COLUMNS)).with_metadata(
+        {"response": app.json.dumps(extra)}
+    )
+    rows = [tuple(job.get(column) for column in columns) for job in jobs]
+    if response_format == "parquet":
+        return Response(
+            parquet_bytes([rows], schema),
+            mimetype=PARQUET_MIMETYPE,
+            headers={"Content-Disposition": "attachment; filename=jobs.parquet"}
+        )
+    return Response(b"".join(stream_arrow([rows], schema)), mimetype=ARROW_MIMETYPE)
+
+# Scrape, task and schedule endpoints; only registered with APP_PROFILE=full
+scrape_api = Blueprint("scrape_api", __name__)
+
+@scrape_api.route('/scrape', methods=['POST'])
+def scrape():
+    """API endpoint to scrape jobs."""
+    data = request.json
+    
+    try:
+        params = parse_scrape_request(data)
+        response_format = data.get('format', "json")
+        if response_format not in SCRAPE_RESPONSE_FORMATS:
+            raise RequestParamError(f"format must be one of: {', '.join(SCRAPE_RESPONSE_FORMATS)}")
+        if response_format != "json" and not COLUMNAR_AVAILABLE:
+            raise RequestParamError(f"format={response_format} requires pyarrow to be installed")
+    except RequestParamError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        # Queue the scrape and return immediately; poll GET /scrape/<task_id>
+        if data.get('async', False):
+            task_id = get_scrape_queue().enqueue(params)
+            # The in-process queue is only served by this process's workers
+            if SCRAPE_QUEUE_BACKEND == "memory":
+                start_scrape_workers()
+            return jsonify({
+                "status": "queued",
+                "task_id": task_id,
+                "status_url": f"/scrape/{task_id}"
+            }), 202
+        
+        # Bound concurrent synchronous scrapes so they can't occupy every server thread
+        if _scrape_inflight is not None and not _scrape_inflight.acquire(blocking=False):
+            return jsonify({
+                "error": "Too many scrapes in progress; retry later or pass \"async\": true"
+            }), 503, {"Retry-After": "30"}
+        try:
+            result = run_scrape(params)
+        finally:
+            if _scrape_inflight is not None:
+                _scrape_inflight.release()
+        if response_format != "json":
+            jobs = result.pop("jobs_data", [])
+            return columnar_jobs_response(jobs, response_format, result)
+        return jsonify(result)
+    
+    except Exception as e:
+        print(f"Error in scrape endpoint: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@scrape_api.route('/ycombinator/batch', methods=['POST'])
+def scrape_ycombinator_batch():
+    """API endpoint to scrape many YCombinator companies, streaming results as NDJSON."""
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    
+    company_names = data.get('company_names')
+    save_to_db = data.get('save_to_db', False)
+    on_conflict = data.get('on_conflict', UPSERT_MODE)
+    if not isinstance(company_names, list) or not company_names or not all(
+        isinstance(name, str) and name for name in company_names
+    ):
+        return jsonify({"error": "company_names must be a non-empty list of strings"}), 400
+    if on_conflict not in UPSERT_MODES:
+        return jsonify({"error": f"on_conflict must be one of: {', '.join(UPSERT_MODES)}"}), 400
+    
+    # One line per company, written as soon as that company finishes
+    def generate():
+        for company_name, jobs, error, seconds in scrape_ycombinator_companies(company_names):
+            line = {"company_name": company_name, "seconds": round(seconds, 3)}
+            if error is not None:
+                print(f"Error scraping YCombinator company {company_name}: {error}")
+                line.update(status="error", error=error)
+            else:
+                line.update(status="success", jobs_found=len(jobs), jobs_data=jobs)
+                if save_to_db and jobs:
+                    line["db_result"] = save_jobs_to_db(jobs, on_conflict=on_conflict)
+            yield app.json.dumps(line) + "\n"
+    
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@scrape_api.route('/scrape/<task_id>', methods=['GET'])
+def get_scrape_task(task_id):
+    """API endpoint to report the status of a queued scrape."""
+    try:
+        task = get_scrape_queue().get(task_id)
+        if task is None:
+            return jsonify({"error": f"Scrape task {task_id} not found"}), 404
         
         return jsonify({
             "status": "success",
-            "jobs_found": len(all_jobs),
-            "jobs_data": all_jobs,
-            "csv_path": output_csv if jobspy_sites else None,
-            "db_result": db_result
+            "task": task
         })
     
     except Exception as e:
-        print(f"Error in scrape endpoint: {str(e)}")
+        print(f"Error retrieving scrape task: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@scrape_api.route('/schedules', methods=['GET', 'POST'])
+def schedules():
+    """API endpoint to list scrape schedules or create one."""
+    try:
+        store = get_schedule_store()
+        if request.method == 'GET':
+            return jsonify({
+                "status": "success",
+                "schedules": [with_last_task_status(schedule) for schedule in store.list()]
+            })
+        
+        try:
+            fields = parse_schedule_request(request.json)
+        except RequestParamError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        schedule = store.create(
+            fields["name"],
+            fields["params"],
+            fields["interval_seconds"],
+            enabled=fields.get("enabled", True)
+        )
+        return jsonify({"status": "success", "schedule": schedule}), 201
+    
+    except psycopg2.errors.UniqueViolation:
+        return jsonify({"error": "A schedule with this name already exists"}), 409
+    except Exception as e:
+        print(f"Error in schedules endpoint: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@scrape_api.route('/schedules/<int:schedule_id>', methods=['GET', 'PATCH', 'DELETE'])
+def schedule_detail(schedule_id):
+    """API endpoint to read, change or delete a scrape schedule."""
+    try:
+        store = get_schedule_store()
+        if request.method == 'DELETE':
+            if not store.delete(schedule_id):
+                return jsonify({"error": f"Schedule {schedule_id} not found"}), 404
+            return jsonify({"status": "success"})
+        
+        if request.method == 'PATCH':
+            try:
+                fields = parse_schedule_request(request.json, partial=True)
+            except RequestParamError as e:
+                return jsonify({"error": str(e)}), 400
+            schedule = store.update(schedule_id, **fields)
+        else:
+            schedule = store.get(schedule_id)
+        
+        if schedule is None:
+            return jsonify({"error": f"Schedule {schedule_id} not found"}), 404
+        return jsonify({"status": "success", "schedule": with_last_task_status(schedule)})
+    
+    except psycopg2.errors.UniqueViolation:
+        return jsonify({"error": "A schedule with this name already exists"}), 409
+    except Exception as e:
+        print(f"Error in schedule endpoint: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+# Columns returned by GET /jobs (search_vector is internal)
+# (company fields are available through expand=company)
+JOB_RESPONSE_COLUMNS = ["id"] + JOB_TABLE_COLUMNS + ["company_id", "scraped_at", "last_seen_at"]
+# Related records that GET /jobs can embed with expand=
+EXPAND_OPTIONS = ("company", "sources")
+SEARCH_MODES = ("substring", "fulltext")
+# Sortable columns; prefix with "-" for descending order (e.g. sort=-date_posted)
+SORT_COLUMNS = ("id", "date_posted", "min_amount", "max_amount")
+SORT_OPTIONS = ("relevance",) + SORT_COLUMNS + tuple(f"-{col}" for col in SORT_COLUMNS)
+
+# Response formats of GET /jobs; ndjson and csv are streamed
+RESPONSE_FORMATS = ("json", "ndjson", "csv", "arrow", "parquet")
+# Formats that need pyarrow
+COLUMNAR_FORMATS = ("arrow", "parquet")
+# Rows fetched per round trip by the server-side cursor when streaming
+STREAM_ITERSIZE = int(os.getenv("STREAM_ITERSIZE", "2000"))
+
+# How GET /jobs computes "total": exact COUNT(*), planner estimate, or not at all
+COUNT_MODES = ("exact", "estimate", "none")
+
+# Function to encode an opaque next-page token
+def encode_page_cursor(after_id):
+    payload = json.dumps({"after_id": after_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+# Function to decode a token produced by encode_page_cursor
+def decode_page_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["after_id"])
+    except Exception:
+        raise RequestParamError("cursor is not a valid page token")
+
+# Function to count rows matching where_sql according to count_mode
+def count_jobs(cursor, where_sql, params, count_mode):
+    if count_mode == "none":
+        return None
+    
+    if count_mode == "estimate":
+        if not where_sql:
+            # Row estimate maintained by VACUUM/ANALYZE; -1 if never analyzed
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", (TABLE_NAME,))
+            estimate = cursor.fetchone()[0]
+            if estimate >= 0:
+                return estimate
+        else:
+            # Use the planner's estimate for the filtered query
+            cursor.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {TABLE_NAME}{where_sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+    
+    cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}{where_sql}", params)
+    return cursor.fetchone()[0]
+
+# Function to build WHERE conditions for the search parameters of GET /jobs.
+# "substring" matches search anywhere in SEARCH_FIELDS (served by the trigram
+# indexes); "fulltext" matches the search_vector column (served by its GIN index).
+# Field-scoped filters such as ?company=stripe match a single column.
+def build_search_conditions(search, search_mode, args):
+    conditions = []
+    params = []
+    
+    if search and search_mode == "fulltext":
+        conditions.append(f"search_vector @@ websearch_to_tsquery('{SEARCH_TEXT_CONFIG}', %s)")
+        params.append(search)
+    elif search:
+        conditions.append("(" + " OR ".join(f"{field} ILIKE %s" for field in SEARCH_FIELDS) + ")")
+        params.extend([f"%{search}%"] * len(SEARCH_FIELDS))
+    
+    for field in SEARCH_FIELDS:
+        value = args.get(field)
+        if value:
+            conditions.append(f"{field} ILIKE %s")
+            params.append(f"%{value}%")
+    
+    return conditions, params
+
+# Functions to parse typed query parameters
+def parse_list_param(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    return items or None
+
+def parse_bool_param(args, name):
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+    parsed = coerce_bool(value)
+    if not isinstance(parsed, bool):
+        raise RequestParamError(f"{name} must be true or false")
+    return parsed
+
+def parse_number_param(args, name):
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise RequestParamError(f"{name} must be a number")
+
+def parse_datetime_param(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise RequestParamError(f"{name} must be an ISO 8601 date or datetime")
+
+# Function to build WHERE conditions for the structured filters of GET /jobs.
+# Each filter maps onto an indexed column so the combination becomes an index
+# range scan, e.g. ?is_remote=true&currency=USD&min_amount=150000&hours_old=72
+def build_filter_conditions(args):
+    conditions = []
+    params = []
+    
+    for column in ("site", "currency", "job_type"):
+        values = parse_list_param(args, column)
+        if values:
+            conditions.append(f"{column} = ANY(%s)")
+            params.append(values)
+    
+    is_remote = parse_bool_param(args, "is_remote")
+    if is_remote is not None:
+        conditions.append("is_remote = %s")
+        params.append(is_remote)
+    
+    min_amount = parse_number_param(args, "min_amount")
+    if min_amount is not None:
+        conditions.append("min_amount >= %s")
+        params.append(min_amount)
+    
+    max_amount = parse_number_param(args, "max_amount")
+    if max_amount is not None:
+        conditions.append("max_amount <= %s")
+        params.append(max_amount)
+    
+    posted_after = parse_datetime_param(args, "posted_after")
+    if posted_after is not None:
+        conditions.append("date_posted >= %s")
+        params.append(posted_after)
+    
+    posted_before = parse_datetime_param(args, "posted_before")
+    if posted_before is not None:
+        conditions.append("date_posted < %s")
+        params.append(posted_before)
+    
+    hours_old = parse_number_param(args, "hours_old")
+    if hours_old is not None:
+        conditions.append("date_posted >= now() - %s * interval '1 hour'")
+        params.append(hours_old)
+    
+    scraped_after = parse_datetime_param(args, "scraped_after")
+    if scraped_after is not None:
+        conditions.append("scraped_at >= %s")
+        params.append(scraped_after)
+    
+    scraped_before = parse_datetime_param(args, "scraped_before")
+    if scraped_before is not None:
+        conditions.append("scraped_at < %s")
+        params.append(scraped_before)
+    
+    seen_after = parse_datetime_param(args, "seen_after")
+    if seen_after is not None:
+        conditions.append("last_seen_at >= %s")
+        params.append(seen_after)
+    
+    return conditions, params
+
+# Function to parse the fields projection; id is always included so that
+# cursors can be built from any page
+def parse_fields_param(args):
+    requested = parse_list_param(args, "fields")
+    if not requested:
+        return list(JOB_RESPONSE_COLUMNS)
+    unknown = [field for field in requested if field not in JOB_RESPONSE_COLUMNS]
+    if unknown:
+        raise RequestParamError(f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [field for field in requested if field != "id"]
+
+# Function to iterate over query results with a server-side (named) cursor,
+# so only STREAM_ITERSIZE rows are held in memory at a time. The jobs.stream
+# span covers the whole export, including the time spent sending it.
+def iter_job_rows(query, params):
+    with span("jobs.stream"), db_connection() as conn:
+        cursor = conn.cursor(name=f"jobs_stream_{uuid.uuid4().hex}")
+        cursor.itersize = STREAM_ITERSIZE
+        try:
+            cursor.execute(query, params)
+            for row in cursor:
+                yield row
+        finally:
+            cursor.close()
+
+# Function to group streamed query results into lists of STREAM_ITERSIZE rows
+def iter_job_row_batches(query, params):
+    batch = []
+    for row in iter_job_rows(query, params):
+        batch.append(row)
+        if len(batch) >= STREAM_ITERSIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Function to stream query results as newline-delimited JSON
+def stream_jobs_ndjson(query, params, columns):
+    buffer = []
+    for row in iter_job_rows(query, params):
+        buffer.append(app.json.dumps(dict(zip(columns, row))))
+        if len(buffer) >= STREAM_ITERSIZE:
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+# Function to stream query results as CSV with a header row
+def stream_jobs_csv(query, params, columns):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    for count, row in enumerate(iter_job_rows(query, params), 1):
+        # Embedded records (expand=company, expand=sources) are written as JSON
+        writer.writerow([app.json.dumps(value) if isinstance(value, (dict, list)) else value for value in row])
+        if count % STREAM_ITERSIZE == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    yield output.getvalue()
+
+# Function to build the ORDER BY clause for a sort option
+def build_order_clause(sort):
+    if sort == "relevance":
+        return " ORDER BY relevance DESC, id"
+    if sort.startswith("-"):
+        column = sort[1:]
+        return f" ORDER BY {column} DESC NULLS LAST, id DESC" if column != "id" else " ORDER BY id DESC"
+    return f" ORDER BY {sort} NULLS LAST, id" if sort != "id" else " ORDER BY id"
+
 @app.route('/jobs', methods=['GET'])
 def get_jobs():
     """API endpoint to retrieve jobs from database."""
@@ -586,51 +2474,163 @@ def get_jobs():
         limit = request.args.get('limit', default=100, type=int)
         offset = request.args.get('offset', default=0, type=int)
         search = request.args.get('search', default=None, type=str)
+        search_mode = request.args.get('search_mode', default="substring", type=str)
+        sort = request.args.get('sort', default="id", type=str)
+        after_id = request.args.get('after_id', default=None, type=int)
+        page_cursor = request.args.get('cursor', default=None, type=str)
+        response_format = request.args.get('format', default="json", type=str)
+        fields = parse_fields_param(request.args)
+        expand = parse_list_param(request.args, "expand") or []
+        unknown_expand = [item for item in expand if item not in EXPAND_OPTIONS]
+        if unknown_expand:
+            raise RequestParamError(f"Unknown expand values: {', '.join(unknown_expand)}")
         
-        # Connect to database
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        if response_format not in RESPONSE_FORMATS:
+            raise RequestParamError(f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+        if response_format in COLUMNAR_FORMATS and not COLUMNAR_AVAILABLE:
+            raise RequestParamError(f"format={response_format} requires pyarrow to be installed")
+        streaming = response_format != "json"
+        # Exports return every matching row unless a limit is given explicitly
+        if streaming and 'limit' not in request.args:
+            limit = None
         
-        # Build query
-        query = f"SELECT * FROM {TABLE_NAME}"
-        count_query = f"SELECT COUNT(*) FROM {TABLE_NAME}"
+        if (limit is not None and limit < 0) or offset < 0:
+            raise RequestParamError("limit and offset must not be negative")
+        if search_mode not in SEARCH_MODES:
+            raise RequestParamError(f"search_mode must be one of: {', '.join(SEARCH_MODES)}")
+        if sort not in SORT_OPTIONS:
+            raise RequestParamError(f"sort must be one of: {', '.join(SORT_OPTIONS)}")
+        if sort == "relevance" and not (search and search_mode == "fulltext"):
+            raise RequestParamError("sort=relevance requires search with search_mode=fulltext")
+        if page_cursor:
+            after_id = decode_page_cursor(page_cursor)
+        keyset = after_id is not None
+        if keyset and offset:
+            raise RequestParamError("offset cannot be combined with after_id or cursor")
+        if keyset and sort != "id":
+            raise RequestParamError("after_id and cursor paging require sort=id")
         
-        # Add search condition if provided
-        params = []
-        if search:
-            query += " WHERE title ILIKE %s OR company ILIKE %s OR location ILIKE %s"
-            count_query += " WHERE title ILIKE %s OR company ILIKE %s OR location ILIKE %s"
-            search_param = f"%{search}%"
-            params = [search_param, search_param, search_param]
+        # Counting is the expensive part of deep paging, so cursor mode skips it by default
+        count_mode = request.args.get('count', default="none" if keyset else "exact", type=str)
+        if count_mode not in COUNT_MODES:
+            raise RequestParamError(f"count must be one of: {', '.join(COUNT_MODES)}")
         
-        # Add pagination
-        query += f" ORDER BY id LIMIT {limit} OFFSET {offset}"
+        ensure_schema()
         
-        # Get total count
-        cursor.execute(count_query, params)
-        total_count = cursor.fetchone()[0]
+        conditions, params = build_search_conditions(search, search_mode, request.args)
+        filter_conditions, filter_params = build_filter_conditions(request.args)
+        conditions += filter_conditions
+        params += filter_params
+        where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
         
-        # Get paginated results
-        cursor.execute(query, params)
-        columns = [desc[0] for desc in cursor.description]
-        results = []
+        # Rank full-text matches so callers can order by relevance
+        select_sql = ', '.join(fields)
+        output_columns = list(fields)
+        select_params = []
+        if search and search_mode == "fulltext":
+            select_sql += (f", ts_rank_cd(search_vector, websearch_to_tsquery('{SEARCH_TEXT_CONFIG}', %s))"
+                           " AS relevance")
+            select_params.append(search)
+            output_columns.append("relevance")
         
-        for row in cursor.fetchall():
-            result = {}
-            for i, column in enumerate(columns):
-                result[column] = row[i]
-            results.append(result)
+        # Embed the job's company row, looked up by primary key per returned
+        # job, or the job's own company fields when it has no company row
+        if "company" in expand:
+            own_fields = ", ".join(f"'{col}', {col}" for col in COMPANY_COLUMNS)
+            select_sql += (f", COALESCE((SELECT to_jsonb(c) - 'updated_at' FROM {COMPANY_TABLE_NAME} c"
+                           f" WHERE c.id = {TABLE_NAME}.company_id),"
+                           f" NULLIF(jsonb_strip_nulls(jsonb_build_object({own_fields})), '{{}}'::jsonb)) AS company")
+            output_columns.append("company")
         
-        cursor.close()
-        conn.close()
+        # List every posting collapsed into the job (see DEDUP_ENABLED)
+        if "sources" in expand:
+            select_sql += (", (SELECT jsonb_agg(jsonb_build_object('site', s.site, 'job_url', s.job_url,"
+                           " 'job_id', s.source_job_id, 'first_seen_at', s.first_seen_at,"
+                           " 'last_seen_at', s.last_seen_at) ORDER BY s.id)"
+                           f" FROM job_sources s WHERE s.job_id = {TABLE_NAME}.id) AS sources")
+            output_columns.append("sources")
         
-        return jsonify({
-            "status": "success",
-            "total": total_count,
-            "limit": limit,
-            "offset": offset,
-            "data": results
-        })
+        # Build query; keyset pages seek on the primary key instead of skipping rows
+        page_conditions = list(conditions)
+        page_params = select_params + params
+        if keyset:
+            page_conditions.append("id > %s")
+            page_params.append(after_id)
+        query = f"SELECT {select_sql} FROM {TABLE_NAME}"
+        if page_conditions:
+            query += f" WHERE {' AND '.join(page_conditions)}"
+        query += build_order_clause(sort)
+        if limit is not None:
+            query += f" LIMIT {limit}"
+        if not keyset:
+            query += f" OFFSET {offset}"
+        
+        if streaming:
+            if response_format in COLUMNAR_FORMATS:
+                schema = arrow_schema(output_columns, JOB_COLUMN_TYPES)
+                row_batches = iter_job_row_batches(query, page_params)
+                if response_format == "parquet":
+                    return Response(
+                        parquet_bytes(row_batches, schema),
+                        mimetype=PARQUET_MIMETYPE,
+                        headers={"Content-Disposition": "attachment; filename=jobs.parquet"}
+                    )
+                return Response(stream_arrow(row_batches, schema), mimetype=ARROW_MIMETYPE)
+            if response_format == "csv":
+                return Response(
+                    stream_jobs_csv(query, page_params, output_columns),
+                    mimetype="text/csv",
+                    headers={"Content-Disposition": "attachment; filename=jobs.csv"}
+                )
+            return Response(
+                stream_jobs_ndjson(query, page_params, output_columns),
+                mimetype="application/x-ndjson"
+            )
+        
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get total count
+            with span("jobs.count"):
+                total_count = count_jobs(cursor, where_sql, params, count_mode)
+            
+            # Get paginated results
+            with span("jobs.query"):
+                cursor.execute(query, page_params)
+                columns = [desc[0] for desc in cursor.description]
+                rows = cursor.fetchall()
+            results = []
+            
+            for row in rows:
+                result = {}
+                for i, column in enumerate(columns):
+                    result[column] = row[i]
+                results.append(result)
+            
+            cursor.close()
+        
+        # A full page means there may be more rows after the last id
+        next_cursor = None
+        if sort == "id" and limit > 0 and len(results) == limit:
+            next_cursor = encode_page_cursor(results[-1]["id"])
+        
+        with span("jobs.serialize"):
+            return jsonify({
+                "status": "success",
+                "total": total_count,
+                "count": count_mode,
+                "limit": limit,
+                "offset": offset,
+                "sort": sort,
+                "fields": fields,
+                "expand": expand,
+                "after_id": after_id,
+                "next_cursor": next_cursor,
+                "data": results
+            })
+    
+    except RequestParamError as e:
+        return jsonify({"error": str(e)}), 400
     
     except Exception as e:
         print(f"Error retrieving jobs: {str(e)}")
@@ -638,6 +2638,93 @@ def get_jobs():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/jobs/stats', methods=['GET'])
+def get_job_stats():
+    """API endpoint returning precomputed job counts and salary percentiles."""
+    try:
+        limit = request.args.get('limit', default=20, type=int)
+        if limit < 0 or limit > 1000:
+            raise RequestParamError("limit must be between 0 and 1000")
+        
+        ensure_schema()
+        with span("stats.query"):
+            stats = job_stats.summary(limit=limit)
+        
+        return jsonify({"status": "success", "limit": limit, **stats})
+    
+    except RequestParamError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    except Exception as e:
+        print(f"Error retrieving job stats: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/health', methods=['GET'])
+def health():
+    """API endpoint reporting database reachability and pool metrics."""
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        db_status = "ok"
+        status_code = 200
+    except Exception as e:
+        print(f"Database health check failed: {str(e)}")
+        db_status = f"error: {str(e)}"
+        status_code = 503
+    
+    return jsonify({
+        "status": "success" if status_code == 200 else "error",
+        "database": db_status,
+        "pool": get_db_pool_metrics(),
+        "site_limits": site_limiter.stats()
+    }), status_code
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """API endpoint exposing this process's metrics in the Prometheus text format."""
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+if APP_PROFILE == "full":
+    app.register_blueprint(scrape_api)
+
 if __name__ == "__main__":
+    # Bootstrap the schema once at startup rather than per request
+    try:
+        ensure_schema()
+        if APP_PROFILE == "full":
+            backfill_dedup_index()
+    except Exception as e:
+        print(f"Could not initialize database schema at startup: {str(e)}")
+    try:
+        refresh_job_stats()
+    except Exception as e:
+        print(f"Could not refresh job stats at startup: {str(e)}")
+    
+    # The debug reloader runs this block in a watcher process too; only the
+    # child process that serves requests (WERKZEUG_RUN_MAIN) runs workers
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true" and APP_PROFILE == "full":
+        try:
+            start_scrape_workers()
+        except Exception as e:
+            print(f"Could not start scrape workers: {str(e)}")
+        try:
+            start_scheduler()
+        except Exception as e:
+            print(f"Could not start scrape scheduler: {str(e)}")
+        try:
+            start_job_retention()
+        except Exception as e:
+            print(f"Could not start job retention: {str(e)}")
+        try:
+            start_job_stats()
+        except Exception as e:
+            print(f"Could not start job stats refresh: {str(e)}")
+    
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=True) 
\ No newline at end of file
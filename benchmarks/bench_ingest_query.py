@@ -0,0 +1,395 @@
+"""
+Offline benchmark of the ingest and query paths.
+
+Uses a disposable database (--db-name, emptied before each scale and
+dropped afterwards unless --keep-db) on the server configured by DB_HOST/DB_PORT/DB_USER/DB_PASSWORD,
+fills it with synthetic jobs and reports, for each --rows scale:
+
+  map_yc      YC page mapping (build_yc_company_profile + map_yc_job), rows/sec
+  normalize   normalize_jobs_frame on a JobSpy DataFrame, rows/sec
+  ingest      save_jobs_to_db into an empty table, rows/sec
+  reingest    the first chunk again (the ON CONFLICT path), rows/sec
+  csv_import  import_csv_to_db, rows/sec
+  scrape      run_scrape end to end with stubbed scrape_jobs and Scraper
+  query       GET /jobs latency (p50/p95/p99) under --concurrency clients
+
+plus the process's peak RSS after each stage. No network access is needed:
+scrape_jobs and the YC Scraper are replaced by the generators in
+synthetic_jobs.py. Results are saved to benchmarks/results/ and compared
+with the previous run (or --compare FILE).
+
+    python benchmarks/bench_ingest_query.py --rows 10000 100000
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from synthetic_jobs import LOCATIONS, ROLES, WORDS, FakeYCScraper, fake_scrape_jobs, generate_jobs  # noqa: E402
+
+RESULTS_DIR = BENCH_DIR / "results"
+
+# /jobs requests replayed by the query stage, by name
+QUERY_TEMPLATES = {
+    "page": "/jobs?limit=50",
+    "recent": "/jobs?limit=50&sort=-date_posted",
+    "substring": "/jobs?limit=50&search={role}",
+    "fulltext": "/jobs?limit=50&search={word}&search_mode=fulltext&sort=relevance",
+    "filters": "/jobs?limit=50&site=linkedin&is_remote=true&min_amount=100000&currency=USD",
+    "location": "/jobs?limit=50&location={location}&count=estimate",
+    "keyset": "/jobs?limit=50&after_id={after_id}",
+    "deep_offset": "/jobs?limit=50&offset={offset}&count=estimate",
+}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(name, seconds, rows=None, **extra):
+    stats = {"seconds": round(seconds, 3)}
+    if rows:
+        stats.update(rows=rows, rows_per_sec=round(rows / seconds) if seconds else None)
+    stats.update(extra)
+    stats["peak_rss_mb"] = peak_rss_mb()
+    throughput = f"{stats['rows_per_sec']:>10,} rows/sec" if rows else ""
+    print(f"  {name:<11} {seconds:8.2f}s {throughput}  peak RSS {stats['peak_rss_mb']} MB")
+    return stats
+
+
+def maintenance_connection(app):
+    conn = psycopg2.connect(host=app.DB_HOST, port=app.DB_PORT, dbname="postgres",
+                            user=app.DB_USER, password=app.DB_PASSWORD)
+    conn.autocommit = True
+    return conn
+
+
+# Function to give each scale an empty database. Tables are truncated rather
+# than the database recreated, so a server started with --url keeps working.
+def reset_database(app, db_name):
+    conn = maintenance_connection(app)
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (db_name,))
+    if cursor.fetchone() is None:
+        cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(db_name)))
+    cursor.close()
+    conn.close()
+    app.ensure_schema()
+    with app.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        SELECT tablename FROM pg_tables
+        WHERE schemaname = current_schema() AND tablename <> 'schema_migrations'
+        """)
+        tables = [sql.Identifier(row[0]) for row in cursor.fetchall()]
+        cursor.execute(sql.SQL("TRUNCATE {} RESTART IDENTITY CASCADE").format(sql.SQL(", ").join(tables)))
+        conn.commit()
+        cursor.close()
+
+
+def drop_database(app, db_name):
+    app.close_db_pool()
+    conn = maintenance_connection(app)
+    cursor = conn.cursor()
+    cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(db_name)))
+    cursor.close()
+    conn.close()
+
+
+def bench_map_yc(app, rows):
+    scraper = FakeYCScraper(jobs_per_company=10)
+    pages = [scraper.scrape_company_data(f"https://www.workatastartup.com/companies/bench-{index}")
+             for index in range(max(1, min(rows, 20000) // 10))]
+    started = time.perf_counter()
+    mapped = 0
+    for page in pages:
+        profile = app.build_yc_company_profile(page)
+        mapped += len([app.map_yc_job(job, profile) for job in page.job_data])
+    return report("map_yc", time.perf_counter() - started, mapped)
+
+
+def bench_normalize(app, rows, seed):
+    frame = pd.DataFrame(list(generate_jobs(rows, seed=seed)))
+    frame["id"] = frame.pop("job_id")
+    started = time.perf_counter()
+    app.normalize_jobs_frame(frame)
+    return report("normalize", time.perf_counter() - started, rows)
+
+
+def bench_ingest(app, rows, chunk_size, seed, duplicate_rate, name="ingest"):
+    seconds = 0.0
+    results = []
+    for start in range(0, rows, chunk_size):
+        jobs = list(generate_jobs(min(chunk_size, rows - start), seed=seed, start=start,
+                                  duplicate_rate=duplicate_rate))
+        started = time.perf_counter()
+        result = app.save_jobs_to_db(jobs, job_id_prefix="js")
+        seconds += time.perf_counter() - started
+        if result.startswith("Error"):
+            raise RuntimeError(result)
+        results.append(result)
+    return report(name, seconds, rows, result=results[-1] if len(results) == 1 else f"{len(results)} chunks")
+
+
+def bench_csv_import(app, rows, seed):
+    frame = pd.DataFrame(list(generate_jobs(rows, seed=seed)))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "jobs.csv")
+        app.write_jobs_csv(frame, path)
+        started = time.perf_counter()
+        result = app.import_csv_to_db(path)
+        seconds = time.perf_counter() - started
+    if result.startswith("Error"):
+        raise RuntimeError(result)
+    return report("csv_import", seconds, rows, result=result)
+
+
+def bench_scrape(app, results_wanted):
+    params = app.parse_scrape_request({
+        "site_names": ["indeed", "linkedin", "google", "ycombinator"],
+        "search_term": "engineer",
+        "location": "anywhere",
+        "company_name": [f"bench-yc-{index}" for index in range(5)],
+        "results_wanted": results_wanted,
+        "save_to_db": True,
+        "cache": "bypass",
+        "jobs_data": "none",
+    })
+    started = time.perf_counter()
+    result = app.run_scrape(params)
+    return report("scrape", time.perf_counter() - started, result["jobs_found"], db_result=result["db_result"])
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def bench_query(app, rows, base_url, requests, concurrency, seed):
+    with app.db_connection() as conn:
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute(f"ANALYZE {app.TABLE_NAME}")
+        cursor.close()
+        conn.autocommit = False
+
+    target = urlsplit(base_url)
+    latencies = {name: [] for name in QUERY_TEMPLATES}
+    errors = []
+    lock = threading.Lock()
+
+    def client(worker, count):
+        rng = random.Random(seed * 1000 + worker)
+        names = list(QUERY_TEMPLATES)
+        for _ in range(count):
+            name = rng.choice(names)
+            path = QUERY_TEMPLATES[name].format(
+                role=quote(rng.choice(ROLES).split()[0]),
+                word=quote(rng.choice(WORDS)),
+                location=quote(rng.choice(LOCATIONS).split(",")[0]),
+                after_id=rng.randrange(1, max(2, rows)),
+                offset=rng.randrange(0, max(1, rows - 50)),
+            )
+            connection = http.client.HTTPConnection(target.hostname, target.port, timeout=120)
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except OSError as e:
+                status = str(e)
+            finally:
+                connection.close()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[name].append(elapsed)
+                if status != 200:
+                    errors.append(f"{path}: {status}")
+
+    per_client = [requests // concurrency + (1 if index < requests % concurrency else 0)
+                  for index in range(concurrency)]
+    threads = [threading.Thread(target=client, args=(index, count)) for index, count in enumerate(per_client)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    every = [value for values in latencies.values() for value in values]
+    by_template = {
+        name: {"count": len(values), "p50_ms": round(percentile(values, 50) * 1000, 2),
+               "p99_ms": round(percentile(values, 99) * 1000, 2)}
+        for name, values in latencies.items() if values
+    }
+    stats = report(
+        "query", seconds,
+        requests=len(every), concurrency=concurrency, errors=len(errors),
+        requests_per_sec=round(len(every) / seconds, 1),
+        p50_ms=round(percentile(every, 50) * 1000, 2),
+        p95_ms=round(percentile(every, 95) * 1000, 2),
+        p99_ms=round(percentile(every, 99) * 1000, 2),
+        templates=by_template,
+    )
+    print(f"              {stats['requests_per_sec']} req/s, p50 {stats['p50_ms']} ms, "
+          f"p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms, {len(errors)} errors")
+    for name, template_stats in by_template.items():
+        print(f"              {name:<12} p50 {template_stats['p50_ms']:>8} ms  p99 {template_stats['p99_ms']:>8} ms")
+    for error in errors[:5]:
+        print(f"              error: {error}")
+    return stats
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Metrics compared across runs, and whether higher is better
+COMPARED_METRICS = (
+    ("rows_per_sec", True), ("p50_ms", False), ("p99_ms", False), ("peak_rss_mb", False),
+)
+
+
+def compare(previous, current):
+    print(f"\nCompared with {previous.get('timestamp')} ({previous.get('git_commit')}):")
+    for scale, stages in current["scales"].items():
+        for stage, stats in stages.items():
+            old_stats = previous.get("scales", {}).get(scale, {}).get(stage)
+            if not old_stats:
+                continue
+            for metric, higher_is_better in COMPARED_METRICS:
+                old, new = old_stats.get(metric), stats.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old * 100
+                if abs(change) < 1:
+                    verdict = "same"
+                else:
+                    verdict = "better" if (change > 0) == higher_is_better else "worse"
+                print(f"  {scale:>8} rows {stage:<11} {metric:<13} {old:>12,} -> {new:>12,} ({change:+.1f}%, {verdict})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingest and /jobs query performance offline")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000], help="Table sizes to benchmark")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Jobs passed to save_jobs_to_db at once")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0,
+                        help="Fraction of synthetic jobs that re-post an earlier job on another site")
+    parser.add_argument("--requests", type=int, default=1000, help="/jobs requests per scale")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent /jobs clients")
+    parser.add_argument("--url", help="Query a running server (using the same database) instead of an in-process one")
+    parser.add_argument("--db-name", default="scraper_bench", help="Disposable database to create and drop")
+    parser.add_argument("--keep-db", action="store_true", help="Keep the database after the run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--compare", help="Results file to compare with (default: the previous run)")
+    parser.add_argument("--no-save", action="store_true", help="Don't store the results")
+    args = parser.parse_args()
+
+    if args.db_name == os.getenv("DB_NAME", "scraper"):
+        sys.exit(f"--db-name {args.db_name} is the application database; the benchmark drops it")
+
+    # The app reads its settings at import time
+    os.environ["DB_NAME"] = args.db_name
+    os.environ.setdefault("SCRAPE_CACHE_BACKEND", "none")
+    os.environ.setdefault("SCRAPE_SITE_RATE_PER_MINUTE", "1000000")
+    import app  # noqa: E402
+
+    app.scrape_jobs = fake_scrape_jobs
+    app.Scraper = FakeYCScraper
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "args": vars(args),
+        "settings": {
+            "INGEST_BATCH_SIZE": app.INGEST_BATCH_SIZE,
+            "UPSERT_MODE": app.UPSERT_MODE,
+            "DEDUP_ENABLED": app.DEDUP_ENABLED,
+            "DB_POOL_MAX_SIZE": app.DB_POOL_MAX_SIZE,
+        },
+        "scales": {},
+    }
+
+    server = None
+    try:
+        for rows in args.rows:
+            print(f"\n{rows:,} rows")
+            reset_database(app, args.db_name)
+            first_chunk = min(rows, args.chunk_size)
+            stages = {
+                "map_yc": bench_map_yc(app, rows),
+                "normalize": bench_normalize(app, first_chunk, args.seed),
+                "ingest": bench_ingest(app, rows, args.chunk_size, args.seed, args.duplicate_rate),
+                "reingest": bench_ingest(app, first_chunk, args.chunk_size, args.seed, args.duplicate_rate,
+                                         name="reingest"),
+                "csv_import": bench_csv_import(app, first_chunk, args.seed + 1),
+                "scrape": bench_scrape(app, min(rows, 1000)),
+            }
+            base_url = args.url
+            if base_url is None:
+                if server is None:
+                    server, base_url = start_server(app)
+                else:
+                    base_url = f"http://127.0.0.1:{server.server_port}"
+            stages["query"] = bench_query(app, rows, base_url, args.requests, args.concurrency, args.seed)
+            results["scales"][str(rows)] = stages
+            with app.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT version()")
+                results["postgres"] = cursor.fetchone()[0]
+                cursor.close()
+    finally:
+        if server is not None:
+            server.shutdown()
+        if not args.keep_db:
+            drop_database(app, args.db_name)
+
+    previous_path = Path(args.compare) if args.compare else None
+    if previous_path is None and RESULTS_DIR.exists():
+        runs = sorted(RESULTS_DIR.glob("*.json"))
+        previous_path = runs[-1] if runs else None
+    if previous_path is not None:
+        compare(json.loads(previous_path.read_text(encoding="utf-8")), results)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+        path.write_text(json.dumps(results, indent=2, default=str), encoding="utf-8")
+        print(f"\nSaved results to {path}")
@@ -0,0 +1,67 @@
+"""
+Correctness and throughput benchmark for salary_parser.
+
+Checks every string in salary_corpus.json against its expected result, then
+times parse_salary (one string at a time) and parse_salaries (whole batch).
+
+    python benchmarks/bench_salary_parser.py --repeat 2000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from salary_parser import parse_salary, parse_salaries  # noqa: E402
+
+CORPUS_PATH = Path(__file__).resolve().parent / "salary_corpus.json"
+
+
+def check_corpus(corpus):
+    failures = 0
+    for case in corpus:
+        actual = parse_salary(case["text"])._asdict()
+        if actual != case["expected"]:
+            failures += 1
+            print(f"MISMATCH {case['text']!r}\n  expected: {case['expected']}\n  actual:   {actual}")
+    return failures
+
+
+def time_call(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the salary parser")
+    parser.add_argument("--repeat", type=int, default=1000, help="Times the corpus is parsed")
+    args = parser.parse_args()
+
+    corpus = json.loads(CORPUS_PATH.read_text(encoding="utf-8"))
+    texts = [case["text"] for case in corpus]
+
+    failures = check_corpus(corpus)
+    print(f"Correctness: {len(corpus) - failures}/{len(corpus)} strings parsed as expected")
+
+    batch = texts * args.repeat
+    total = len(batch)
+
+    single = time_call(lambda: [parse_salary(text) for text in batch])
+    print(f"parse_salary:   {total / single:,.0f} strings/sec ({single / total * 1e6:.2f} us/string)")
+
+    batched = time_call(lambda: parse_salaries(batch))
+    print(f"parse_salaries: {total / batched:,.0f} strings/sec ({batched / total * 1e6:.2f} us/string)")
+
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    if pd is not None:
+        series = pd.Series(batch)
+        vectorized = time_call(lambda: parse_salaries(series))
+        print(f"parse_salaries (Series): {total / vectorized:,.0f} strings/sec")
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,124 @@
+"""
+Benchmark of process cold start: the time to import the app and the memory
+a process holds afterwards, per APP_PROFILE.
+
+Each sample runs in a fresh interpreter. The "eager" variant imports the
+scraping and data packages (pandas, numpy, pyarrow, jobspy,
+ycombinator_scraper) before the app, as every process did before they were
+imported on first use. It shows what the lazy imports save. With
+--first-request, the sample also times one request through the Flask test
+client, which needs the database. For example, GET /jobs?limit=10 gives the
+time to the first query.
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# Packages that only scraping, ingest and columnar responses need
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "jobspy", "ycombinator_scraper")
+
+# Code run in each child interpreter; prints one JSON sample
+SAMPLE_CODE = """
+import importlib, json, resource, sys, time
+started = time.perf_counter()
+for name in EAGER:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+import app
+imported = time.perf_counter()
+first_request = None
+if FIRST_REQUEST:
+    response = app.app.test_client().get(FIRST_REQUEST)
+    first_request = {"status": response.status_code, "seconds": time.perf_counter() - imported}
+rss_mb = None
+try:
+    with open("/proc/self/statm") as statm:
+        rss_mb = int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+except OSError:
+    pass
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "import_seconds": imported - started,
+    "rss_mb": rss_mb,
+    "peak_rss_mb": peak / (2**20 if sys.platform == "darwin" else 2**10),
+    "modules": len(sys.modules),
+    "heavy_modules": sorted({name.split(".")[0] for name in sys.modules} & set(HEAVY)),
+    "routes": sorted(rule.rule for rule in app.app.url_map.iter_rules() if rule.endpoint != "static"),
+    "first_request": first_request,
+}))
+"""
+
+VARIANTS = {
+    "full (eager imports)": ("full", HEAVY_MODULES),
+    "full": ("full", ()),
+    "query": ("query", ()),
+}
+
+
+def run_sample(profile, eager, first_request):
+    code = (f"EAGER = {list(eager)!r}\nHEAVY = {list(HEAVY_MODULES)!r}\nFIRST_REQUEST = {first_request!r}\n"
+            + SAMPLE_CODE)
+    env = dict(os.environ, APP_PROFILE=profile)
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Sample failed for APP_PROFILE={profile}:\n{result.stderr}")
+    # The app may print while importing; the sample is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median(samples, key):
+    values = [sample[key] for sample in samples if sample[key] is not None]
+    return statistics.median(values) if values else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark app import time and memory per APP_PROFILE")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per variant")
+    parser.add_argument("--first-request", help="Also time one request, e.g. '/jobs?limit=10' (needs the database)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, (profile, eager) in VARIANTS.items():
+        samples = [run_sample(profile, eager, args.first_request) for _ in range(args.repeat)]
+        results[name] = {
+            "import_seconds": median(samples, "import_seconds"),
+            "rss_mb": median(samples, "rss_mb"),
+            "peak_rss_mb": median(samples, "peak_rss_mb"),
+            "modules": median(samples, "modules"),
+            "heavy_modules": samples[-1]["heavy_modules"],
+            "routes": samples[-1]["routes"],
+        }
+        if args.first_request:
+            results[name]["first_request_seconds"] = statistics.median(
+                sample["first_request"]["seconds"] for sample in samples
+            )
+            results[name]["first_request_status"] = samples[-1]["first_request"]["status"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    print(f"Median of {args.repeat} fresh processes per variant\n")
+    print(f"{'variant':<22} {'import':>9} {'RSS':>9} {'peak RSS':>9} {'modules':>8}  heavy modules loaded")
+    for name, stats in results.items():
+        rss = f"{stats['rss_mb']:.1f} MB" if stats["rss_mb"] is not None else "n/a"
+        print(f"{name:<22} {stats['import_seconds'] * 1000:7.0f}ms {rss:>9} {stats['peak_rss_mb']:6.1f} MB "
+              f"{stats['modules']:>8.0f}  {', '.join(stats['heavy_modules']) or '-'}")
+    if args.first_request:
+        print(f"\nFirst request {args.first_request}:")
+        for name, stats in results.items():
+            print(f"  {name:<22} {stats['first_request_seconds'] * 1000:7.1f}ms (HTTP {stats['first_request_status']})")
+    print("\nRoutes:")
+    for name, stats in results.items():
+        print(f"  {name:<22} {', '.join(stats['routes'])}")
@@ -0,0 +1,156 @@
+"""
+Deterministic synthetic job postings for the offline benchmarks.
+
+generate_jobs() yields JobSpy-style records with every field of app.COLUMNS;
+the same seed and index always give the same record. fake_scrape_jobs and
+FakeYCScraper stand in for jobspy.scrape_jobs and ycombinator_scraper.Scraper
+so scrape pipelines can be benchmarked without network access.
+"""
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pandas as pd
+
+SITES = ("indeed", "linkedin", "google")
+LEVELS = ("Junior", "", "Senior", "Staff", "Principal", "Lead")
+ROLES = (
+    "Backend Engineer", "Frontend Engineer", "Full Stack Engineer", "Data Engineer",
+    "Data Scientist", "Machine Learning Engineer", "DevOps Engineer", "Site Reliability Engineer",
+    "Product Manager", "Product Designer", "Mobile Engineer", "Security Engineer",
+    "QA Engineer", "Engineering Manager", "Solutions Architect", "Analytics Engineer",
+    "Platform Engineer", "Embedded Engineer", "Developer Advocate", "Technical Writer",
+)
+TEAMS = tuple(
+    f"{area} {unit}"
+    for area in ("Payments", "Search", "Growth", "Infrastructure", "Identity", "Ads", "Maps",
+                 "Billing", "Messaging", "Checkout")
+    for unit in ("Platform", "Core", "Experience", "Insights", "Tooling")
+)
+LOCATIONS = (
+    "New York, NY", "San Francisco, CA", "Austin, TX", "Seattle, WA", "Boston, MA",
+    "Chicago, IL", "Denver, CO", "Los Angeles, CA", "Atlanta, GA", "Remote",
+    "London, UK", "Berlin, DE", "Toronto, ON", "Amsterdam, NL", "Paris, FR",
+    "Dublin, IE", "Singapore", "Sydney, AU", "Bangalore, IN", "Tel Aviv, IL",
+)
+JOB_TYPES = ("fulltime", "parttime", "contract", "internship")
+CURRENCIES = ("USD", "USD", "USD", "EUR", "GBP")
+SKILLS = (
+    "python", "go", "rust", "java", "typescript", "react", "postgres", "kafka", "spark",
+    "kubernetes", "terraform", "aws", "gcp", "airflow", "graphql", "redis", "django", "flask",
+)
+WORDS = tuple(
+    f"{prefix}{suffix}"
+    for prefix in ("data", "scale", "build", "ship", "team", "user", "cloud", "secure", "fast",
+                   "model", "api", "service", "product", "design", "test", "deploy", "monitor",
+                   "customer", "growth", "platform")
+    for suffix in ("", "s", "ing", "ed", "er", "able", "ly", "ment", "ity", "ive")
+)
+COMPANY_NAMES = ("Acme", "Globex", "Initech", "Umbrella", "Hooli", "Vandelay", "Stark", "Wayne", "Tyrell", "Soylent")
+
+
+# Function to build the synthetic record with the given index. Every
+# companies_per_job consecutive records share a company, so the company
+# upsert sees repeats.
+def make_job(index, seed=0, companies_per_job=20, now=None):
+    rng = random.Random(seed * 1_000_003 + index)
+    now = now or datetime(2024, 6, 1)
+    site = SITES[index % len(SITES)]
+    level = rng.choice(LEVELS)
+    title = f"{level} {rng.choice(ROLES)}, {rng.choice(TEAMS)}".strip()
+    min_amount = rng.randrange(40, 250) * 1000
+    has_salary = rng.random() < 0.6
+    is_remote = rng.random() < 0.3
+    return {
+        "job_id": f"bench-{seed}-{index}" if rng.random() < 0.8 else None,
+        "site": site,
+        "job_url": f"https://{site}.example.com/jobs/{seed}/{index}",
+        "job_url_direct": f"https://careers.example.com/{seed}/{index}" if rng.random() < 0.5 else None,
+        "title": title,
+        "company": f"{COMPANY_NAMES[index // companies_per_job % len(COMPANY_NAMES)]} {index // companies_per_job}",
+        "location": "Remote" if is_remote and rng.random() < 0.5 else rng.choice(LOCATIONS),
+        "date_posted": now - timedelta(hours=rng.randrange(0, 24 * 60)),
+        "job_type": rng.choice(JOB_TYPES),
+        "salary_source": "direct_data" if has_salary else None,
+        "interval": "yearly" if has_salary else None,
+        "min_amount": float(min_amount) if has_salary else None,
+        "max_amount": float(min_amount + rng.randrange(10, 80) * 1000) if has_salary else None,
+        "currency": rng.choice(CURRENCIES) if has_salary else None,
+        "is_remote": is_remote,
+        "job_level": level.lower() or None,
+        "job_function": None,
+        "listing_type": None,
+        "emails": None,
+        "description": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(80, 240))),
+        "company_industry": rng.choice(("Software", "Fintech", "Healthcare", "Retail", None)),
+        "company_url": f"https://{site}.example.com/company/{index // companies_per_job}",
+        "company_logo": None,
+        "company_url_direct": None,
+        "company_addresses": None,
+        "company_num_employees": rng.choice(("1-10", "11-50", "51-200", "201-500", "1001-5000")),
+        "company_revenue": None,
+        "company_description": None,
+        "skills": ", ".join(rng.sample(SKILLS, 4)),
+        "experience_range": None,
+        "company_rating": round(rng.uniform(2.5, 5.0), 1) if rng.random() < 0.3 else None,
+        "company_reviews_count": rng.randrange(0, 5000) if rng.random() < 0.3 else None,
+        "vacancy_count": None,
+        "work_from_home_type": "remote" if is_remote else None,
+    }
+
+
+# Function to yield count synthetic records starting at index start.
+# duplicate_rate of them are copies of an earlier record re-posted on another
+# site (new URL, same title/company/description), for the dedup stage.
+def generate_jobs(count, seed=0, start=0, duplicate_rate=0.0):
+    rng = random.Random(seed)
+    for index in range(start, start + count):
+        job = make_job(index, seed)
+        if duplicate_rate and index > start and rng.random() < duplicate_rate:
+            original = make_job(rng.randrange(start, index), seed)
+            site = SITES[(SITES.index(original["site"]) + 1) % len(SITES)]
+            job = dict(original, site=site, job_id=None,
+                       job_url=f"https://{site}.example.com/jobs/{seed}/{index}")
+        yield job
+
+
+# Stand-in for jobspy.scrape_jobs: a DataFrame of synthetic jobs for the site
+def fake_scrape_jobs(site_name, results_wanted=20, **kwargs):
+    site = site_name[0]
+    seed = sum(ord(char) for char in site)
+    frame = pd.DataFrame(list(generate_jobs(results_wanted, seed=seed)))
+    frame["site"] = site
+    frame["id"] = frame.pop("job_id")
+    return frame
+
+
+# Stand-in for ycombinator_scraper.Scraper returning synthetic company pages
+class FakeYCScraper:
+    def __init__(self, jobs_per_company=10):
+        self.jobs_per_company = jobs_per_company
+
+    def scrape_company_data(self, company_url):
+        name = company_url.rstrip("/").split("/")[-1]
+        rng = random.Random(name)
+        jobs = []
+        for index in range(self.jobs_per_company):
+            salary = rng.randrange(80, 220)
+            jobs.append(SimpleNamespace(
+                job_url=f"https://www.workatastartup.com/jobs/{name}-{index}",
+                job_title=f"{rng.choice(LEVELS)} {rng.choice(ROLES)}".strip(),
+                job_salary_range=f"${salary}K - ${salary + 40}K    0.10% - 0.50%",
+                job_tags=[[rng.choice(LOCATIONS), "Full-time", "3+ years", rng.choice(("Remote", "On-site"))]],
+                job_description=" ".join(rng.choice(WORDS) for _ in range(120)),
+            ))
+        return SimpleNamespace(
+            company_name=name,
+            company_tags=["B2B", "51-200 people", rng.choice(("San Francisco", "New York", "London"))],
+            company_social_links=["https://twitter.com/example", f"https://{name}.example.com"],
+            company_image=None,
+            company_url=f"https://{name}.example.com",
+            company_description=f"{name} builds things.",
+            job_data=jobs,
+        )
+
+    def login(self):
+        pass
@@ -0,0 +1,370 @@
+import hashlib
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+
+from psycopg2.extras import execute_values
+
+# MinHash signature length and its split into LSH bands. Two descriptions
+# with Jaccard similarity s share at least one band with probability
+# 1 - (1 - s**ROWS_PER_BAND)**BANDS: about 0.5 at s=0.7 and 0.99 at s=0.85.
+# Stored signatures and buckets depend on these, so changing them means
+# re-indexing (truncate job_signatures and job_lsh_buckets and backfill).
+NUM_PERM = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+# Descriptions are compared as sets of overlapping word triples
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 31) - 1
+# Shingles hashed per numpy pass by minhash_signatures; bounds the
+# NUM_PERM x shingles work matrix to about 32 MB
+SIGNATURE_CHUNK_SHINGLES = 32768
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_COMPANY_SUFFIX_RE = re.compile(r"\b(inc|llc|ltd|limited|corp|corporation|co|gmbh|plc|sa|ag)\b")
+
+
+# Function to normalize free text for comparison: accents stripped,
+# lowercased, punctuation collapsed to single spaces. Only ASCII letters and
+# digits survive, so once accents are split off (NFKD) every other non-ASCII
+# character can be dropped in one encode; ASCII text skips both steps.
+def normalize_text(text):
+    if not text:
+        return ""
+    text = str(text)
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM_RE.sub(" ", text.lower()).strip()
+
+
+# Function to normalize a company name, dropping legal suffixes so that
+# "Acme, Inc." and "Acme" compare equal
+def normalize_company(name):
+    return " ".join(_COMPANY_SUFFIX_RE.sub(" ", normalize_text(name)).split())
+
+
+# Function to normalize a location to its first component (usually the
+# city), since boards format the rest differently ("NY, US" vs "New York")
+def normalize_location(location):
+    return normalize_text(str(location).split(",")[0]) if location else ""
+
+
+# Function to fingerprint a posting by its normalized title, company and
+# location. Returns None when the title or company is missing.
+def content_fingerprint(title, company, location):
+    title = normalize_text(title)
+    company = normalize_company(company)
+    if not title or not company:
+        return None
+    canonical = "|".join((title, company, normalize_location(location)))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+# Function to draw the (a, b) coefficients of the NUM_PERM hash permutations.
+# numpy is imported here rather than at module load, so processes that never
+# ingest (e.g. APP_PROFILE=query) don't load it.
+@lru_cache(maxsize=None)
+def _permutations():
+    import numpy as np
+    # Fixed seed: signatures must be identical across processes and restarts
+    rng = np.random.RandomState(20240101)
+    return rng.randint(1, _PRIME, NUM_PERM).astype(np.uint64), rng.randint(0, _PRIME, NUM_PERM).astype(np.uint64)
+
+
+# Function to hash a text's distinct word shingles (CRC-32 of each)
+def _shingle_hashes(text):
+    words = normalize_text(text).split()
+    if not words:
+        return ()
+    size = min(SHINGLE_SIZE, len(words))
+    shingles = zip(*(words[i:len(words) - size + 1 + i] for i in range(size)))
+    return {zlib.crc32(" ".join(shingle).encode("utf-8")) for shingle in shingles}
+
+
+# Function to compute the MinHash signatures of many texts' word shingles,
+# as lists of NUM_PERM ints (None for empty text). The permutations run over
+# the shingles of many texts at once, SIGNATURE_CHUNK_SHINGLES at a time,
+# instead of one numpy pass per text.
+def minhash_signatures(texts):
+    import numpy as np
+
+    a, b = _permutations()
+    signatures = [None] * len(texts)
+    pending = []
+    pending_shingles = 0
+
+    def flush():
+        hashes = np.fromiter((h for _, shingles in pending for h in shingles), dtype=np.uint64, count=pending_shingles)
+        offsets = np.cumsum([0] + [len(shingles) for _, shingles in pending[:-1]])
+        # (a * x + b) mod p for every permutation and shingle; a, x < 2**32
+        # so the product fits in 64 bits. Each text's minimum per permutation
+        # is taken over its own run of columns.
+        values = np.multiply(a[:, None], hashes[None, :])
+        values += b[:, None]
+        np.remainder(values, _PRIME, out=values)
+        for (position, _), signature in zip(pending, np.minimum.reduceat(values, offsets, axis=1).T.tolist()):
+            signatures[position] = signature
+
+    for position, text in enumerate(texts):
+        shingles = _shingle_hashes(text)
+        if not shingles:
+            continue
+        if pending and pending_shingles + len(shingles) > SIGNATURE_CHUNK_SHINGLES:
+            flush()
+            pending, pending_shingles = [], 0
+        pending.append((position, shingles))
+        pending_shingles += len(shingles)
+    if pending:
+        flush()
+    return signatures
+
+
+# Function to compute the MinHash signature of a text's word shingles, as a
+# list of NUM_PERM ints. Returns None for empty text.
+def minhash_signature(text):
+    return minhash_signatures([text])[0]
+
+
+# Function to split a signature into (band, bucket) pairs for the LSH index
+def lsh_buckets(signature):
+    import numpy as np
+    values = np.asarray(signature, dtype=np.int32)
+    buckets = []
+    for band in range(BANDS):
+        chunk = values[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        digest = hashlib.blake2b(chunk, digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "big", signed=True)))
+    return buckets
+
+
+# Function to format ints as a Postgres array literal ("{1,2,3}")
+def array_literal(values):
+    return "{" + ",".join(map(str, values)) + "}"
+
+
+# Function to estimate the Jaccard similarity of two signatures
+def signature_similarity(first, second):
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+# Near-duplicate index over stored jobs. Each canonical job has a row in
+# job_signatures (fingerprint, normalized company and MinHash signature)
+# and one row per band in job_lsh_buckets; job_sources links every scraped
+# posting (site and URL) to the canonical job it was collapsed into.
+#
+# A new posting is a duplicate of a canonical job whose estimated
+# description similarity is at least `similarity`. Candidates are the jobs
+# with the same fingerprint and the jobs of the same company that share an
+# LSH bucket, so lookups stay sublinear in the table size. A fingerprint
+# match alone is not enough: distinct requisitions often share a title,
+# company and city, so postings without a description are never merged.
+#
+# The methods take a cursor so they run in the caller's ingest transaction.
+class PostgresDedupIndex:
+    def __init__(self, similarity=0.8, jobs_table="scraped_jobs"):
+        self.similarity = similarity
+        self.jobs_table = jobs_table
+
+    def _entries(self, records):
+        signatures = minhash_signatures([record.get("description") for record in records])
+        return [{
+            "fingerprint": content_fingerprint(record.get("title"), record.get("company"), record.get("location")),
+            "company_key": normalize_company(record.get("company")),
+            "signature": signature,
+            "buckets": lsh_buckets(signature) if signature else [],
+        } for record, signature in zip(records, signatures)]
+
+    def _known_urls(self, cursor, urls):
+        cursor.execute(f"""
+        SELECT job_url, job_url FROM {self.jobs_table} WHERE job_url = ANY(%s)
+        UNION ALL
+        SELECT s.job_url, j.job_url FROM job_sources s
+        JOIN {self.jobs_table} j ON j.id = s.job_id
+        WHERE s.job_url = ANY(%s)
+        """, (urls, urls))
+        return dict(cursor.fetchall())
+
+    def _candidates(self, cursor, fingerprints, buckets):
+        by_fingerprint = {}
+        if fingerprints:
+            cursor.execute(f"""
+            SELECT g.fingerprint, j.job_url, g.signature FROM job_signatures g
+            JOIN {self.jobs_table} j ON j.id = g.job_id
+            WHERE g.fingerprint = ANY(%s)
+            ORDER BY j.id
+            """, (fingerprints,))
+            for fingerprint, job_url, signature in cursor.fetchall():
+                by_fingerprint.setdefault(fingerprint, []).append((job_url, signature))
+        by_bucket = {}
+        if buckets:
+            bands, values = zip(*buckets)
+            cursor.execute(f"""
+            SELECT b.band, b.bucket, j.job_url, g.company_key, g.signature
+            FROM unnest(%s::smallint[], %s::bigint[]) AS q(band, bucket)
+            JOIN job_lsh_buckets b ON b.band = q.band AND b.bucket = q.bucket
+            JOIN job_signatures g ON g.job_id = b.job_id
+            JOIN {self.jobs_table} j ON j.id = b.job_id
+            """, (list(bands), list(values)))
+            for band, bucket, job_url, company_key, signature in cursor.fetchall():
+                by_bucket.setdefault((band, bucket), []).append((job_url, company_key, signature))
+        return by_fingerprint, by_bucket
+
+    def _best_match(self, entry, by_fingerprint, by_bucket):
+        best = None
+        best_similarity = self.similarity
+        if not entry["signature"]:
+            return None, None
+        compared = set()
+        for job_url, signature in by_fingerprint.get(entry["fingerprint"], ()):
+            compared.add(job_url)
+            if not signature:
+                continue
+            similarity = signature_similarity(entry["signature"], signature)
+            if similarity >= best_similarity:
+                best, best_similarity = job_url, similarity
+        for bucket in entry["buckets"]:
+            for job_url, company_key, signature in by_bucket.get(bucket, ()):
+                if job_url in compared:
+                    continue
+                compared.add(job_url)
+                if company_key and entry["company_key"] and company_key != entry["company_key"]:
+                    continue
+                similarity = signature_similarity(entry["signature"], signature)
+                if similarity >= best_similarity:
+                    best, best_similarity = job_url, similarity
+        return (best, best_similarity) if best else (None, None)
+
+    # Split records (dicts with job_url, site, job_id, title, company,
+    # location and description) into postings to store and duplicates of
+    # stored or earlier postings. Returns (canonical_records, duplicates,
+    # entries): duplicates are dicts with the posting's canonical_url;
+    # entries hold the index data of the canonical records, by job_url.
+    def resolve(self, cursor, records):
+        urls = list(dict.fromkeys(record["job_url"] for record in records))
+        known = self._known_urls(cursor, urls)
+        new_records = {}
+        for record in records:
+            if record["job_url"] not in known:
+                new_records.setdefault(record["job_url"], record)
+        entries = dict(zip(new_records, self._entries(list(new_records.values()))))
+        fingerprints = list({entry["fingerprint"] for entry in entries.values() if entry["fingerprint"]})
+        buckets = list({bucket for entry in entries.values() for bucket in entry["buckets"]})
+        by_fingerprint, by_bucket = self._candidates(cursor, fingerprints, buckets)
+
+        canonical_records = []
+        duplicates = []
+        canonical_urls = set()
+        for record in records:
+            job_url = record["job_url"]
+            if job_url in known:
+                if known[job_url] == job_url:
+                    canonical_records.append(record)
+                else:
+                    duplicates.append(dict(record, canonical_url=known[job_url], similarity=None))
+                continue
+            if job_url in canonical_urls:
+                canonical_records.append(record)
+                continue
+            entry = entries[job_url]
+            canonical_url, similarity = self._best_match(entry, by_fingerprint, by_bucket)
+            if canonical_url:
+                known[job_url] = canonical_url
+                duplicates.append(dict(record, canonical_url=canonical_url, similarity=similarity))
+                continue
+            # New canonical posting; later records in the batch can match it
+            canonical_urls.add(job_url)
+            canonical_records.append(record)
+            if entry["fingerprint"]:
+                by_fingerprint.setdefault(entry["fingerprint"], []).append((job_url, entry["signature"]))
+            for bucket in entry["buckets"]:
+                by_bucket.setdefault(bucket, []).append((job_url, entry["company_key"], entry["signature"]))
+        return canonical_records, duplicates, {url: entries[url] for url in canonical_urls}
+
+    # Index stored canonical records: their signatures, LSH buckets and
+    # their own source link. Records whose job row doesn't exist are ignored.
+    def index(self, cursor, records, entries):
+        records = [record for record in records if record["job_url"] in entries]
+        if not records:
+            return
+        # One row per job, with the signature and the buckets (in band
+        # order) as array literals: adapting them as text is much cheaper
+        # than a VALUES row per bucket, and Postgres expands the bands
+        urls = [record["job_url"] for record in records]
+        indexed = [entries[url] for url in urls]
+        cursor.execute(f"""
+        INSERT INTO job_signatures (job_id, fingerprint, company_key, signature)
+        SELECT j.id, v.fingerprint, v.company_key, v.signature::integer[]
+        FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[]) AS v(job_url, fingerprint, company_key, signature)
+        JOIN {self.jobs_table} j ON j.job_url = v.job_url
+        ON CONFLICT (job_id) DO NOTHING
+        """, (
+            urls,
+            [entry["fingerprint"] for entry in indexed],
+            [entry["company_key"] for entry in indexed],
+            [array_literal(entry["signature"]) if entry["signature"] else None for entry in indexed],
+        ))
+        bucketed = [(url, entry) for url, entry in zip(urls, indexed) if entry["buckets"]]
+        if bucketed:
+            cursor.execute(f"""
+            INSERT INTO job_lsh_buckets (band, bucket, job_id)
+            SELECT b.band - 1, b.bucket, j.id
+            FROM unnest(%s::text[], %s::text[]) AS v(job_url, buckets)
+            JOIN {self.jobs_table} j ON j.job_url = v.job_url
+            CROSS JOIN LATERAL unnest(v.buckets::bigint[]) WITH ORDINALITY AS b(bucket, band)
+            ON CONFLICT DO NOTHING
+            """, (
+                [url for url, _ in bucketed],
+                [array_literal(bucket for _, bucket in entry["buckets"]) for _, entry in bucketed],
+            ))
+        self.link(cursor, [dict(record, canonical_url=record["job_url"]) for record in records])
+
+    # Link postings to their canonical jobs in job_sources. A posting seen
+    # again only has its last_seen_at refreshed. Returns the number of new
+    # links.
+    def link(self, cursor, duplicates):
+        links = {record["job_url"]: record for record in duplicates}
+        if not links:
+            return 0
+        results = execute_values(cursor, f"""
+        INSERT INTO job_sources (job_id, site, job_url, source_job_id)
+        SELECT j.id, v.site, v.job_url, v.source_job_id
+        FROM (VALUES %s) AS v(canonical_url, site, job_url, source_job_id)
+        JOIN {self.jobs_table} j ON j.job_url = v.canonical_url
+        ON CONFLICT (job_url) DO UPDATE SET last_seen_at = now()
+        RETURNING (xmax = 0)
+        """, [
+            (record["canonical_url"], record.get("site"), job_url, record.get("job_id"))
+            for job_url, record in links.items()
+        ], page_size=len(links), fetch=True)
+        return sum(1 for (is_insert,) in results if is_insert)
+
+    # Index stored jobs that have no signature yet (e.g. stored before the
+    # index existed), batch_size at a time. Each becomes a canonical job;
+    # duplicates already stored are not merged. Returns the number indexed.
+    def backfill(self, connection, batch_size=1000):
+        indexed = 0
+        last_id = 0
+        while True:
+            with connection() as conn:
+                cursor = conn.cursor()
+                # Jobs are indexed by job_url, so jobs without one are left out.
+                # Paging by id moves past any row that still fails to index.
+                cursor.execute(f"""
+                SELECT id, job_url, site, job_id, title, company, location, description
+                FROM {self.jobs_table} j
+                WHERE id > %s AND job_url IS NOT NULL
+                AND NOT EXISTS (SELECT 1 FROM job_signatures g WHERE g.job_id = j.id)
+                ORDER BY id
+                LIMIT %s
+                """, (last_id, batch_size))
+                columns = [desc[0] for desc in cursor.description]
+                records = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                self.index(cursor, records, dict(zip((record["job_url"] for record in records), self._entries(records))))
+                conn.commit()
+                cursor.close()
+            indexed += len(records)
+            if len(records) < batch_size:
+                return indexed
+            last_id = records[-1]["id"]
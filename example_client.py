@@ -1,8 +1,10 @@
 import requests
 import json
+import time
 import argparse
 
-def scrape_jobs(api_url, search_term=None, location=None, country_indeed=None, site_names=None, company_name=None):
+def scrape_jobs(api_url, search_term=None, location=None, country_indeed=None, site_names=None, company_name=None,
+                run_async=False, poll_interval=5):
     """
     Scrape jobs using the API
     """
@@ -18,11 +20,15 @@ def scrape_jobs(api_url, search_term=None, location=None, country_indeed=None, s
         "hours_old": 72,
         "country_indeed": country_indeed,
         "save_to_db": True,
-        "company_name": company_name
+        "company_name": company_name,
+        "async": run_async
     }
     
     response = requests.post(f"{api_url}/scrape", json=payload)
     
+    if response.status_code == 202:
+        return wait_for_scrape(api_url, response.json()["task_id"], poll_interval)
+    
     if response.status_code == 200:
         result = response.json()
         print(f"Successfully scraped {result['jobs_found']} jobs")
@@ -32,23 +38,56 @@ def scrape_jobs(api_url, search_term=None, location=None, country_indeed=None, s
         print(response.text)
         return None
 
-def get_jobs(api_url, search=None, limit=10, offset=0):
+def wait_for_scrape(api_url, task_id, poll_interval=5):
+    """
+    Poll a queued scrape until it finishes
+    """
+    print(f"Scrape queued as task {task_id}")
+    while True:
+        response = requests.get(f"{api_url}/scrape/{task_id}")
+        if response.status_code != 200:
+            print(f"Error: {response.status_code}")
+            print(response.text)
+            return None
+        
+        task = response.json()["task"]
+        if task["status"] == "succeeded":
+            result = task["result"]
+            print(f"Successfully scraped {result['jobs_found']} jobs")
+            return result
+        if task["status"] == "failed":
+            print(f"Scrape failed: {task['error']}")
+            return None
+        
+        print(f"Task {task['status']}: {task.get('progress')}")
+        time.sleep(poll_interval)
+
+def get_jobs(api_url, search=None, limit=10, offset=0, cursor=None, count=None):
     """
     Get jobs from the database
     """
     params = {
-        "limit": limit,
-        "offset": offset
+        "limit": limit
     }
     
+    if cursor:
+        params["cursor"] = cursor
+    else:
+        params["offset"] = offset
+    
     if search:
         params["search"] = search
     
+    if count:
+        params["count"] = count
+    
     response = requests.get(f"{api_url}/jobs", params=params)
     
     if response.status_code == 200:
         result = response.json()
         print(f"Retrieved {len(result['data'])} jobs (total: {result['total']})")
+        if result.get('next_cursor'):
+            print(f"Next page: --cursor {result['next_cursor']}")
         return result
     else:
         print(f"Error: {response.status_code}")
@@ -89,11 +128,15 @@ if __name__ == "__main__":
     parser.add_argument("--site-names", nargs="+", default=["indeed", "linkedin"], 
                         help="List of job sites to scrape (e.g., indeed linkedin ycombinator)")
     parser.add_argument("--company-name", help="Company name for YCombinator scraping")
+    parser.add_argument("--async", dest="run_async", action="store_true",
+                        help="Queue the scrape and poll for the result")
     
     # Get mode arguments
     parser.add_argument("--search", help="Search term for filtering jobs")
     parser.add_argument("--limit", type=int, default=10, help="Number of jobs to retrieve")
     parser.add_argument("--offset", type=int, default=0, help="Offset for pagination")
+    parser.add_argument("--cursor", help="Page token returned by a previous request")
+    parser.add_argument("--count", choices=["exact", "estimate", "none"], help="How the total is computed")
     
     args = parser.parse_args()
     
@@ -116,7 +159,8 @@ if __name__ == "__main__":
             location=args.location,
             country_indeed=args.country_indeed,
             site_names=args.site_names,
-            company_name=args.company_name
+            company_name=args.company_name,
+            run_async=args.run_async
         )
         
         if result and result.get("jobs_data"):
@@ -129,7 +173,9 @@ if __name__ == "__main__":
             api_url=args.api_url,
             search=args.search,
             limit=args.limit,
-            offset=args.offset
+            offset=args.offset,
+            cursor=args.cursor,
+            count=args.count
         )
         
         if result:
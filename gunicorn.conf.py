@@ -0,0 +1,126 @@
+# Gunicorn settings for serving the API in production:
+#
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# SERVE_POOL picks the defaults for one of three deployments:
+#   all    - one server for every endpoint (default)
+#   query  - /jobs, /health, task and schedule reads; many short requests
+#            (the only pool APP_PROFILE=query can run)
+#   scrape - /scrape and /ycombinator/batch; few long-running requests
+# Run a query and a scrape server side by side (e.g. on ports 5000 and 5001)
+# and route /scrape* and /ycombinator/* to the scrape one, so read latency is
+# isolated from scrape load. Every setting can be overridden with the
+# WEB_* variables below.
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# APP_PROFILE=query serves only /jobs, /jobs/stats, /health and /metrics
+# (see app.py), for read replicas, so it only fits the query pool: SERVE_POOL
+# defaults to it, and any other pool is refused. The values are exported so
+# app.py sees the same ones.
+profile = os.getenv("APP_PROFILE", "full")
+pool = os.getenv("SERVE_POOL") or ("query" if profile == "query" else "all")
+if profile == "query" and pool != "query":
+    raise ValueError(f"APP_PROFILE=query can't serve SERVE_POOL={pool}; use SERVE_POOL=query")
+os.environ["APP_PROFILE"] = profile
+os.environ["SERVE_POOL"] = pool
+cores = multiprocessing.cpu_count()
+
+# Defaults per pool: workers, threads per worker, worker timeout (seconds)
+POOL_DEFAULTS = {
+    "all": (cores + 1, 8, 120),
+    "query": (2 * cores + 1, 4, 30),
+    "scrape": (2, 4, 600),
+}
+if pool not in POOL_DEFAULTS:
+    raise ValueError(f"Unsupported SERVE_POOL: {pool}")
+default_workers, default_threads, default_timeout = POOL_DEFAULTS[pool]
+
+bind = os.getenv("WEB_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(default_workers)))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", str(default_threads)))
+timeout = int(os.getenv("WEB_TIMEOUT", str(default_timeout)))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+
+# Recycle each worker after a number of requests (with jitter so they don't
+# all restart together) to bound memory growth from scraper sessions
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "100"))
+
+accesslog = os.getenv("WEB_ACCESS_LOG", "-")
+errorlog = "-"
+
+# When one pool serves everything, leave at least half of the threads free
+# for queries while synchronous scrapes run
+if pool == "all":
+    os.environ.setdefault("SCRAPE_MAX_INFLIGHT", str(max(1, threads // 2)))
+# Background scrape workers, the scheduler, job retention and the stats
+# refresher run in the scrape pool (or the single pool), never in query workers
+run_background = os.getenv(
+    "WEB_BACKGROUND_WORKERS", "false" if pool == "query" else "true"
+).lower() in ("true", "1", "yes")
+
+# Each worker's database pool: a connection per thread, since a request
+# (a streamed export for the whole response) holds one, plus one reserved
+# for each scrape worker, the scheduler, job retention and the stats
+# refresher. Set here rather than defaulted, since .env usually sets
+# DB_POOL_MAX_SIZE for the development server; WEB_DB_POOL_MAX_SIZE overrides it.
+background_connections = int(os.getenv("SCRAPE_WORKERS", "2")) + 3 if run_background else 0
+db_pool_max_size = int(os.getenv("WEB_DB_POOL_MAX_SIZE", str(threads + background_connections)))
+os.environ["DB_POOL_MAX_SIZE"] = str(db_pool_max_size)
+
+
+def on_starting(server):
+    # Apply schema migrations, index stored jobs for duplicate detection and
+    # bring the job stats views up to date once, before any worker starts
+    # serving
+    from app import backfill_dedup_index, close_db_pool, ensure_schema, refresh_job_stats
+
+    try:
+        ensure_schema()
+        if profile == "full":
+            backfill_dedup_index()
+    except Exception as e:
+        server.log.warning(f"Could not initialize database schema at startup: {e}")
+    try:
+        refresh_job_stats()
+    except Exception as e:
+        server.log.warning(f"Could not refresh job stats at startup: {e}")
+    finally:
+        # Forked workers must open their own connections
+        close_db_pool()
+
+
+def post_worker_init(worker):
+    if not run_background:
+        return
+    from app import start_job_retention, start_job_stats, start_scheduler, start_scrape_workers
+
+    try:
+        start_scrape_workers()
+    except Exception as e:
+        worker.log.warning(f"Could not start scrape workers: {e}")
+    try:
+        start_scheduler()
+    except Exception as e:
+        worker.log.warning(f"Could not start scrape scheduler: {e}")
+    try:
+        start_job_retention()
+    except Exception as e:
+        worker.log.warning(f"Could not start job retention: {e}")
+    try:
+        start_job_stats()
+    except Exception as e:
+        worker.log.warning(f"Could not start job stats refresh: {e}")
+
+
+def worker_exit(server, worker):
+    from app import stop_background_workers
+
+    stop_background_workers(timeout=graceful_timeout)
@@ -0,0 +1,211 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Default histogram buckets (seconds), from 1ms to 10 minutes
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+# Monotonically increasing count, optionally split by labels
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+# Distribution of observed values in cumulative buckets, with sum and count
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def _samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# Value read from a callback at scrape time. The callback returns a number,
+# or a dict of label tuples to numbers when the gauge has labels.
+class GaugeFunction(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, func, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+
+    def _samples(self):
+        values = self.func()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+# Set of metrics rendered together in the Prometheus text format
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_function(self, name, documentation, func, labelnames=()):
+        return self.register(GaugeFunction(name, documentation, func, labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "jobscraper_stage_duration_seconds",
+    "Time spent in each processing stage",
+    ["stage"],
+)
+
+# Spans recorded for the current request when profiling is on; a list of
+# (stage, seconds) shared with threads started through copy_context()
+_profile = contextvars.ContextVar("profile", default=None)
+
+
+# Function to start collecting spans for the current request
+def start_profile():
+    spans = []
+    _profile.set(spans)
+    return spans
+
+
+# Function to stop collecting spans and return the collected (stage, seconds) pairs
+def end_profile():
+    spans = _profile.get()
+    _profile.set(None)
+    return spans or []
+
+
+# Function to format collected spans as a Server-Timing header value. Spans
+# of the same stage are summed; durations are in milliseconds.
+def server_timing(spans):
+    totals = {}
+    counts = {}
+    for stage, seconds in spans:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+        counts[stage] = counts.get(stage, 0) + 1
+    parts = []
+    for stage, seconds in totals.items():
+        name = stage.replace(".", "-")
+        description = f';desc="{counts[stage]}x"' if counts[stage] > 1 else ""
+        parts.append(f"{name};dur={seconds * 1000:.1f}{description}")
+    return ", ".join(parts)
+
+
+# Context manager timing one stage, e.g. with span("db.ingest_batch"): ...
+# The duration is observed in STAGE_SECONDS and added to the request profile.
+@contextmanager
+def span(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        spans = _profile.get()
+        if spans is not None:
+            spans.append((stage, seconds))
@@ -0,0 +1,137 @@
+import random
+import re
+import threading
+import time
+
+# Error messages that mean the site is throttling us
+RATE_LIMIT_RE = re.compile(r"\b429\b|rate.?limit|too many requests|throttl", re.IGNORECASE)
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+# Token bucket refilled continuously at rate tokens per second, holding at
+# most capacity tokens. The rate can be changed while in use.
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+
+# Concurrency and request-rate limits for one site. The rate adapts to what
+# the site tolerates: it is halved whenever a call fails with a rate-limit
+# error and creeps back up towards max_rate after each success (AIMD).
+class SiteLimit:
+    def __init__(self, concurrency, rate_per_minute, min_rate_per_minute=1):
+        self.concurrency = concurrency
+        self.max_rate = rate_per_minute / 60
+        self.min_rate = min(min_rate_per_minute, rate_per_minute) / 60
+        self.bucket = TokenBucket(self.max_rate, capacity=max(1, concurrency))
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+
+    @property
+    def rate_per_minute(self):
+        return self.bucket.rate * 60
+
+    def throttled(self):
+        with self._lock:
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+
+    def succeeded(self):
+        with self._lock:
+            if self.bucket.rate < self.max_rate:
+                self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.max_rate / 10))
+
+
+# Per-site limits applied to every scrape call in this process. Each call
+# waits for a concurrency slot and a rate token for its site, and failed
+# calls are retried with exponential backoff and full jitter.
+class SiteLimiter:
+    def __init__(self, default_concurrency=2, default_rate_per_minute=60, limits=None,
+                 retries=2, backoff_base=2.0, backoff_max=60.0, acquire_timeout=None):
+        self.default_concurrency = default_concurrency
+        self.default_rate_per_minute = default_rate_per_minute
+        self.overrides = limits or {}
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def limit(self, site):
+        with self._lock:
+            if site not in self._limits:
+                override = self.overrides.get(site, {})
+                self._limits[site] = SiteLimit(
+                    override.get("concurrency", self.default_concurrency),
+                    override.get("rate_per_minute", self.default_rate_per_minute),
+                )
+            return self._limits[site]
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, site, func):
+        limit = self.limit(site)
+        attempt = 0
+        while True:
+            with limit.slots:
+                if not limit.bucket.acquire(self.acquire_timeout):
+                    raise RateLimitTimeout(f"Timed out waiting for the {site} rate limit")
+                try:
+                    result = func()
+                except Exception as e:
+                    if RATE_LIMIT_RE.search(str(e)):
+                        limit.throttled()
+                    if attempt >= self.retries:
+                        raise
+                    error = e
+                else:
+                    limit.succeeded()
+                    return result
+            # Back off outside the slot so other calls to the site can proceed
+            delay = self.backoff(attempt)
+            attempt += 1
+            print(f"Retrying {site} in {delay:.1f}s (attempt {attempt + 1}): {error}")
+            time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {
+                site: {
+                    "concurrency": limit.concurrency,
+                    "rate_per_minute": round(limit.rate_per_minute, 2),
+                    "max_rate_per_minute": round(limit.max_rate * 60, 2),
+                }
+                for site, limit in self._limits.items()
+            }
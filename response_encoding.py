@@ -0,0 +1,275 @@
+import importlib.util
+import io
+import json
+import sys
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+# Optional dependencies: orjson speeds up JSON encoding, zstandard adds zstd
+# compression and pyarrow the Arrow and Parquet formats. Without them the
+# app falls back to the standard library encoder and gzip only. pyarrow is
+# large, so it is imported by the first Arrow or Parquet response.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+pa = None
+pq = None
+
+# Whether the arrow and parquet formats can be produced
+COLUMNAR_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+
+# Mimetypes that are already compressed and not worth compressing again
+PRECOMPRESSED_MIMETYPES = (PARQUET_MIMETYPE,)
+
+
+# JSON provider that encodes with orjson when it is installed. Values orjson
+# doesn't handle natively, and dates (so they keep Flask's HTTP date format),
+# are converted by Flask's default hook. Keys are not sorted.
+class FastJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+
+    if orjson is not None:
+        _options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+        # With OPT_SERIALIZE_NUMPY orjson imports numpy on the first value it
+        # doesn't handle natively (e.g. a Decimal); only ask for it once numpy
+        # is loaded, which it must be for numpy values to exist
+        def _option(self):
+            if "numpy" in sys.modules:
+                return self._options | orjson.OPT_SERIALIZE_NUMPY
+            return self._options
+
+        def dumps(self, obj, **kwargs):
+            # Formatting options (indent, sort_keys, ...) need the standard encoder
+            if kwargs:
+                return super().dumps(obj, **kwargs)
+            return orjson.dumps(obj, default=self.default, option=self._option()).decode("utf-8")
+
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            body = orjson.dumps(obj, default=self.default, option=self._option()) + b"\n"
+            return self._app.response_class(body, mimetype=self.mimetype)
+
+
+# Function to pick a Content-Encoding from the request's Accept-Encoding,
+# preferring zstd over gzip at equal quality. Returns None if neither is accepted.
+def negotiate_encoding(accept_encodings):
+    available = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    best = None
+    best_quality = 0
+    for encoding in available:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compressor(encoding, gzip_level, zstd_level):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=zstd_level).compressobj()
+    return zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+
+# Function to compress a streamed body chunk by chunk. Each chunk is flushed
+# to a block boundary so the client can decode it on arrival; otherwise the
+# compressor would hold it back until the stream ends.
+def _compress_chunks(chunks, compressor, encoding):
+    if encoding == "zstd":
+        sync_flush = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    else:
+        sync_flush = zlib.Z_SYNC_FLUSH
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        if not chunk:
+            continue
+        data = compressor.compress(chunk) + compressor.flush(sync_flush)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Function to compress a response in place. Buffered responses smaller than
+# min_size are left alone; streamed responses are compressed chunk by chunk
+# as they are generated.
+def compress_response(response, encoding, min_size=1024, gzip_level=6, zstd_level=3):
+    response.vary.add("Accept-Encoding")
+    if (
+        encoding is None
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype in PRECOMPRESSED_MIMETYPES
+    ):
+        return response
+
+    compressor = _compressor(encoding, gzip_level, zstd_level)
+    if response.is_streamed:
+        response.response = _compress_chunks(response.response, compressor, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compressor.compress(data) + compressor.flush())
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+# Arrow types for the SQL types used by the jobs tables
+ARROW_SQL_TYPES = {
+    "TEXT": "string",
+    "TIMESTAMP": "timestamp",
+    "TIMESTAMPTZ": "timestamptz",
+    "NUMERIC": "float64",
+    "REAL": "float64",
+    "BOOLEAN": "bool",
+    "INTEGER": "int64",
+}
+
+
+def _to_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _to_float(value):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def _to_int(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def _to_bool(value):
+    return value if isinstance(value, bool) else None
+
+
+def _to_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+_ARROW_CONVERTERS = {
+    "string": _to_string,
+    "timestamp": _to_timestamp,
+    "float64": _to_float,
+    "int64": _to_int,
+    "bool": _to_bool,
+}
+
+
+def _require_pyarrow():
+    global pa, pq
+    if pa is not None:
+        return
+    if not COLUMNAR_AVAILABLE:
+        raise RuntimeError("The arrow and parquet formats require pyarrow (pip install pyarrow)")
+    import pyarrow
+    import pyarrow.parquet
+    pa, pq = pyarrow, pyarrow.parquet
+
+
+# Function to build an Arrow schema for the given columns. column_types maps
+# a column to its SQL type; unknown columns (and embedded records) are strings.
+def arrow_schema(columns, column_types):
+    _require_pyarrow()
+    arrow_types = {
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us"),
+        "timestamptz": pa.timestamp("us", tz="UTC"),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+        "bool": pa.bool_(),
+    }
+    return pa.schema([
+        (column, arrow_types[ARROW_SQL_TYPES.get(column_types.get(column), "string")])
+        for column in columns
+    ])
+
+
+# Function to turn row tuples (ordered like the schema) into an Arrow record
+# batch, converting each value to its column's type. Values that don't fit the
+# column type become nulls.
+def rows_to_batch(rows, schema):
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        kind = "timestamp" if pa.types.is_timestamp(field.type) else str(field.type)
+        kind = {"double": "float64", "bool": "bool"}.get(kind, kind)
+        convert = _ARROW_CONVERTERS[kind]
+        arrays.append(pa.array([convert(value) for value in values], type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Function to stream batches of row tuples as an Arrow IPC stream, yielding
+# the encoded bytes of each batch as soon as it is written
+def stream_arrow(row_batches, schema):
+    _require_pyarrow()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in row_batches:
+            writer.write_batch(rows_to_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+# Function to encode batches of row tuples as a Parquet file. Parquet writes
+# its footer last, so the file is built in memory before it is returned.
+def parquet_bytes(row_batches, schema):
+    _require_pyarrow()
+    output = io.BytesIO()
+    with pq.ParquetWriter(output, schema, compression="zstd") as writer:
+        for rows in row_batches:
+            writer.write_batch(rows_to_batch(rows, schema))
+    return output.getvalue()
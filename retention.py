@@ -0,0 +1,184 @@
+import re
+import threading
+import traceback
+
+import psycopg2
+
+
+# Expiry of stale jobs. A job whose last_seen_at is more than retention_days
+# old is deleted from the jobs table in batches of batch_size; each batch is
+# one short transaction and rows locked by another process are skipped, so
+# several processes can run it at once. With archive=True the deleted rows
+# are first copied (as JSONB) into the {jobs_table}_archive table, which is
+# range-partitioned by month of archiving. Archive partitions older than
+# archive_retention_months are dropped whole, a metadata-only operation.
+#
+# The jobs table itself is not partitioned (its unique job_url and the
+# foreign keys to its id can't include a partition key), so expiry is
+# still row deletes there. A run that deleted rows ends with a plain
+# VACUUM of vacuum_tables (the jobs table by default), which doesn't block
+# reads or writes, so later ingests reuse the freed space instead of
+# growing the table while it waits for autovacuum.
+class PostgresJobRetention:
+    def __init__(self, connection, jobs_table="scraped_jobs", retention_days=0, archive=True,
+                 archive_retention_months=12, batch_size=5000, interval=3600.0, vacuum_tables=None,
+                 on_expired=None):
+        self.connection = connection
+        self.jobs_table = jobs_table
+        self.archive_table = f"{jobs_table}_archive"
+        self.retention_days = retention_days
+        self.archive = archive
+        self.archive_retention_months = archive_retention_months
+        self.batch_size = batch_size
+        self.interval = interval
+        self.vacuum_tables = tuple(vacuum_tables) if vacuum_tables is not None else (jobs_table,)
+        # Called with the cursor of each batch that removed jobs, before it commits
+        self.on_expired = on_expired
+        self._partition_re = re.compile(rf"^{re.escape(self.archive_table)}_(\d{{4}})_(\d{{2}})$")
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # Create the archive partition for the current month if it is missing
+    def _ensure_archive_partition(self, conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+            SELECT to_char(date_trunc('month', now()), 'YYYY_MM'),
+                   date_trunc('month', now()), date_trunc('month', now()) + interval '1 month'
+            """)
+            suffix, start, end = cursor.fetchone()
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.archive_table}_{suffix}
+            PARTITION OF {self.archive_table} FOR VALUES FROM (%s) TO (%s)
+            """, (start, end))
+            conn.commit()
+        except psycopg2.Error as e:
+            # Another process created it concurrently
+            conn.rollback()
+            print(f"Could not create archive partition: {e}")
+        finally:
+            cursor.close()
+
+    # Expire one batch of stale jobs. Returns the number of rows removed.
+    def _expire_batch(self, conn):
+        stale = f"""
+        DELETE FROM {self.jobs_table} WHERE id IN (
+            SELECT id FROM {self.jobs_table}
+            WHERE last_seen_at < now() - %s * interval '1 day'
+            ORDER BY last_seen_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        """
+        cursor = conn.cursor()
+        try:
+            if self.archive:
+                cursor.execute(f"""
+                WITH expired AS ({stale} RETURNING *)
+                INSERT INTO {self.archive_table} (id, job_url, site, scraped_at, last_seen_at, record)
+                SELECT id, job_url, site, scraped_at, last_seen_at, to_jsonb(expired) - 'search_vector'
+                FROM expired
+                """, (self.retention_days, self.batch_size))
+            else:
+                cursor.execute(stale, (self.retention_days, self.batch_size))
+            removed = cursor.rowcount
+            if removed and self.on_expired:
+                self.on_expired(cursor)
+            conn.commit()
+            return removed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def expire(self):
+        if self.retention_days <= 0:
+            return 0
+        removed = 0
+        while not self._stop.is_set():
+            with self.connection() as conn:
+                if self.archive:
+                    self._ensure_archive_partition(conn)
+                batch = self._expire_batch(conn)
+            removed += batch
+            if batch < self.batch_size:
+                break
+        return removed
+
+    # Vacuum vacuum_tables after expiry. VACUUM can't run in a transaction,
+    # so the connection is switched to autocommit for it.
+    def vacuum(self):
+        if not self.vacuum_tables:
+            return
+        with self.connection() as conn:
+            conn.rollback()
+            conn.autocommit = True
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"VACUUM (ANALYZE) {', '.join(self.vacuum_tables)}")
+            finally:
+                cursor.close()
+                conn.autocommit = False
+
+    # Drop archive partitions whose month ended more than
+    # archive_retention_months ago. Returns the dropped partition names.
+    def drop_archive_partitions(self):
+        if not self.archive or self.archive_retention_months <= 0:
+            return []
+        dropped = []
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            """, (self.archive_table,))
+            partitions = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT to_char(now() - %s * interval '1 month', 'YYYY_MM')", (self.archive_retention_months,))
+            cutoff = cursor.fetchone()[0]
+            for name in sorted(partitions):
+                match = self._partition_re.match(name)
+                if match and f"{match.group(1)}_{match.group(2)}" < cutoff:
+                    cursor.execute(f"DROP TABLE IF EXISTS {name}")
+                    dropped.append(name)
+            conn.commit()
+            cursor.close()
+        return dropped
+
+    def run_once(self):
+        removed = self.expire()
+        if removed:
+            self.vacuum()
+        dropped = self.drop_archive_partitions()
+        if removed or dropped:
+            action = "Archived" if self.archive else "Deleted"
+            print(f"{action} {removed} jobs not seen for {self.retention_days} days; "
+                  f"dropped archive partitions: {dropped or 'none'}")
+        return removed, dropped
+
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="job-retention", daemon=True)
+            self._thread.start()
+        print(f"Started job retention (every {self.interval}s, keeping {self.retention_days} days)")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        with self._lock:
+            if self._thread:
+                self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error expiring stale jobs: {e}")
+                traceback.print_exc()
+            self._stop.wait(self.interval)
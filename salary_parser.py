@@ -0,0 +1,168 @@
+import re
+from collections import namedtuple
+
+# Parsed salary string. Amounts are absolute numbers (e.g. 200000.0) and the
+# currency is an ISO 4217 code. These are the salary columns of scraped_jobs;
+# an equity range in the string is skipped, as the table has no column for it.
+SalaryRange = namedtuple("SalaryRange", ["min_amount", "max_amount", "currency", "interval"])
+EMPTY_SALARY = SalaryRange(None, None, None, None)
+
+# Currency symbols and prefixes mapped to ISO codes
+CURRENCY_SYMBOLS = {
+    "$": "USD",
+    "US$": "USD",
+    "A$": "AUD",
+    "AU$": "AUD",
+    "C$": "CAD",
+    "CA$": "CAD",
+    "HK$": "HKD",
+    "S$": "SGD",
+    "NZ$": "NZD",
+    "R$": "BRL",
+    "MX$": "MXN",
+    "€": "EUR",
+    "£": "GBP",
+    "₹": "INR",
+    "¥": "JPY",
+    "₽": "RUB",
+    "₺": "TRY",
+    "₴": "UAH",
+    "₦": "NGN",
+    "₩": "KRW",
+    "₫": "VND",
+    "₱": "PHP",
+    "฿": "THB",
+    "د.إ": "AED",
+    "৳": "BDT",
+    "₪": "ILS",
+    "RM": "MYR",
+    "R": "ZAR",
+    "zł": "PLN",
+    "kr": "SEK",
+}
+# ISO codes accepted as written, before or after the amount
+CURRENCY_CODES = frozenset([
+    "USD", "EUR", "GBP", "INR", "JPY", "CNY", "RUB", "TRY", "UAH", "NGN", "KRW", "VND",
+    "PHP", "ZAR", "THB", "AED", "BDT", "ILS", "MYR", "BRL", "MXN", "SGD", "AUD", "CAD",
+    "NZD", "HKD", "CHF", "SEK", "NOK", "DKK", "PLN",
+])
+CURRENCY_TABLE = dict(CURRENCY_SYMBOLS, **{code: code for code in CURRENCY_CODES})
+
+# Amount suffixes, case-insensitive ("L"/"Cr" are lakh and crore)
+MULTIPLIERS = {
+    "k": 1e3,
+    "m": 1e6,
+    "mm": 1e6,
+    "b": 1e9,
+    "l": 1e5,
+    "lakh": 1e5,
+    "cr": 1e7,
+}
+
+# Longest tokens first so that "HK$" wins over "$" and "RM" over "R"
+_currency_pattern = "|".join(
+    re.escape(token) for token in sorted(CURRENCY_TABLE, key=len, reverse=True)
+)
+_multiplier_pattern = "|".join(sorted(MULTIPLIERS, key=len, reverse=True))
+
+# Currency tokens are matched case-sensitively so that e.g. the "r" in
+# "senior 5" is not read as rand
+AMOUNT_RE = re.compile(
+    rf"(?P<currency>(?-i:{_currency_pattern}))?\s*"
+    rf"(?P<number>\d[\d,]*(?:\.\d+)?)"
+    rf"(?:\s*(?P<multiplier>{_multiplier_pattern})(?![a-z]))?"
+    rf"(?:\s*(?P<trailing_currency>(?-i:{'|'.join(sorted(CURRENCY_CODES))}))\b)?",
+    re.IGNORECASE,
+)
+EQUITY_RE = re.compile(
+    r"(?P<min>\d+(?:\.\d+)?)\s*%"
+    r"(?:\s*(?:-|–|—|to)\s*(?P<max>\d+(?:\.\d+)?)\s*%)?",
+    re.IGNORECASE,
+)
+INTERVAL_RE = re.compile(
+    r"(?:/|\bper\s+|\ban?\s+)\s*(?P<unit>hour|hr|h|day|week|wk|month|mo|year|yr|annum)\b"
+    r"|\b(?P<word>hourly|daily|weekly|monthly|yearly|annually|annual)\b",
+    re.IGNORECASE,
+)
+INTERVALS = {
+    "hour": "hourly", "hr": "hourly", "h": "hourly", "hourly": "hourly",
+    "day": "daily", "daily": "daily",
+    "week": "weekly", "wk": "weekly", "weekly": "weekly",
+    "month": "monthly", "mo": "monthly", "monthly": "monthly",
+    "year": "yearly", "yr": "yearly", "annum": "yearly",
+    "yearly": "yearly", "annually": "yearly", "annual": "yearly",
+}
+
+
+def _to_amount(match):
+    number = float(match.group("number").replace(",", ""))
+    multiplier = match.group("multiplier")
+    if multiplier:
+        number *= MULTIPLIERS[multiplier.lower()]
+    return number
+
+
+# Function to parse a salary string such as "$200K - $240K  0.05% - 0.20%".
+# Unparseable or empty input returns EMPTY_SALARY.
+def parse_salary(text):
+    if not text or not isinstance(text, str):
+        return EMPTY_SALARY
+
+    # Cut out the equity range first so its numbers aren't read as amounts
+    equity = EQUITY_RE.search(text)
+    if equity:
+        text = text[:equity.start()] + " " + text[equity.end():]
+
+    amounts = []
+    currency = None
+    for match in AMOUNT_RE.finditer(text):
+        token = match.group("currency") or match.group("trailing_currency")
+        if token and currency is None:
+            currency = CURRENCY_TABLE[token]
+        amounts.append(_to_amount(match))
+        if len(amounts) == 2:
+            break
+
+    min_amount = max_amount = interval = None
+    if amounts:
+        min_amount = amounts[0]
+        max_amount = amounts[-1]
+        found = INTERVAL_RE.search(text)
+        if found:
+            interval = INTERVALS[(found.group("unit") or found.group("word")).lower()]
+        else:
+            # Assume yearly salary if not specified
+            interval = "yearly"
+
+    return SalaryRange(min_amount, max_amount, currency, interval)
+
+
+# Function to parse many salary strings at once. Each distinct string is
+# parsed only once, since scraped salary strings repeat heavily. A pandas
+# Series input is deduplicated with pd.factorize and returns a DataFrame with
+# one column per SalaryRange field and the same index; any other iterable
+# returns a list.
+def parse_salaries(values):
+    is_series = hasattr(values, "index") and hasattr(values, "to_frame")
+    if is_series:
+        import pandas as pd
+
+        # Non-string values (None, NaN) get code -1, which take() maps to the
+        # empty result appended last
+        strings = values.where(values.map(type) == str)
+        codes, uniques = pd.factorize(strings)
+        parsed = [parse_salary(value) for value in uniques] + [EMPTY_SALARY]
+        frame = pd.DataFrame(parsed, columns=SalaryRange._fields)
+        frame = frame.take(codes)
+        frame.index = values.index
+        return frame
+
+    # Non-string values (None, NaN) all share the empty result
+    cache = {None: EMPTY_SALARY}
+    results = []
+    for value in values:
+        key = value if isinstance(value, str) else None
+        if key not in cache:
+            cache[key] = parse_salary(value)
+        results.append(cache[key])
+    return results
@@ -0,0 +1,158 @@
+import json
+import threading
+import traceback
+
+from scrape_queue import QUEUED, RUNNING
+
+# Columns returned for a schedule
+SCHEDULE_COLUMNS = (
+    "id", "name", "params", "interval_seconds", "enabled", "next_run_at",
+    "last_run_at", "last_task_id", "skipped_runs", "created_at", "updated_at",
+)
+# Columns that can be changed after a schedule is created
+SCHEDULE_UPDATABLE = ("name", "params", "interval_seconds", "enabled", "next_run_at")
+
+
+# Scrape definitions stored in the scrape_schedules table. Due schedules are
+# claimed with FOR UPDATE SKIP LOCKED and their next_run_at is pushed forward
+# in the same statement, so each run is claimed by exactly one process even
+# when several run a scheduler.
+class PostgresScheduleStore:
+    def __init__(self, connection, dumps=json.dumps, jitter=0.1):
+        self.connection = connection
+        self.dumps = dumps
+        # Fraction of the interval added at random to each next_run_at so
+        # schedules sharing an interval drift apart instead of firing together
+        self.jitter = jitter
+
+    def _fetch(self, query, params=(), one=False):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()] if columns else []
+            conn.commit()
+            cursor.close()
+        return (rows[0] if rows else None) if one else rows
+
+    def create(self, name, params, interval_seconds, enabled=True):
+        return self._fetch(f"""
+        INSERT INTO scrape_schedules (name, params, interval_seconds, enabled)
+        VALUES (%s, %s, %s, %s)
+        RETURNING {', '.join(SCHEDULE_COLUMNS)}
+        """, (name, self.dumps(params), interval_seconds, enabled), one=True)
+
+    def list(self):
+        return self._fetch(f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM scrape_schedules ORDER BY id")
+
+    def get(self, schedule_id):
+        return self._fetch(
+            f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM scrape_schedules WHERE id = %s",
+            (schedule_id,), one=True
+        )
+
+    def update(self, schedule_id, **fields):
+        fields = {key: value for key, value in fields.items() if key in SCHEDULE_UPDATABLE}
+        if not fields:
+            return self.get(schedule_id)
+        if "params" in fields:
+            fields["params"] = self.dumps(fields["params"])
+        assignments = ", ".join(f"{key} = %s" for key in fields)
+        return self._fetch(f"""
+        UPDATE scrape_schedules SET {assignments}, updated_at = now()
+        WHERE id = %s
+        RETURNING {', '.join(SCHEDULE_COLUMNS)}
+        """, tuple(fields.values()) + (schedule_id,), one=True)
+
+    def delete(self, schedule_id):
+        return self._fetch(
+            "DELETE FROM scrape_schedules WHERE id = %s RETURNING id",
+            (schedule_id,), one=True
+        ) is not None
+
+    def claim_due(self, limit=10):
+        rows = self._fetch("""
+        UPDATE scrape_schedules
+        SET next_run_at = now() + interval_seconds * (1 + %s * random()) * interval '1 second',
+            updated_at = now()
+        WHERE id IN (
+            SELECT id FROM scrape_schedules
+            WHERE enabled AND next_run_at <= now()
+            ORDER BY next_run_at
+            FOR UPDATE SKIP LOCKED
+            LIMIT %s
+        )
+        RETURNING id, name, params, last_task_id
+        """, (self.jitter, limit))
+        for row in rows:
+            if isinstance(row["params"], str):
+                row["params"] = json.loads(row["params"])
+        return rows
+
+    def record_run(self, schedule_id, task_id):
+        self._fetch("""
+        UPDATE scrape_schedules SET last_task_id = %s, last_run_at = now(), updated_at = now()
+        WHERE id = %s
+        """, (task_id, schedule_id))
+
+    def record_skip(self, schedule_id):
+        self._fetch("""
+        UPDATE scrape_schedules SET skipped_runs = skipped_runs + 1, updated_at = now()
+        WHERE id = %s
+        """, (schedule_id,))
+
+
+# Background thread that enqueues due schedules onto the scrape queue, where
+# the regular scrape workers run them. A schedule whose previous run is still
+# queued or running is skipped for that interval instead of overlapping it.
+class ScrapeScheduler:
+    def __init__(self, store, queue, poll_interval=30.0):
+        self.store = store
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="scrape-scheduler", daemon=True)
+            self._thread.start()
+        print(f"Started scrape scheduler (polling every {self.poll_interval}s)")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        with self._lock:
+            if self._thread:
+                self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def run_due(self):
+        enqueued = 0
+        for schedule in self.store.claim_due():
+            last_task = self.queue.get(schedule["last_task_id"]) if schedule["last_task_id"] else None
+            if last_task and last_task["status"] in (QUEUED, RUNNING):
+                print(f"Skipping schedule {schedule['name']}: run {schedule['last_task_id']} is still {last_task['status']}")
+                self.store.record_skip(schedule["id"])
+                continue
+            task_id = self.queue.enqueue(schedule["params"])
+            self.store.record_run(schedule["id"], task_id)
+            print(f"Enqueued schedule {schedule['name']} as scrape task {task_id}")
+            enqueued += 1
+        return enqueued
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                print(f"Error running scrape schedules: {e}")
+                traceback.print_exc()
+            self._stop.wait(self.poll_interval)
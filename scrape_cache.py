@@ -0,0 +1,128 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+# How a scrape uses the cache:
+# "use" returns a fresh cached result if there is one, otherwise scrapes and stores it
+# "refresh" always scrapes and replaces the cached result
+# "bypass" always scrapes and leaves the cache untouched
+CACHE_MODES = ("use", "refresh", "bypass")
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+# Function to build a stable cache key from scrape parameters. Keys are
+# the SHA-256 of the parameters as canonical JSON, so dict order and
+# formatting don't matter; callers normalize values (e.g. sort lists of
+# sites) before calling.
+def cache_key(params):
+    canonical = json.dumps(params, default=_json_default, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# In-process cache. Entries expire ttl seconds after they are stored, and the
+# least recently used entry is evicted once max_entries is exceeded.
+class MemoryScrapeCache:
+    def __init__(self, ttl=900, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry["result"], time.time() - entry["created_at"]
+
+    def set(self, key, params, result):
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {
+                "params": params,
+                "result": result,
+                "created_at": now,
+                "expires_at": now + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache backed by the scrape_cache table, shared by every process using the
+# database. A hit bumps last_used_at; each store removes expired entries and
+# the least recently used ones beyond max_entries.
+class PostgresScrapeCache:
+    def __init__(self, connection, dumps=json.dumps, ttl=900, max_entries=256):
+        self.connection = connection
+        self.dumps = dumps
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def get(self, key):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE scrape_cache SET last_used_at = now()
+            WHERE key = %s AND expires_at > now()
+            RETURNING result, EXTRACT(EPOCH FROM now() - created_at)
+            """, (key,))
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        if row is None:
+            return None
+        result, age = row
+        if isinstance(result, str):
+            result = json.loads(result)
+        return result, float(age)
+
+    def set(self, key, params, result):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO scrape_cache (key, params, result, created_at, expires_at, last_used_at)
+            VALUES (%s, %s, %s, now(), now() + %s * interval '1 second', now())
+            ON CONFLICT (key) DO UPDATE SET
+                params = EXCLUDED.params,
+                result = EXCLUDED.result,
+                created_at = EXCLUDED.created_at,
+                expires_at = EXCLUDED.expires_at,
+                last_used_at = EXCLUDED.last_used_at
+            """, (key, self.dumps(params), self.dumps(result), self.ttl))
+            cursor.execute("DELETE FROM scrape_cache WHERE expires_at <= now()")
+            cursor.execute("""
+            DELETE FROM scrape_cache WHERE key IN (
+                SELECT key FROM scrape_cache
+                ORDER BY last_used_at DESC
+                OFFSET %s
+            )
+            """, (self.max_entries,))
+            conn.commit()
+            cursor.close()
+
+    def clear(self):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM scrape_cache")
+            conn.commit()
+            cursor.close()
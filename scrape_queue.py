@@ -0,0 +1,251 @@
+import json
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Task lifecycle states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+# In-process queue. Tasks are lost on restart and only visible to the process
+# that created them, so this is meant for development and single-process serving.
+class MemoryScrapeQueue:
+    def __init__(self, max_finished=1000):
+        self.max_finished = max_finished
+        self._tasks = OrderedDict()
+        self._pending = []
+        self._condition = threading.Condition()
+
+    def enqueue(self, params):
+        task_id = uuid.uuid4().hex
+        with self._condition:
+            self._tasks[task_id] = {
+                "id": task_id,
+                "status": QUEUED,
+                "params": params,
+                "progress": None,
+                "result": None,
+                "error": None,
+                "attempts": 0,
+                "created_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self._pending.append(task_id)
+            self._condition.notify()
+        return task_id
+
+    def claim(self, worker_id, timeout):
+        with self._condition:
+            if not self._pending:
+                self._condition.wait(timeout)
+            if not self._pending:
+                return None
+            task = self._tasks[self._pending.pop(0)]
+            task["status"] = RUNNING
+            task["attempts"] += 1
+            task["started_at"] = _now()
+            return task["id"], task["params"]
+
+    def update_progress(self, task_id, progress):
+        with self._condition:
+            self._tasks[task_id]["progress"] = progress
+
+    def complete(self, task_id, result):
+        self._finish(task_id, SUCCEEDED, result=result)
+
+    def fail(self, task_id, error):
+        self._finish(task_id, FAILED, error=error)
+
+    def _finish(self, task_id, status, result=None, error=None):
+        with self._condition:
+            task = self._tasks[task_id]
+            task.update(status=status, result=result, error=error, finished_at=_now())
+            # Forget the oldest finished tasks beyond max_finished
+            finished = [key for key, value in self._tasks.items() if value["status"] in FINISHED_STATES]
+            for key in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._tasks[key]
+
+    def get(self, task_id):
+        with self._condition:
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+
+
+# Queue backed by the scrape_tasks table. Workers in any process claim tasks
+# with FOR UPDATE SKIP LOCKED, so HTTP and worker processes can scale separately.
+# Running tasks whose heartbeat is older than stale_after are handed out again,
+# up to max_attempts times.
+class PostgresScrapeQueue:
+    def __init__(self, connection, dumps=json.dumps, poll_interval=1.0, stale_after=1800, max_attempts=3):
+        self.connection = connection
+        self.dumps = dumps
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+
+    def enqueue(self, params):
+        task_id = uuid.uuid4().hex
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO scrape_tasks (id, status, params) VALUES (%s, %s, %s)",
+                (task_id, QUEUED, self.dumps(params))
+            )
+            conn.commit()
+            cursor.close()
+        return task_id
+
+    def claim(self, worker_id, timeout):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            # Give up on stale tasks that already used all their attempts
+            cursor.execute("""
+            UPDATE scrape_tasks
+            SET status = %s, error = 'Worker stopped responding', finished_at = now(), updated_at = now()
+            WHERE status = %s AND attempts >= %s AND updated_at < now() - %s * interval '1 second'
+            """, (FAILED, RUNNING, self.max_attempts, self.stale_after))
+            cursor.execute("""
+            UPDATE scrape_tasks
+            SET status = %s, worker = %s, attempts = attempts + 1,
+                started_at = now(), updated_at = now()
+            WHERE id = (
+                SELECT id FROM scrape_tasks
+                WHERE status = %s
+                   OR (status = %s AND updated_at < now() - %s * interval '1 second')
+                ORDER BY created_at
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, params
+            """, (RUNNING, worker_id, QUEUED, RUNNING, self.stale_after))
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        if row is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return None
+        task_id, params = row
+        if isinstance(params, str):
+            params = json.loads(params)
+        return task_id, params
+
+    def update_progress(self, task_id, progress):
+        self._update(task_id, "progress = %s, updated_at = now()", (self.dumps(progress),))
+
+    def complete(self, task_id, result):
+        self._update(
+            task_id,
+            "status = %s, result = %s, finished_at = now(), updated_at = now()",
+            (SUCCEEDED, self.dumps(result))
+        )
+
+    def fail(self, task_id, error):
+        self._update(
+            task_id,
+            "status = %s, error = %s, finished_at = now(), updated_at = now()",
+            (FAILED, error)
+        )
+
+    def _update(self, task_id, assignments, params):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"UPDATE scrape_tasks SET {assignments} WHERE id = %s", params + (task_id,))
+            conn.commit()
+            cursor.close()
+
+    def get(self, task_id):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT id, status, params, progress, result, error, attempts,
+                   created_at, started_at, finished_at
+            FROM scrape_tasks WHERE id = %s
+            """, (task_id,))
+            row = cursor.fetchone()
+            columns = [desc[0] for desc in cursor.description]
+            cursor.close()
+        return dict(zip(columns, row)) if row else None
+
+
+# Pool of daemon threads that claim tasks from a queue and run them with
+# handler(params, report_progress). The handler's return value is stored as
+# the task result; an exception marks the task as failed.
+class ScrapeWorkerPool:
+    def __init__(self, queue, handler, size=2, poll_timeout=5.0):
+        self.queue = queue
+        self.handler = handler
+        self.size = size
+        self.poll_timeout = poll_timeout
+        self._threads = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for index in range(self.size):
+                thread = threading.Thread(
+                    target=self._run,
+                    name=f"scrape-worker-{index}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        print(f"Started {self.size} scrape workers")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        with self._lock:
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    @property
+    def running(self):
+        return bool(self._threads)
+
+    def _run(self):
+        worker_id = f"{threading.current_thread().name}-{uuid.uuid4().hex[:8]}"
+        while not self._stop.is_set():
+            try:
+                claimed = self.queue.claim(worker_id, self.poll_timeout)
+            except Exception as e:
+                print(f"Error claiming scrape task: {e}")
+                self._stop.wait(self.poll_timeout)
+                continue
+            if claimed is None:
+                continue
+
+            task_id, params = claimed
+            print(f"Worker {worker_id} running scrape task {task_id}")
+
+            def report_progress(progress, task_id=task_id):
+                try:
+                    self.queue.update_progress(task_id, progress)
+                except Exception as e:
+                    print(f"Error reporting progress for scrape task {task_id}: {e}")
+
+            try:
+                result = self.handler(params, report_progress)
+                self.queue.complete(task_id, result)
+            except Exception as e:
+                print(f"Scrape task {task_id} failed: {e}")
+                traceback.print_exc()
+                try:
+                    self.queue.fail(task_id, str(e))
+                except Exception as fail_error:
+                    print(f"Error marking scrape task {task_id} as failed: {fail_error}")
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import math
+from datetime import datetime, timezone
+
+
+# Function to build the key that identifies one incremental scrape source,
+# e.g. {"site": "indeed", "search_term": "react", "location": "london"}.
+# Callers normalize the values first.
+def source_key(scope):
+    canonical = json.dumps(scope, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Function to turn a high-water mark into the hours_old window of the next
+# scrape: the hours since the last scrape, rounded up, plus overlap_hours
+# for postings that are indexed late, capped at max_hours.
+def delta_hours(last_scraped_at, max_hours, overlap_hours=1):
+    if last_scraped_at is None:
+        return max_hours
+    elapsed = (datetime.now(timezone.utc) - last_scraped_at).total_seconds() / 3600
+    hours = max(1, math.ceil(elapsed) + overlap_hours)
+    return min(hours, max_hours) if max_hours else hours
+
+
+# Per-source high-water marks for incremental scraping, stored in the
+# scrape_watermarks and scrape_seen_jobs tables. A watermark records when a
+# source was last scraped; the seen set holds an MD5 of every job_url that
+# source has already returned, so re-listed postings are dropped before
+# they reach the ingest path. Seen entries older than seen_retention_days
+# are pruned, since the scrape window never reaches that far back.
+class PostgresWatermarkStore:
+    def __init__(self, connection, seen_retention_days=30):
+        self.connection = connection
+        self.seen_retention_days = seen_retention_days
+
+    def get(self, keys):
+        if not keys:
+            return {}
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT source_key, last_scraped_at FROM scrape_watermarks WHERE source_key = ANY(%s)",
+                (list(keys),)
+            )
+            rows = cursor.fetchall()
+            conn.commit()
+            cursor.close()
+        return dict(rows)
+
+    def filter_unseen(self, key, job_urls):
+        job_urls = [url for url in job_urls if url]
+        if not job_urls:
+            return set()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT url FROM unnest(%s::text[]) AS url
+            WHERE NOT EXISTS (
+                SELECT 1 FROM scrape_seen_jobs
+                WHERE source_key = %s AND job_hash = md5(url)::uuid
+            )
+            """, (job_urls, key))
+            unseen = {row[0] for row in cursor.fetchall()}
+            conn.commit()
+            cursor.close()
+        return unseen
+
+    def record(self, key, scope, scraped_at, job_urls, jobs_found):
+        job_urls = [url for url in job_urls if url]
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO scrape_watermarks (source_key, scope, last_scraped_at, last_jobs_found)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (source_key) DO UPDATE SET
+                scope = EXCLUDED.scope,
+                last_scraped_at = GREATEST(scrape_watermarks.last_scraped_at, EXCLUDED.last_scraped_at),
+                last_jobs_found = EXCLUDED.last_jobs_found
+            """, (key, json.dumps(scope), scraped_at, jobs_found))
+            if job_urls:
+                cursor.execute("""
+                INSERT INTO scrape_seen_jobs (source_key, job_hash)
+                SELECT %s, md5(url)::uuid FROM unnest(%s::text[]) AS url
+                ON CONFLICT DO NOTHING
+                """, (key, job_urls))
+            cursor.execute("""
+            DELETE FROM scrape_seen_jobs
+            WHERE source_key = %s AND first_seen_at < now() - %s * interval '1 day'
+            """, (key, self.seen_retention_days))
+            conn.commit()
+            cursor.close()
@@ -82,5 +82,6 @@ if [ "$run_api" == "y" ]; then
     echo "Starting the API..."
     python app.py
 else
-    echo "API setup complete. Run 'python app.py' to start the API."
+    echo "API setup complete. Run 'python app.py' to start the API,"
+    echo "or 'gunicorn -c gunicorn.conf.py app:app' in production."
 fi 
\ No newline at end of file
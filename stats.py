@@ -0,0 +1,300 @@
+import threading
+import time
+import traceback
+
+# Materialized views holding the precomputed job statistics, in refresh order
+STATS_VIEWS = ("job_stats_totals", "job_stats_by_site", "job_stats_by_location", "job_stats_by_company",
+               "job_stats_salary")
+# Percentiles of min_amount and max_amount stored per currency and interval
+SALARY_PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# Advisory lock key held while refreshing, so one process refreshes at a time
+REFRESH_LOCK_KEY = 0x6A6F627374617473
+# Single-row table counting the writes to the jobs table that change the stats
+CHANGES_TABLE = "job_stats_changes"
+
+
+# Function to build the SQL of job_stats_totals. It records the changes
+# expression at refresh time, which tells later refreshes whether anything
+# changed since.
+def totals_view_statements(jobs_table, changes):
+    return [
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS job_stats_totals AS
+        SELECT 1 AS id,
+               count(*) AS jobs,
+               count(*) FILTER (WHERE is_remote) AS remote_jobs,
+               count(*) FILTER (WHERE min_amount IS NOT NULL OR max_amount IS NOT NULL) AS with_salary,
+               count(DISTINCT company) AS companies,
+               count(DISTINCT location) AS locations,
+               max(date_posted) AS latest_posted,
+               max(scraped_at) AS last_scraped_at,
+               ({changes}) AS changes,
+               now() AS refreshed_at
+        FROM {jobs_table}
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS job_stats_totals_id_idx ON job_stats_totals (id)",
+    ]
+
+
+# Function to build the SQL of the stats materialized views (a list of
+# statements, for SCHEMA_MIGRATIONS). Every view has a unique index so it can
+# be refreshed CONCURRENTLY, without blocking readers. job_stats_totals
+# first recorded Postgres's insert/update/delete counter of the jobs table;
+# change_counter_statements() replaces it with CHANGES_TABLE.
+def stats_view_statements(jobs_table):
+    percentiles = f"ARRAY{list(SALARY_PERCENTILES)}"
+    pg_stat_changes = (f"SELECT n_tup_ins + n_tup_upd + n_tup_del FROM pg_stat_user_tables "
+                       f"WHERE relid = '{jobs_table}'::regclass")
+    return totals_view_statements(jobs_table, pg_stat_changes) + [
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS job_stats_by_site AS
+        SELECT site,
+               count(*) AS jobs,
+               count(*) FILTER (WHERE is_remote) AS remote_jobs,
+               count(*) FILTER (WHERE min_amount IS NOT NULL OR max_amount IS NOT NULL) AS with_salary,
+               max(date_posted) AS latest_posted,
+               max(scraped_at) AS last_scraped_at
+        FROM {jobs_table}
+        GROUP BY site
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS job_stats_by_site_site_idx ON job_stats_by_site (site)",
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS job_stats_by_location AS
+        SELECT location,
+               count(*) AS jobs,
+               count(*) FILTER (WHERE is_remote) AS remote_jobs
+        FROM {jobs_table}
+        GROUP BY location
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS job_stats_by_location_location_idx ON job_stats_by_location (location)",
+        "CREATE INDEX IF NOT EXISTS job_stats_by_location_jobs_idx ON job_stats_by_location (jobs DESC)",
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS job_stats_by_company AS
+        SELECT company,
+               count(*) AS jobs,
+               count(*) FILTER (WHERE is_remote) AS remote_jobs,
+               array_agg(DISTINCT site ORDER BY site) FILTER (WHERE site IS NOT NULL) AS sites,
+               max(date_posted) AS latest_posted
+        FROM {jobs_table}
+        GROUP BY company
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS job_stats_by_company_company_idx ON job_stats_by_company (company)",
+        "CREATE INDEX IF NOT EXISTS job_stats_by_company_jobs_idx ON job_stats_by_company (jobs DESC)",
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS job_stats_salary AS
+        SELECT currency, interval,
+               count(*) AS jobs,
+               percentile_cont({percentiles}) WITHIN GROUP (ORDER BY min_amount) AS min_amount_percentiles,
+               percentile_cont({percentiles}) WITHIN GROUP (ORDER BY max_amount) AS max_amount_percentiles,
+               avg(min_amount)::float8 AS min_amount_avg,
+               avg(max_amount)::float8 AS max_amount_avg
+        FROM {jobs_table}
+        WHERE currency IS NOT NULL AND (min_amount IS NOT NULL OR max_amount IS NOT NULL)
+        GROUP BY currency, interval
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS job_stats_salary_currency_interval_idx ON job_stats_salary (currency, interval)",
+    ]
+
+
+# Function to build the SQL (for SCHEMA_MIGRATIONS) that creates
+# CHANGES_TABLE and rebuilds job_stats_totals on it. Postgres's table
+# counters are updated asynchronously and reset by a stats reset or a crash;
+# the counter row is written in the same transaction as the jobs, so a
+# refresh sees both or neither.
+def change_counter_statements(jobs_table):
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            changes BIGINT NOT NULL DEFAULT 0,
+            changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        f"INSERT INTO {CHANGES_TABLE} (id) VALUES (1) ON CONFLICT (id) DO NOTHING",
+        "DROP MATERIALIZED VIEW IF EXISTS job_stats_totals",
+    ] + totals_view_statements(jobs_table, f"SELECT changes FROM {CHANGES_TABLE}")
+
+
+# Function to record, in the caller's transaction, that the stats of the
+# jobs table changed. Writers call it just before committing, since the row
+# stays locked until then.
+def mark_jobs_changed(cursor):
+    cursor.execute(f"UPDATE {CHANGES_TABLE} SET changes = changes + 1, changed_at = now() WHERE id = 1")
+
+
+# Refresher of the stats materialized views. Every interval seconds (only
+# after notify() when interval is 0), but at most every min_interval
+# seconds, the views are refreshed CONCURRENTLY if the jobs table changed
+# since the last refresh. notify() starts the refresher if it isn't running,
+# so every process that stores jobs keeps the views current. Percentiles and
+# distinct counts can't be maintained row by row, so each refresh recomputes
+# the views; readers keep seeing the previous contents until it commits.
+class PostgresJobStats:
+    def __init__(self, connection, jobs_table="scraped_jobs", interval=300.0, min_interval=30.0):
+        self.connection = connection
+        self.jobs_table = jobs_table
+        self.interval = interval
+        self.min_interval = min_interval
+        self._last_refresh = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+        self._changed = threading.Event()
+        self._lock = threading.Lock()
+
+    # Whether the jobs table was written to since the views were refreshed
+    def _changed_since_refresh(self, cursor):
+        cursor.execute(f"""
+        SELECT (SELECT changes FROM job_stats_totals) IS DISTINCT FROM (SELECT changes FROM {CHANGES_TABLE})
+        """)
+        return cursor.fetchone()[0]
+
+    # Refresh the views. Returns False when they were already current or
+    # another process is refreshing them.
+    def refresh(self, force=False):
+        return self._refresh(force) == "refreshed"
+
+    # Refresh the views if needed. Returns "refreshed", "current", or
+    # "locked" when another process is refreshing them.
+    def _refresh(self, force=False):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (REFRESH_LOCK_KEY,))
+                if not cursor.fetchone()[0]:
+                    conn.rollback()
+                    return "locked"
+                if not (force or self._changed_since_refresh(cursor)):
+                    conn.rollback()
+                    return "current"
+                started = time.monotonic()
+                for view in STATS_VIEWS:
+                    cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+                conn.commit()
+                self._last_refresh = time.monotonic()
+                print(f"Refreshed job stats in {self._last_refresh - started:.2f}s")
+                return "refreshed"
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    # Read the precomputed stats, with the limit largest locations and companies
+    def summary(self, limit=20):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                SELECT jobs, remote_jobs, with_salary, companies, locations, latest_posted,
+                       last_scraped_at, refreshed_at
+                FROM job_stats_totals
+                """)
+                row = cursor.fetchone()
+                columns = [column[0] for column in cursor.description]
+                totals = dict(zip(columns, row)) if row else {column: None for column in columns}
+                refreshed_at = totals.pop("refreshed_at")
+                totals["remote_share"] = remote_share(totals)
+
+                cursor.execute("""
+                SELECT site, jobs, remote_jobs, with_salary, latest_posted, last_scraped_at
+                FROM job_stats_by_site ORDER BY jobs DESC, site
+                """)
+                by_site = fetch_dicts(cursor)
+                cursor.execute("SELECT location, jobs, remote_jobs FROM job_stats_by_location "
+                               "ORDER BY jobs DESC, location LIMIT %s", (limit,))
+                by_location = fetch_dicts(cursor)
+                cursor.execute("SELECT company, jobs, remote_jobs, sites, latest_posted FROM job_stats_by_company "
+                               "ORDER BY jobs DESC, company LIMIT %s", (limit,))
+                by_company = fetch_dicts(cursor)
+                for group in by_site + by_location + by_company:
+                    group["remote_share"] = remote_share(group)
+
+                cursor.execute("""
+                SELECT currency, interval, jobs, min_amount_percentiles, max_amount_percentiles,
+                       min_amount_avg, max_amount_avg
+                FROM job_stats_salary ORDER BY jobs DESC, currency, interval
+                """)
+                salary = []
+                for group in fetch_dicts(cursor):
+                    salary.append({
+                        "currency": group["currency"],
+                        "interval": group["interval"],
+                        "jobs": group["jobs"],
+                        "min_amount": percentile_dict(group["min_amount_percentiles"], group["min_amount_avg"]),
+                        "max_amount": percentile_dict(group["max_amount_percentiles"], group["max_amount_avg"]),
+                    })
+                conn.commit()
+            finally:
+                cursor.close()
+
+        return {
+            "refreshed_at": refreshed_at,
+            "totals": totals,
+            "by_site": by_site,
+            "by_location": by_location,
+            "by_company": by_company,
+            "salary": salary,
+        }
+
+    # Ask for a refresh soon, e.g. after an ingest stored new jobs. Starts
+    # the refresher if this process doesn't run it yet.
+    def notify(self):
+        self._changed.set()
+        if self._thread is None and not self._stop.is_set():
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="job-stats", daemon=True)
+            self._thread.start()
+        every = f"every {self.interval}s" if self.interval > 0 else "after ingests only"
+        print(f"Started job stats refresh ({every}, at most every {self.min_interval}s after ingest)")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._changed.set()
+        with self._lock:
+            if self._thread:
+                self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Cleared before refreshing, so a notify() from an ingest that
+            # commits during the refresh triggers another one
+            self._changed.clear()
+            try:
+                if self._refresh() == "locked":
+                    # The other process may have started before our latest
+                    # changes committed; check again after min_interval
+                    self._changed.set()
+                    self._stop.wait(self.min_interval)
+            except Exception as e:
+                print(f"Error refreshing job stats: {e}")
+                traceback.print_exc()
+            self._changed.wait(self.interval if self.interval > 0 else None)
+            # Let ingest notifications pile up for at least min_interval
+            wait = self.min_interval - (time.monotonic() - self._last_refresh)
+            if wait > 0:
+                self._stop.wait(wait)
+
+
+def fetch_dicts(cursor):
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def remote_share(group):
+    if not group.get("jobs"):
+        return None
+    return round(group["remote_jobs"] / group["jobs"], 4)
+
+
+def percentile_dict(values, average):
+    values = values or [None] * len(SALARY_PERCENTILES)
+    result = {f"p{round(pct * 100)}": value for pct, value in zip(SALARY_PERCENTILES, values)}
+    result["avg"] = average
+    return result
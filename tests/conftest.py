@@ -0,0 +1,102 @@
+"""
+Shared fixtures for the test suite.
+
+Tests that need PostgreSQL run only when TEST_DB_NAME names a database they
+may empty; they are skipped otherwise. The other DB_* variables (host, port,
+user, password) are read as usual:
+
+    TEST_DB_NAME=scraper_test python -m pytest -q
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Point app.py at the test database before anything imports it. The tests
+# truncate the tables they use, so they never fall back to DB_NAME
+TEST_DB_NAME = os.getenv("TEST_DB_NAME")
+if TEST_DB_NAME:
+    os.environ["DB_NAME"] = TEST_DB_NAME
+
+# Tables emptied before each database test, dependents first
+TEST_TABLES = (
+    "job_lsh_buckets", "job_signatures", "job_sources", "scraped_jobs", "companies",
+    "scraped_jobs_archive", "scrape_tasks", "scrape_schedules", "scrape_cache",
+    "scrape_seen_jobs", "scrape_watermarks",
+)
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+
+    return app
+
+
+@pytest.fixture(scope="session")
+def schema(app_module):
+    if not TEST_DB_NAME:
+        pytest.skip("TEST_DB_NAME is not set")
+    import psycopg2
+
+    try:
+        app_module.ensure_schema()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Test database unavailable: {e}")
+    return app_module
+
+
+# Connection factory (app.db_connection) over an emptied test database
+@pytest.fixture
+def db(schema):
+    with schema.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"TRUNCATE {', '.join(TEST_TABLES)} RESTART IDENTITY CASCADE")
+        conn.commit()
+        cursor.close()
+    return schema.db_connection
+
+
+# Function that runs one query on the test database and returns all its rows
+@pytest.fixture
+def fetch(db):
+    def fetch_rows(query, params=()):
+        with db() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+                conn.rollback()
+
+    return fetch_rows
+
+
+# Stand-in job boards for scrape tests. JobSpy returns synthetic jobs (see
+# benchmarks/synthetic_jobs.py) and the site limiter never waits. Returns the
+# list of scrape_jobs calls and a dict of per-site overrides: an exception to
+# raise or a DataFrame to return instead.
+@pytest.fixture
+def job_boards(app_module, monkeypatch):
+    from benchmarks.synthetic_jobs import fake_scrape_jobs
+    from rate_limits import SiteLimiter
+
+    calls = []
+    overrides = {}
+
+    def scrape_jobs(**kwargs):
+        calls.append(kwargs)
+        override = overrides.get(kwargs["site_name"][0])
+        if isinstance(override, Exception):
+            raise override
+        if override is not None:
+            return override
+        return fake_scrape_jobs(**kwargs)
+
+    monkeypatch.setattr(app_module, "scrape_jobs", scrape_jobs)
+    monkeypatch.setattr(app_module, "site_limiter", SiteLimiter(default_rate_per_minute=60000, retries=0))
+    return calls, overrides
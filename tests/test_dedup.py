@@ -0,0 +1,112 @@
+import pytest
+
+import dedup
+from benchmarks.synthetic_jobs import make_job
+from dedup import (
+    BANDS, NUM_PERM, content_fingerprint, lsh_buckets, minhash_signature, minhash_signatures,
+    normalize_company, normalize_text, signature_similarity,
+)
+
+
+def test_normalize_text_strips_accents_and_punctuation():
+    assert normalize_text("  Café Ünïcode — Senior/Staff Engineer! ") == "cafe unicode senior staff engineer"
+    assert normalize_text("Plain ASCII, text.") == "plain ascii text"
+    assert normalize_text("東京 Tokyo") == "tokyo"
+    assert normalize_text(None) == ""
+
+
+def test_fingerprint_ignores_formatting_and_legal_suffixes():
+    assert normalize_company("Acme, Inc.") == normalize_company("ACME") == "acme"
+    assert content_fingerprint("Backend Engineer", "Acme, Inc.", "New York, NY") == \
+        content_fingerprint("backend  engineer", "ACME LLC", "New York")
+    assert content_fingerprint("Backend Engineer", "Acme", "Boston") != \
+        content_fingerprint("Backend Engineer", "Acme", "New York")
+    assert content_fingerprint("", "Acme", "Boston") is None
+
+
+def test_bulk_signatures_match_single_signatures(monkeypatch):
+    texts = [make_job(index)["description"] for index in range(6)] + ["", None, "one two"]
+    single = [minhash_signature(text) for text in texts]
+
+    # Small chunks force several numpy passes
+    monkeypatch.setattr(dedup, "SIGNATURE_CHUNK_SHINGLES", 150)
+    assert minhash_signatures(texts) == single
+    assert single[6] is None and single[7] is None
+    assert all(len(signature) == NUM_PERM for signature in single[:6] + single[8:])
+
+
+def test_similarity_tracks_shared_shingles():
+    text = make_job(1)["description"]
+    words = text.split()
+    edited = " ".join(words[:-3] + ["completely", "different", "ending"])
+
+    assert signature_similarity(minhash_signature(text), minhash_signature(text)) == 1.0
+    assert signature_similarity(minhash_signature(text), minhash_signature(edited)) > 0.8
+    assert signature_similarity(minhash_signature(text), minhash_signature(make_job(2)["description"])) < 0.3
+
+
+def test_lsh_buckets_one_per_band():
+    buckets = lsh_buckets(minhash_signature(make_job(1)["description"]))
+
+    assert [band for band, _ in buckets] == list(range(BANDS))
+    assert buckets == lsh_buckets(minhash_signature(make_job(1)["description"]))
+
+
+@pytest.fixture
+def dedup_on(app_module, db, monkeypatch):
+    monkeypatch.setattr(app_module, "DEDUP_ENABLED", True)
+    return app_module
+
+
+def repost(job, site, index):
+    return dict(job, site=site, job_id=None, job_url=f"https://{site}.example.com/repost/{index}")
+
+
+def test_repost_on_another_site_is_merged(dedup_on, fetch):
+    job = make_job(1)
+    dedup_on.ingest_jobs([job])
+
+    # Same posting with reformatted company and location, and a new URL
+    copy = dict(repost(job, "linkedin", 1), company=job["company"] + ", Inc.", location=job["location"].upper())
+    assert dedup_on.ingest_jobs([copy]) == (0, 0, 0, 1)
+    assert fetch("SELECT count(*) FROM scraped_jobs") == [(1,)]
+    assert fetch("""
+    SELECT s.job_url FROM job_sources s JOIN scraped_jobs j ON j.id = s.job_id
+    WHERE j.job_url = %s ORDER BY s.id
+    """, (job["job_url"],)) == [(job["job_url"],), (copy["job_url"],)]
+    # Seen again later, the repost is not merged twice
+    assert dedup_on.ingest_jobs([copy]) == (0, 0, 1, 0)
+
+
+def test_duplicates_within_one_batch_are_merged(dedup_on):
+    job = make_job(1)
+
+    assert dedup_on.ingest_jobs([job, repost(job, "google", 1), repost(job, "linkedin", 2)]) == (1, 0, 0, 2)
+
+
+def test_same_title_company_and_city_with_other_description_is_not_merged(dedup_on):
+    job = make_job(1)
+    # A second opening for the same role: the fingerprint matches but the description doesn't
+    other_opening = dict(repost(job, "indeed", 1), description=make_job(2)["description"])
+    no_description = dict(repost(job, "indeed", 2), description=None)
+
+    assert dedup_on.ingest_jobs([job, other_opening, no_description]) == (3, 0, 0, 0)
+
+
+def test_same_description_at_another_company_is_not_merged(dedup_on):
+    job = make_job(1)
+    other_company = dict(repost(job, "indeed", 1), company="Unrelated Corp", title="Other Title")
+
+    assert dedup_on.ingest_jobs([job, other_company]) == (2, 0, 0, 0)
+
+
+def test_backfill_indexes_jobs_stored_without_dedup(app_module, dedup_on, fetch, monkeypatch):
+    job = make_job(1)
+    monkeypatch.setattr(app_module, "DEDUP_ENABLED", False)
+    app_module.ingest_jobs([job, make_job(2)])
+    monkeypatch.setattr(app_module, "DEDUP_ENABLED", True)
+
+    assert app_module.backfill_dedup_index() == 2
+    assert fetch("SELECT count(*) FROM job_lsh_buckets") == [(2 * BANDS,)]
+    assert app_module.ingest_jobs([repost(job, "google", 1)]) == (0, 0, 0, 1)
+    assert app_module.backfill_dedup_index() == 0
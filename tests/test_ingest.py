@@ -0,0 +1,57 @@
+import pytest
+
+from benchmarks.synthetic_jobs import make_job
+
+
+def make_jobs(count, **fields):
+    return [dict(make_job(index), **fields) for index in range(count)]
+
+
+def test_ingest_splits_rows_into_batches(app_module, db, fetch):
+    inserted, updated, skipped, merged = app_module.ingest_jobs(make_jobs(5), batch_size=2)
+
+    assert (inserted, updated, skipped, merged) == (5, 0, 0, 0)
+    assert fetch("SELECT count(*) FROM scraped_jobs") == [(5,)]
+    # Each distinct (site, company) pair is stored once and linked
+    assert fetch("SELECT count(*) FROM scraped_jobs WHERE company_id IS NULL") == [(0,)]
+
+
+def test_ingest_skips_known_urls(app_module, db):
+    jobs = make_jobs(4)
+    app_module.ingest_jobs(jobs, on_conflict="nothing")
+
+    assert app_module.ingest_jobs(jobs, on_conflict="nothing") == (0, 0, 4, 0)
+
+
+def test_ingest_update_mode_refreshes_stored_jobs(app_module, db, fetch):
+    jobs = make_jobs(3)
+    app_module.ingest_jobs(jobs)
+    rescraped = [dict(job, description="rewritten") for job in jobs]
+
+    assert app_module.ingest_jobs(rescraped, on_conflict="update") == (0, 3, 0, 0)
+    assert fetch("SELECT DISTINCT description FROM scraped_jobs") == [("rewritten",)]
+
+
+def test_bad_row_is_retried_alone(app_module, db, fetch):
+    jobs = make_jobs(5)
+    jobs[2]["date_posted"] = "not a date"
+    retries = app_module.INGEST_BATCH_RETRIES.value()
+
+    inserted, updated, skipped, merged = app_module.ingest_jobs(jobs, batch_size=5)
+
+    assert (inserted, skipped) == (4, 1)
+    assert app_module.INGEST_BATCH_RETRIES.value() == retries + 1
+    assert fetch("SELECT count(*) FROM scraped_jobs WHERE job_url = %s", (jobs[2]["job_url"],)) == [(0,)]
+
+
+def test_jobs_without_url_are_skipped(app_module, db):
+    jobs = make_jobs(3)
+    jobs[0]["job_url"] = None
+
+    assert app_module.ingest_jobs(jobs) == (2, 0, 1, 0)
+
+
+def test_unknown_conflict_mode_fails_before_ingesting(app_module, db, fetch):
+    with pytest.raises(ValueError, match="merge"):
+        app_module.ingest_jobs(make_jobs(2), on_conflict="merge")
+    assert fetch("SELECT count(*) FROM scraped_jobs") == [(0,)]
@@ -0,0 +1,109 @@
+import pytest
+
+from metrics import Counter, GaugeFunction, Histogram, Registry, end_profile, server_timing, span, start_profile
+
+
+def test_counter_renders_labelled_samples():
+    counter = Counter("jobs_total", "Jobs seen", ["site"])
+    counter.inc(site="indeed")
+    counter.inc(2, site="linkedin")
+    counter.inc(site="indeed")
+
+    assert counter.value(site="indeed") == 2
+    assert counter.render().splitlines() == [
+        "# HELP jobs_total Jobs seen",
+        "# TYPE jobs_total counter",
+        'jobs_total{site="indeed"} 2',
+        'jobs_total{site="linkedin"} 2',
+    ]
+
+
+def test_counter_requires_its_labels():
+    counter = Counter("jobs_total", "Jobs seen", ["site"])
+
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        counter.inc(site="indeed", status="ok")
+
+
+def test_label_values_are_escaped():
+    counter = Counter("errors_total", "Errors", ["message"])
+    counter.inc(message='bad "quote"\nnext')
+
+    assert counter.render().splitlines()[-1] == 'errors_total{message="bad \\"quote\\"\\nnext"} 1'
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value)
+
+    assert histogram.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 6.25",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_gauge_function_reads_its_callback():
+    gauge = GaugeFunction("pool_connections", "Connections", lambda: {("idle",): 3, ("used",): 1}, ["state"])
+
+    assert gauge.render().splitlines()[2:] == [
+        'pool_connections{state="idle"} 3',
+        'pool_connections{state="used"} 1',
+    ]
+
+
+def test_registry_rejects_duplicate_names():
+    registry = Registry()
+    registry.counter("a_total", "A")
+
+    with pytest.raises(ValueError):
+        registry.counter("a_total", "A again")
+    assert registry.render().endswith("\n")
+
+
+def test_spans_are_added_to_the_active_profile():
+    spans = start_profile()
+    with span("db.query"):
+        pass
+    with span("db.query"):
+        pass
+    assert end_profile() == spans and [stage for stage, _ in spans] == ["db.query", "db.query"]
+    # No profile is active any more
+    with span("db.query"):
+        pass
+    assert end_profile() == []
+
+
+def test_server_timing_sums_repeated_stages():
+    header = server_timing([("db.query", 0.001), ("db.query", 0.002), ("total", 0.01)])
+
+    assert header == 'db-query;dur=3.0;desc="2x", total;dur=10.0'
+
+
+def test_metrics_endpoint_and_server_timing(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "METRICS_PROFILE_HEADERS", True)
+    client = app_module.app.test_client()
+
+    response = client.get("/metrics", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert "# TYPE jobscraper_http_requests_total counter" in response.get_data(as_text=True)
+    assert "total;dur=" in response.headers["Server-Timing"]
+
+
+def test_unknown_sites_are_rejected_before_scraping(app_module, job_boards):
+    calls, _ = job_boards
+    client = app_module.app.test_client()
+
+    response = client.post("/scrape", json={
+        "site_names": ["indeed", "made-up-board"], "search_term": "python", "location": "Berlin",
+    })
+    assert response.status_code == 400
+    assert "made-up-board" in response.get_json()["error"]
+    assert calls == []
+    assert 'site="made-up-board"' not in app_module.REGISTRY.render()
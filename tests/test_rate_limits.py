@@ -0,0 +1,78 @@
+import pytest
+
+from rate_limits import RateLimitTimeout, SiteLimit, SiteLimiter, TokenBucket
+
+
+def test_token_bucket_gives_up_after_timeout():
+    bucket = TokenBucket(rate=1, capacity=1)
+
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.01)
+
+
+def test_site_limit_halves_rate_when_throttled():
+    limit = SiteLimit(concurrency=1, rate_per_minute=60, min_rate_per_minute=10)
+
+    limit.throttled()
+    assert limit.rate_per_minute == pytest.approx(30)
+    limit.throttled()
+    limit.throttled()
+    # Never below min_rate_per_minute
+    assert limit.rate_per_minute == pytest.approx(10)
+
+
+def test_site_limit_recovers_additively_up_to_max_rate():
+    limit = SiteLimit(concurrency=1, rate_per_minute=60)
+    limit.throttled()
+
+    limit.succeeded()
+    assert limit.rate_per_minute == pytest.approx(36)
+    for _ in range(10):
+        limit.succeeded()
+    assert limit.rate_per_minute == pytest.approx(60)
+
+
+def test_limiter_retries_and_backs_off_on_rate_limit_errors():
+    limiter = SiteLimiter(default_rate_per_minute=6000, retries=2, backoff_base=0)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("HTTP 429 Too Many Requests")
+        return "jobs"
+
+    assert limiter.call("indeed", flaky) == "jobs"
+    assert len(calls) == 2
+    # Halved by the 429, then raised by a tenth of the maximum
+    assert limiter.stats()["indeed"]["rate_per_minute"] == pytest.approx(3600)
+
+
+def test_limiter_does_not_throttle_other_errors():
+    limiter = SiteLimiter(default_rate_per_minute=6000, retries=1, backoff_base=0)
+
+    def broken():
+        raise ValueError("parse error")
+
+    with pytest.raises(ValueError):
+        limiter.call("linkedin", broken)
+    assert limiter.stats()["linkedin"]["rate_per_minute"] == pytest.approx(6000)
+
+
+def test_limiter_applies_per_site_overrides():
+    limiter = SiteLimiter(limits={"google": {"concurrency": 1, "rate_per_minute": 30}})
+    limiter.limit("google")
+    limiter.limit("indeed")
+
+    assert limiter.stats() == {
+        "google": {"concurrency": 1, "rate_per_minute": 30, "max_rate_per_minute": 30},
+        "indeed": {"concurrency": 2, "rate_per_minute": 60, "max_rate_per_minute": 60},
+    }
+
+
+def test_limiter_times_out_waiting_for_a_token():
+    limiter = SiteLimiter(default_concurrency=1, default_rate_per_minute=1, acquire_timeout=0.01)
+    limiter.call("indeed", lambda: None)
+
+    with pytest.raises(RateLimitTimeout):
+        limiter.call("indeed", lambda: None)
@@ -0,0 +1,127 @@
+import gzip
+import io
+import zlib
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from flask import Flask, Response
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+import response_encoding
+from response_encoding import (
+    PARQUET_MIMETYPE, FastJSONProvider, arrow_schema, compress_response, negotiate_encoding,
+    parquet_bytes, rows_to_batch, stream_arrow,
+)
+
+
+@pytest.fixture
+def flask_app():
+    flask_app = Flask(__name__)
+    flask_app.json = FastJSONProvider(flask_app)
+    return flask_app
+
+
+def accept(header):
+    return parse_accept_header(header, Accept)
+
+
+def test_negotiate_encoding_prefers_zstd_at_equal_quality():
+    pytest.importorskip("zstandard")
+
+    assert negotiate_encoding(accept("gzip, zstd")) == "zstd"
+    assert negotiate_encoding(accept("gzip;q=1, zstd;q=0.5")) == "gzip"
+    assert negotiate_encoding(accept("br")) is None
+    assert negotiate_encoding(accept("")) is None
+
+
+def test_small_bodies_are_not_compressed():
+    response = compress_response(Response("x" * 10), "gzip", min_size=1024)
+
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+def test_buffered_body_is_gzipped():
+    body = b'{"jobs": [' + b'{"title": "engineer"},' * 200 + b"{}]}"
+
+    response = compress_response(Response(body), "gzip", min_size=10)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()) == body
+
+
+def test_streamed_chunks_decode_as_they_arrive():
+    response = compress_response(Response(iter(["first chunk\n", "", "second chunk\n"])), "gzip")
+    decoder = zlib.decompressobj(31)
+    decoded = [decoder.decompress(chunk) for chunk in response.response]
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert decoded[0] == b"first chunk\n"
+    assert b"".join(decoded) == b"first chunk\nsecond chunk\n"
+
+
+@pytest.mark.parametrize("response", [
+    Response(status=204),
+    Response(b"p" * 4096, mimetype=PARQUET_MIMETYPE),
+    Response(b"z" * 4096, headers={"Content-Encoding": "br"}),
+])
+def test_responses_that_must_not_be_compressed(response):
+    body = response.get_data()
+
+    assert compress_response(response, "gzip", min_size=10).get_data() == body
+
+
+def test_zstd_body_round_trips():
+    zstandard = pytest.importorskip("zstandard")
+    body = b"abc" * 1000
+
+    response = compress_response(Response(body), "zstd")
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(response.get_data()) == body
+
+
+def test_json_provider_encodes_app_values(flask_app):
+    value = {"amount": Decimal("1.5"), "posted": datetime(2024, 6, 1, tzinfo=timezone.utc), 1: "one"}
+
+    encoded = flask_app.json.loads(flask_app.json.dumps(value))
+    assert encoded == {"amount": "1.5", "posted": "Sat, 01 Jun 2024 00:00:00 GMT", "1": "one"}
+    # Formatting options fall back to the standard encoder
+    assert flask_app.json.dumps({"b": 1, "a": 2}, indent=2, sort_keys=True) == '{\n  "a": 2,\n  "b": 1\n}'
+
+
+def test_arrow_stream_converts_values_to_column_types():
+    pa = pytest.importorskip("pyarrow")
+    schema = arrow_schema(
+        ["title", "min_amount", "is_remote", "date_posted", "extra"],
+        {"title": "TEXT", "min_amount": "NUMERIC", "is_remote": "BOOLEAN", "date_posted": "TIMESTAMP"},
+    )
+    rows = [
+        ("Engineer", Decimal("100000"), True, "2024-06-01T12:00:00", {"k": 1}),
+        ("Designer", "n/a", "yes", "not a date", None),
+    ]
+
+    table = pa.ipc.open_stream(b"".join(stream_arrow([rows], schema))).read_all()
+    assert table.to_pylist() == [
+        {"title": "Engineer", "min_amount": 100000.0, "is_remote": True,
+         "date_posted": datetime(2024, 6, 1, 12), "extra": '{"k": 1}'},
+        {"title": "Designer", "min_amount": None, "is_remote": None, "date_posted": None, "extra": None},
+    ]
+
+
+def test_parquet_round_trips():
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(["id", "title"], {"id": "INTEGER", "title": "TEXT"})
+    data = parquet_bytes([[(1, "a"), (2, "b")], [(3, "c")]], schema)
+
+    assert pq.read_table(io.BytesIO(data)).to_pydict() == {"id": [1, 2, 3], "title": ["a", "b", "c"]}
+    assert rows_to_batch([], schema).num_rows == 0
+
+
+def test_columnar_formats_need_pyarrow(monkeypatch):
+    monkeypatch.setattr(response_encoding, "pa", None)
+    monkeypatch.setattr(response_encoding, "COLUMNAR_AVAILABLE", False)
+
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        arrow_schema(["id"], {})
@@ -0,0 +1,87 @@
+import pytest
+
+from benchmarks.synthetic_jobs import make_job
+from retention import PostgresJobRetention
+
+
+# Function to store count jobs, of which the first stale ones were last seen 90 days ago
+@pytest.fixture
+def jobs(app_module, db):
+    def store(count, stale):
+        job_list = [make_job(index) for index in range(count)]
+        app_module.ingest_jobs(job_list)
+        with db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE scraped_jobs SET last_seen_at = now() - interval '90 days' WHERE job_url = ANY(%s)",
+                ([job["job_url"] for job in job_list[:stale]],),
+            )
+            conn.commit()
+            cursor.close()
+        return job_list
+
+    return store
+
+
+def test_expire_archives_stale_jobs_in_batches(db, fetch, jobs):
+    job_list = jobs(5, stale=3)
+    expired = []
+    retention = PostgresJobRetention(db, retention_days=30, batch_size=2, on_expired=expired.append)
+
+    assert retention.run_once() == (3, [])
+    assert len(expired) == 2
+    assert fetch("SELECT count(*) FROM scraped_jobs") == [(2,)]
+    archived = fetch("SELECT job_url, record->>'title' FROM scraped_jobs_archive ORDER BY id")
+    assert archived == [(job["job_url"], job["title"]) for job in job_list[:3]]
+
+
+def test_expire_without_archive_deletes(db, fetch, jobs):
+    jobs(3, stale=2)
+    retention = PostgresJobRetention(db, retention_days=30, archive=False, vacuum_tables=())
+
+    assert retention.expire() == 2
+    assert fetch("SELECT count(*) FROM scraped_jobs_archive") == [(0,)]
+
+
+def test_expire_skips_rows_locked_by_another_process(db, jobs):
+    job_list = jobs(3, stale=3)
+    retention = PostgresJobRetention(db, retention_days=30, archive=False)
+
+    with db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM scraped_jobs WHERE job_url = %s FOR UPDATE", (job_list[0]["job_url"],))
+        assert retention.expire() == 2
+        conn.rollback()
+        cursor.close()
+    assert retention.expire() == 1
+
+
+def test_disabled_retention_keeps_everything(db, fetch, jobs):
+    jobs(2, stale=2)
+
+    assert PostgresJobRetention(db, retention_days=0).run_once() == (0, [])
+    assert fetch("SELECT count(*) FROM scraped_jobs") == [(2,)]
+
+
+def test_vacuum_leaves_connections_transactional(db, jobs):
+    jobs(2, stale=2)
+    retention = PostgresJobRetention(db, retention_days=30, vacuum_tables=("scraped_jobs", "job_sources"))
+
+    retention.run_once()
+    with db() as conn:
+        assert not conn.autocommit
+
+
+def test_old_archive_partitions_are_dropped(db, fetch):
+    with db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE scraped_jobs_archive_2000_01 PARTITION OF scraped_jobs_archive
+        FOR VALUES FROM ('2000-01-01') TO ('2000-02-01')
+        """)
+        conn.commit()
+        cursor.close()
+    retention = PostgresJobRetention(db, retention_days=30, archive_retention_months=12)
+
+    assert retention.drop_archive_partitions() == ["scraped_jobs_archive_2000_01"]
+    assert fetch("SELECT to_regclass('scraped_jobs_archive_2000_01')") == [(None,)]
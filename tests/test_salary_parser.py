@@ -0,0 +1,42 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from salary_parser import EMPTY_SALARY, SalaryRange, parse_salaries, parse_salary
+
+CORPUS = json.loads(
+    (Path(__file__).resolve().parent.parent / "benchmarks" / "salary_corpus.json").read_text(encoding="utf-8")
+)
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["text"] for case in CORPUS])
+def test_corpus(case):
+    assert parse_salary(case["text"])._asdict() == case["expected"]
+
+
+@pytest.mark.parametrize("value", [None, "", 42, float("nan"), "competitive", "0.5% - 1.0%"])
+def test_values_without_an_amount(value):
+    assert parse_salary(value) == EMPTY_SALARY
+
+
+def test_equity_numbers_are_not_read_as_amounts():
+    assert parse_salary("0.10% - 0.25%  $150K - $180K") == SalaryRange(150000.0, 180000.0, "USD", "yearly")
+
+
+def test_parse_salaries_matches_parse_salary():
+    texts = [case["text"] for case in CORPUS] * 2 + [None, 7]
+
+    assert parse_salaries(texts) == [parse_salary(text) for text in texts]
+
+
+def test_parse_salaries_series_keeps_the_index():
+    pd = pytest.importorskip("pandas")
+    series = pd.Series(["$100K - $120K", None, float("nan"), "$100K - $120K", "€60k"], index=[10, 11, 12, 13, 14])
+
+    frame = parse_salaries(series)
+    assert list(frame.columns) == list(SalaryRange._fields)
+    assert list(frame.index) == [10, 11, 12, 13, 14]
+    assert frame.loc[13, "max_amount"] == 120000.0
+    assert frame.loc[14, "currency"] == "EUR"
+    assert frame.loc[[11, 12], "currency"].isna().all()
@@ -0,0 +1,64 @@
+import pytest
+
+from scheduler import PostgresScheduleStore, ScrapeScheduler
+from scrape_queue import MemoryScrapeQueue
+
+
+@pytest.fixture
+def store(db):
+    return PostgresScheduleStore(db, jitter=0)
+
+
+def test_claim_due_pushes_next_run_forward(store):
+    due = store.create("hourly", {"search_term": "python"}, 3600)
+    store.create("paused", {"search_term": "go"}, 3600, enabled=False)
+
+    claimed = store.claim_due()
+    assert [(row["id"], row["params"]) for row in claimed] == [(due["id"], {"search_term": "python"})]
+    assert store.get(due["id"])["next_run_at"] > due["next_run_at"]
+    assert store.claim_due() == []
+
+
+def test_claim_due_skips_schedules_locked_by_another_process(db, store):
+    first = store.create("first", {}, 60)
+    second = store.create("second", {}, 60)
+
+    with db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM scrape_schedules WHERE id = %s FOR UPDATE", (first["id"],))
+        assert [row["id"] for row in store.claim_due()] == [second["id"]]
+        conn.rollback()
+        cursor.close()
+
+    assert [row["id"] for row in store.claim_due()] == [first["id"]]
+
+
+def test_scheduler_skips_a_run_while_the_previous_one_is_pending(store):
+    queue = MemoryScrapeQueue()
+    scheduler = ScrapeScheduler(store, queue)
+    schedule = store.create("often", {"search_term": "rust"}, 60)
+
+    assert scheduler.run_due() == 1
+    task_id = store.get(schedule["id"])["last_task_id"]
+    assert queue.get(task_id)["params"] == {"search_term": "rust"}
+
+    # Due again while the first run is still queued
+    store.update(schedule["id"], next_run_at=schedule["created_at"])
+    assert scheduler.run_due() == 0
+    assert store.get(schedule["id"])["skipped_runs"] == 1
+
+    # Once that run finishes, the next due run is enqueued
+    queue.claim("w", timeout=0)
+    queue.complete(task_id, {})
+    store.update(schedule["id"], next_run_at=schedule["created_at"])
+    assert scheduler.run_due() == 1
+    assert store.get(schedule["id"])["last_task_id"] != task_id
+
+
+def test_update_ignores_unknown_fields(store):
+    schedule = store.create("daily", {"search_term": "python"}, 86400)
+
+    updated = store.update(schedule["id"], interval_seconds=3600, skipped_runs=99)
+    assert (updated["interval_seconds"], updated["skipped_runs"]) == (3600, 0)
+    assert store.delete(schedule["id"])
+    assert store.get(schedule["id"]) is None
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from scrape_cache import MemoryScrapeCache, PostgresScrapeCache, cache_key
+
+
+def test_cache_key_ignores_dict_order():
+    assert cache_key({"a": 1, "b": [1, 2]}) == cache_key({"b": [1, 2], "a": 1})
+    assert cache_key({"a": 1}) != cache_key({"a": 2})
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryScrapeCache(ttl=0.05)
+    cache.set("k", {}, {"jobs": 1})
+
+    result, age = cache.get("k")
+    assert result == {"jobs": 1} and age >= 0
+    time.sleep(0.06)
+    assert cache.get("k") is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryScrapeCache(max_entries=2)
+    cache.set("a", {}, 1)
+    cache.set("b", {}, 2)
+    cache.get("a")
+    cache.set("c", {}, 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a")[0], cache.get("c")[0]) == (1, 3)
+
+
+def test_postgres_cache_round_trip_and_eviction(db):
+    cache = PostgresScrapeCache(db, max_entries=2)
+    cache.set("a", {"q": "a"}, {"jobs": [1]})
+    cache.set("b", {"q": "b"}, {"jobs": [2]})
+    assert cache.get("a")[0] == {"jobs": [1]}
+
+    cache.set("c", {"q": "c"}, {"jobs": [3]})
+    assert cache.get("b") is None
+    assert cache.get("c")[0] == {"jobs": [3]}
+
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def test_postgres_cache_ignores_expired_entries(db):
+    cache = PostgresScrapeCache(db, ttl=-1)
+    cache.set("a", {}, {"jobs": []})
+
+    assert cache.get("a") is None
+
+
+@pytest.fixture
+def scrape_cache(app_module, monkeypatch):
+    cache = MemoryScrapeCache()
+    monkeypatch.setattr(app_module, "_scrape_cache", cache)
+    return cache
+
+
+def scrape_request(app_module, **fields):
+    return app_module.parse_scrape_request(dict({
+        "site_names": ["indeed", "linkedin"],
+        "search_term": "Python",
+        "location": "Berlin",
+        "results_wanted": 5,
+    }, **fields))
+
+
+def test_run_scrape_serves_equivalent_requests_from_cache(app_module, job_boards, scrape_cache):
+    calls, _ = job_boards
+
+    first = app_module.run_scrape(scrape_request(app_module))
+    # Same search with other site order, case and whitespace
+    second = app_module.run_scrape(scrape_request(
+        app_module, site_names=["linkedin", "indeed"], search_term=" python ", location="berlin"
+    ))
+
+    assert (first["cache"], second["cache"]) == ("miss", "hit")
+    assert len(calls) == 2
+    assert second["jobs_data"] == first["jobs_data"]
+
+
+def test_run_scrape_refresh_and_bypass_modes(app_module, job_boards, scrape_cache):
+    calls, _ = job_boards
+    app_module.run_scrape(scrape_request(app_module))
+
+    assert app_module.run_scrape(scrape_request(app_module, cache="refresh"))["cache"] == "refresh"
+    assert app_module.run_scrape(scrape_request(app_module, cache="bypass"))["cache"] == "bypass"
+    assert len(calls) == 6
+
+
+def test_run_scrape_does_not_cache_partial_results(app_module, job_boards, scrape_cache):
+    calls, overrides = job_boards
+    overrides["linkedin"] = RuntimeError("HTTP 500")
+
+    assert app_module.run_scrape(scrape_request(app_module))["sources"]["linkedin"]["status"] == "error"
+    del overrides["linkedin"]
+    assert app_module.run_scrape(scrape_request(app_module))["cache"] == "miss"
+    assert app_module.run_scrape(scrape_request(app_module))["cache"] == "hit"
@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+from scrape_queue import FAILED, QUEUED, RUNNING, SUCCEEDED, MemoryScrapeQueue, PostgresScrapeQueue, ScrapeWorkerPool
+
+
+def test_memory_queue_runs_tasks_in_order():
+    queue = MemoryScrapeQueue()
+    first = queue.enqueue({"n": 1})
+    second = queue.enqueue({"n": 2})
+
+    assert queue.claim("w", timeout=0) == (first, {"n": 1})
+    assert queue.claim("w", timeout=0) == (second, {"n": 2})
+    assert queue.claim("w", timeout=0) is None
+
+    queue.complete(first, {"ok": True})
+    task = queue.get(first)
+    assert (task["status"], task["result"], task["attempts"]) == (SUCCEEDED, {"ok": True}, 1)
+    assert queue.get(second)["status"] == RUNNING
+
+
+def test_memory_queue_forgets_oldest_finished_tasks():
+    queue = MemoryScrapeQueue(max_finished=2)
+    task_ids = [queue.enqueue({}) for _ in range(3)]
+    for task_id in task_ids:
+        queue.claim("w", timeout=0)
+        queue.fail(task_id, "boom")
+
+    assert queue.get(task_ids[0]) is None
+    assert [queue.get(task_id)["error"] for task_id in task_ids[1:]] == ["boom", "boom"]
+
+
+def test_worker_pool_stores_results_and_errors():
+    queue = MemoryScrapeQueue()
+    done = threading.Semaphore(0)
+
+    def handler(params, report_progress):
+        report_progress({"step": 1})
+        try:
+            if params.get("fail"):
+                raise RuntimeError("scrape failed")
+            return {"jobs": params["jobs"]}
+        finally:
+            done.release()
+
+    ok = queue.enqueue({"jobs": 3})
+    bad = queue.enqueue({"fail": True})
+    pool = ScrapeWorkerPool(queue, handler, size=1, poll_timeout=0.05)
+    pool.start()
+    try:
+        assert done.acquire(timeout=5) and done.acquire(timeout=5)
+    finally:
+        pool.stop(timeout=5)
+
+    assert queue.get(ok)["result"] == {"jobs": 3}
+    assert queue.get(ok)["progress"] == {"step": 1}
+    assert (queue.get(bad)["status"], queue.get(bad)["error"]) == (FAILED, "scrape failed")
+
+
+@pytest.fixture
+def pg_queue(db):
+    return PostgresScrapeQueue(db, poll_interval=0, stale_after=60, max_attempts=2)
+
+
+# Function to move a task's heartbeat back by the given number of seconds
+def age_task(db, task_id, seconds):
+    with db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE scrape_tasks SET updated_at = now() - %s * interval '1 second' WHERE id = %s",
+            (seconds, task_id),
+        )
+        conn.commit()
+        cursor.close()
+
+
+def test_postgres_claim_skips_locked_tasks(db, pg_queue):
+    first = pg_queue.enqueue({"n": 1})
+    second = pg_queue.enqueue({"n": 2})
+
+    # Another worker holds the oldest task mid-claim
+    with db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM scrape_tasks WHERE id = %s FOR UPDATE", (first,))
+        assert pg_queue.claim("w2", timeout=0) == (second, {"n": 2})
+        assert pg_queue.claim("w2", timeout=0) is None
+        conn.rollback()
+        cursor.close()
+
+    assert pg_queue.claim("w1", timeout=0) == (first, {"n": 1})
+    assert pg_queue.get(first)["status"] == RUNNING
+
+
+def test_postgres_stale_task_is_retried_then_failed(db, pg_queue):
+    task_id = pg_queue.enqueue({"n": 1})
+    assert pg_queue.claim("w1", timeout=0) == (task_id, {"n": 1})
+    # A running task with a recent heartbeat is not handed out again
+    assert pg_queue.claim("w2", timeout=0) is None
+
+    age_task(db, task_id, 120)
+    assert pg_queue.claim("w2", timeout=0) == (task_id, {"n": 1})
+    assert pg_queue.get(task_id)["attempts"] == 2
+
+    # The second attempt also stops responding; max_attempts is used up
+    age_task(db, task_id, 120)
+    assert pg_queue.claim("w3", timeout=0) is None
+    task = pg_queue.get(task_id)
+    assert (task["status"], task["error"]) == (FAILED, "Worker stopped responding")
+
+
+def test_postgres_queue_records_progress_and_result(pg_queue):
+    task_id = pg_queue.enqueue({"n": 1})
+    assert pg_queue.get(task_id)["status"] == QUEUED
+    pg_queue.claim("w", timeout=0)
+
+    pg_queue.update_progress(task_id, {"sites_done": 1})
+    pg_queue.complete(task_id, {"jobs": 2})
+
+    task = pg_queue.get(task_id)
+    assert (task["status"], task["progress"], task["result"]) == (SUCCEEDED, {"sites_done": 1}, {"jobs": 2})
+    assert task["finished_at"] is not None
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from scrape_watermarks import PostgresWatermarkStore, delta_hours, source_key
+
+
+def test_source_key_ignores_dict_order():
+    assert source_key({"site": "indeed", "location": "x"}) == source_key({"location": "x", "site": "indeed"})
+
+
+def test_delta_hours_covers_the_time_since_the_last_scrape():
+    now = datetime.now(timezone.utc)
+
+    assert delta_hours(None, 72) == 72
+    assert delta_hours(now - timedelta(hours=2, minutes=30), 72) == 4
+    assert delta_hours(now - timedelta(days=10), 72) == 72
+    assert delta_hours(now, 72, overlap_hours=0) == 1
+    assert delta_hours(now - timedelta(days=10, minutes=-1), None) == 241
+
+
+def test_store_filters_seen_urls_and_never_moves_back(db):
+    store = PostgresWatermarkStore(db)
+    later = datetime.now(timezone.utc)
+    earlier = later - timedelta(hours=5)
+
+    store.record("k", {"site": "indeed"}, later, ["u1", "u2"], 2)
+    store.record("k", {"site": "indeed"}, earlier, ["u3"], 1)
+
+    assert store.get(["k", "other"]) == {"k": later}
+    assert store.filter_unseen("k", ["u1", "u3", "u4", None]) == {"u4"}
+    assert store.filter_unseen("other", ["u1"]) == {"u1"}
+
+
+def incremental_request(app_module, **fields):
+    return app_module.parse_scrape_request(dict({
+        "site_names": ["indeed", "linkedin"],
+        "search_term": "Python",
+        "location": "Berlin",
+        "results_wanted": 5,
+        "incremental": True,
+        "save_to_db": True,
+    }, **fields))
+
+
+# Function to read the stored watermark of each JobSpy site in params
+def stored_watermarks(app_module, params):
+    keys = {site: source_key(app_module.incremental_scope(params, site)) for site in params["site_names"]}
+    stored = app_module.get_watermark_store().get(keys.values())
+    return {site: stored[key] for site, key in keys.items() if key in stored}
+
+
+def test_saved_scrape_advances_watermarks(app_module, db, job_boards):
+    calls, _ = job_boards
+    params = incremental_request(app_module)
+
+    first = app_module.run_scrape(params)
+    assert first["jobs_found"] == 10
+    assert set(stored_watermarks(app_module, params)) == {"indeed", "linkedin"}
+
+    # The next run asks for the elapsed hour plus an hour of overlap, and
+    # drops the jobs already seen
+    second = app_module.run_scrape(params)
+    assert second["jobs_found"] == 0
+    assert second["sources"]["indeed"]["seen_skipped"] == 5
+    assert calls[-1]["hours_old"] == 2
+
+
+def test_failed_save_keeps_watermarks(app_module, db, job_boards, monkeypatch):
+    params = incremental_request(app_module)
+    save_jobs_to_db = app_module.save_jobs_to_db
+    monkeypatch.setattr(app_module, "save_jobs_to_db", lambda *args, **kwargs: "Error saving jobs to database: boom")
+
+    app_module.run_scrape(params)
+    assert stored_watermarks(app_module, params) == {}
+
+    # The jobs are offered again once saving works
+    monkeypatch.setattr(app_module, "save_jobs_to_db", save_jobs_to_db)
+    assert app_module.run_scrape(params)["jobs_found"] == 10
+
+
+def test_unsaved_scrape_keeps_watermarks(app_module, db, job_boards):
+    params = incremental_request(app_module, save_to_db=False)
+
+    app_module.run_scrape(params)
+    assert stored_watermarks(app_module, params) == {}
+
+
+def test_empty_or_failed_sources_keep_their_watermarks(app_module, db, job_boards):
+    _, overrides = job_boards
+    params = incremental_request(app_module, site_names=["indeed", "linkedin", "google"])
+    overrides["linkedin"] = pd.DataFrame(columns=["job_url", "title"])
+    overrides["google"] = RuntimeError("HTTP 500")
+
+    result = app_module.run_scrape(params)
+    assert result["sources"]["google"]["status"] == "error"
+    assert set(stored_watermarks(app_module, params)) == {"indeed"}
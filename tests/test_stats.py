@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from benchmarks.synthetic_jobs import make_job
+from stats import REFRESH_LOCK_KEY, PostgresJobStats, percentile_dict, remote_share
+
+
+# Stats refresher that only refreshes when a test asks it to. The app's own
+# refresher is stopped so it can't hold the refresh lock mid-test.
+@pytest.fixture
+def stats(app_module, db, monkeypatch):
+    app_module.job_stats.stop(timeout=10)
+    job_stats = PostgresJobStats(db, interval=0, min_interval=0)
+    monkeypatch.setattr(job_stats, "notify", lambda: None)
+    monkeypatch.setattr(app_module, "job_stats", job_stats)
+    return job_stats
+
+
+def changes(fetch):
+    return fetch("SELECT changes FROM job_stats_changes")[0][0]
+
+
+def test_ingest_bumps_the_change_counter_only_when_jobs_change(app_module, fetch, stats):
+    jobs = [make_job(index) for index in range(4)]
+    before = changes(fetch)
+
+    app_module.ingest_jobs(jobs, batch_size=2)
+    assert changes(fetch) == before + 2
+    app_module.ingest_jobs(jobs, on_conflict="nothing")
+    assert changes(fetch) == before + 2
+    app_module.ingest_jobs([dict(job, description="new") for job in jobs], on_conflict="update")
+    assert changes(fetch) == before + 3
+
+
+def test_refresh_only_when_jobs_changed(app_module, stats):
+    stats.refresh()
+    assert not stats.refresh()
+
+    app_module.ingest_jobs([make_job(index) for index in range(3)])
+    assert stats.refresh()
+    assert stats.summary()["totals"]["jobs"] == 3
+    assert not stats.refresh()
+
+
+def test_refresh_backs_off_while_another_process_refreshes(db, stats):
+    with db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (REFRESH_LOCK_KEY,))
+        assert stats._refresh(force=True) == "locked"
+        conn.rollback()
+        cursor.close()
+    assert stats._refresh(force=True) == "refreshed"
+
+
+def test_summary_groups_jobs(app_module, stats):
+    jobs = [make_job(index) for index in range(30)]
+    app_module.ingest_jobs(jobs)
+    stats.refresh()
+
+    summary = stats.summary(limit=5)
+    totals = summary["totals"]
+    assert totals["jobs"] == 30
+    assert totals["remote_jobs"] == sum(1 for job in jobs if job["is_remote"])
+    assert totals["with_salary"] == sum(1 for job in jobs if job["min_amount"] is not None)
+    assert {group["site"]: group["jobs"] for group in summary["by_site"]} == {"indeed": 10, "linkedin": 10, "google": 10}
+    assert len(summary["by_company"]) <= 5
+    usd = next(group for group in summary["salary"] if group["currency"] == "USD")
+    assert usd["jobs"] == sum(1 for job in jobs if job["currency"] == "USD")
+    assert usd["min_amount"]["p10"] <= usd["min_amount"]["p50"] <= usd["min_amount"]["p90"]
+
+
+def test_notify_starts_the_refresher(app_module, db, stats):
+    refresher = PostgresJobStats(db, interval=0, min_interval=0)
+    stats.refresh()
+    app_module.ingest_jobs([make_job(index) for index in range(2)])
+    try:
+        refresher.notify()
+        deadline = time.monotonic() + 10
+        while refresher.summary()["totals"]["jobs"] != 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        refresher.stop(timeout=10)
+    assert refresher.summary()["totals"]["jobs"] == 2
+
+
+def test_remote_share_and_percentiles():
+    assert remote_share({"jobs": 0, "remote_jobs": 0}) is None
+    assert remote_share({"jobs": 3, "remote_jobs": 1}) == 0.3333
+    assert percentile_dict(None, None) == {"p10": None, "p25": None, "p50": None, "p75": None, "p90": None, "avg": None}
+    assert percentile_dict([1, 2, 3, 4, 5], 3.0)["p50"] == 3